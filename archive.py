@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# MEMORY-MAPPED COLUMNAR PRICE ARCHIVE
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import cache_path
+
+# Column -> dtype. The rows of a ticker are contiguous and sorted by date.
+COLUMNS = {'Date': 'datetime64[D]', 'Open': np.float32, 'High': np.float32,
+           'Low': np.float32, 'Close': np.float32, 'Volume': np.int64}
+
+VERSION = 1
+
+#==============================================================================
+# Writing
+#==============================================================================
+
+def build_archive(tickers, history, start, end, folder=None, max_workers=8):
+    """
+    This function downloads (or reads from the price store) the daily bars
+    of the tickers for [start, end) and writes them as an archive: one .npy
+    file per column with the rows of all the tickers one after the other,
+    plus meta.json with the offset table (ticker -> first row, number of
+    rows) and the time zone of each ticker.
+
+    history is a function (ticker, start, end) -> DataFrame like
+    PriceStore.history. Tickers without data are left out. The new archive
+    replaces the old one only once it is complete, so readers never see a
+    half-written archive. Returns the list of the tickers left out.
+    """
+    folder = folder or cache_path("archive")
+    tickers = list(dict.fromkeys(tickers))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        frames = list(pool.map(lambda t: _safe_history(history, t, start, end), tickers))
+
+    offsets, zones, missing = {}, {}, []
+    rows = 0
+    for ticker, df in zip(tickers, frames):
+        if df is None or len(df) == 0:
+            missing.append(ticker)
+            continue
+        offsets[ticker] = [rows, len(df)]
+        zones[ticker] = str(df.index.tz) if df.index.tz is not None else None
+        rows += len(df)
+
+    tmp = folder + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for column, dtype in COLUMNS.items():
+        out = np.lib.format.open_memmap(os.path.join(tmp, column + ".npy"), mode='w+',
+                                        dtype=dtype, shape=(rows,))
+        for ticker, df in zip(tickers, frames):
+            if ticker not in offsets:
+                continue
+            first, length = offsets[ticker]
+            if column == 'Date':
+                values = df.index.tz_localize(None).normalize().to_numpy().astype(dtype)
+            else:
+                values = df[column].fillna(0).to_numpy().astype(dtype)
+            out[first:first + length] = values
+        out.flush()
+        del out
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({'version': VERSION, 'rows': rows, 'start': str(start), 'end': str(end),
+                   'offsets': offsets, 'tz': zones}, f)
+
+    # Swap the folders: the old archive is removed only after the rename
+    old = folder + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(folder):
+        os.replace(folder, old)
+    os.replace(tmp, folder)
+    shutil.rmtree(old, ignore_errors=True)
+    return missing
+
+
+def _safe_history(history, ticker, start, end):
+    try:
+        return history(ticker, start, end)
+    except Exception:
+        return None
+
+#==============================================================================
+# Reading
+#==============================================================================
+
+def _to_day(value):
+    if isinstance(value, str):
+        return np.datetime64(value[:10], 'D')
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+class PriceArchive:
+    """
+    Read-only view of an archive written by build_archive. The columns are
+    memory-mapped: opening the archive reads only meta.json, and the pages of
+    a column are loaded by the OS when a slice is used (and shared by all the
+    processes reading the archive). Slices are views of the files, never
+    copies.
+    """
+
+    def __init__(self, folder=None):
+        self.folder = folder or cache_path("archive")
+        with open(os.path.join(self.folder, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get('version') != VERSION:
+            raise ValueError(f"Unsupported archive version {meta.get('version')}")
+        self.offsets = {t: tuple(v) for t, v in meta['offsets'].items()}
+        self.tz = meta['tz']
+        self.start = pd.Timestamp(meta['start']).date()
+        self.end = pd.Timestamp(meta['end']).date()
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, ticker):
+        return ticker in self.offsets
+
+    @property
+    def tickers(self):
+        return list(self.offsets)
+
+    def column(self, name):
+        """
+        This function returns the memory-mapped column of all the tickers.
+        """
+        with self._lock:
+            if name not in self._columns:
+                # A plain ndarray over the mapping: its slices are cheaper
+                # than np.memmap ones and still views of the file
+                self._columns[name] = np.load(os.path.join(self.folder, name + ".npy"),
+                                              mmap_mode='r').view(np.ndarray)
+            return self._columns[name]
+
+    def rows(self, ticker, start=None, end=None):
+        """
+        This function returns the (first, last) rows of the ticker for the
+        dates in [start, end), found by binary search in its dates.
+        """
+        first, length = self.offsets[ticker]
+        dates = self.column('Date')[first:first + length]
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_day(start)))
+        hi = length if end is None else int(np.searchsorted(dates, _to_day(end)))
+        return first + lo, first + hi
+
+    def slice(self, ticker, start=None, end=None, columns=None):
+        """
+        This function returns a dictionary column -> numpy view of the rows of
+        the ticker for [start, end). Nothing is copied.
+        """
+        lo, hi = self.rows(ticker, start, end)
+        return {name: self.column(name)[lo:hi] for name in (columns or COLUMNS)}
+
+    def frame(self, ticker, start=None, end=None):
+        """
+        This function returns the bars of the ticker for [start, end) as a
+        DataFrame in the format of PriceStore.history (OHLCV only, prices in
+        float32). The columns are views of the archive; only the date index
+        is built.
+        """
+        views = self.slice(ticker, start, end)
+        index = pd.DatetimeIndex(views.pop('Date'), name='Date')
+        if self.tz.get(ticker):
+            index = index.tz_localize(self.tz[ticker])
+        return pd.DataFrame(views, index=index, copy=False)
+
+###############################################################################
+# END
+###############################################################################
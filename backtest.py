@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# VECTORIZED STRATEGY BACKTESTER
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators import _ema_scan, rsi
+
+TRADING_DAYS = 252
+
+#==============================================================================
+# Indicators for many windows at once
+#==============================================================================
+# Each function returns a (days x windows) array: one column per window, NaN
+# until the window is full.
+
+def sma_matrix(close, windows):
+    """
+    This function computes the simple moving averages of close for all the
+    windows, from one cumulative sum.
+    """
+    windows = np.asarray(windows)
+    n = len(close)
+    c = np.concatenate([[0.0], np.cumsum(close - close[0])])
+    t = np.arange(1, n + 1)[:, None]
+    start = np.maximum(t - windows[None, :], 0)
+    out = (c[t] - c[start]) / windows + close[0]
+    out[t < windows[None, :]] = np.nan
+    return out
+
+
+def ema_matrix(close, windows):
+    """
+    This function computes the exponential moving averages of close for all
+    the windows (see indicators.ema).
+    """
+    out = np.empty((len(close), len(windows)))
+    for j, w in enumerate(windows):
+        out[:, j] = _ema_scan(close, 2.0 / (w + 1))
+        out[:w - 1, j] = np.nan
+    return out
+
+
+def rolling_extreme_matrix(values, windows, largest):
+    """
+    This function computes the highest (or lowest) value of the `window`
+    previous days, today excluded, for all the windows.
+    """
+    out = np.full((len(values), len(windows)), np.nan)
+    reduce = np.max if largest else np.min
+    for j, w in enumerate(windows):
+        if len(values) > w:
+            out[w:, j] = reduce(sliding_window_view(values[:-1], w), axis=1)
+    return out
+
+
+def rsi_matrix(close, windows):
+    """
+    This function computes the RSI of close for all the windows (see
+    indicators.rsi).
+    """
+    columns = [rsi({'Close': close}, None, window=w)[0][f'RSI({w})'] for w in windows]
+    return np.column_stack(columns)
+
+#==============================================================================
+# Rules
+#==============================================================================
+# A rule is a function (bars, combos) -> positions: bars is a dictionary
+# 'Open', 'High', 'Low', 'Close' -> numpy arrays, combos a DataFrame with one
+# row per parameter combination, and positions a (days x combinations) array
+# of 0 (flat) or 1 (long), decided at the close of each day.
+
+def _columns(matrix_of, values, needed):
+    """
+    This function computes an indicator once per distinct window and returns
+    the column of each combination.
+    """
+    windows, inverse = np.unique(needed, return_inverse=True)
+    return matrix_of(values, windows)[:, inverse]
+
+
+def _hold(entries, exits):
+    """
+    This function turns entry and exit signals (days x combinations, bool)
+    into positions: long from an entry until the next exit. Carried forward
+    with an accumulated maximum of the last signal day, not a loop.
+    """
+    signal = np.full(entries.shape, np.nan)
+    signal[exits] = 0.0
+    signal[entries & ~exits] = 1.0
+    signal[0] = np.where(np.isnan(signal[0]), 0.0, signal[0])
+    days = np.arange(len(signal))[:, None]
+    last = np.maximum.accumulate(np.where(np.isnan(signal), 0, days), axis=0)
+    return np.take_along_axis(signal, last, axis=0)
+
+
+def sma_crossover(bars, combos):
+    close = bars['Close']
+    fast = _columns(sma_matrix, close, combos['fast'].to_numpy())
+    slow = _columns(sma_matrix, close, combos['slow'].to_numpy())
+    return (fast > slow).astype(np.float64)
+
+
+def ema_crossover(bars, combos):
+    close = bars['Close']
+    fast = _columns(ema_matrix, close, combos['fast'].to_numpy())
+    slow = _columns(ema_matrix, close, combos['slow'].to_numpy())
+    return (fast > slow).astype(np.float64)
+
+
+def breakout(bars, combos):
+    """
+    Long when the close breaks the highest high of the last `entry` days,
+    flat when it breaks the lowest low of the last `exit` days.
+    """
+    close = bars['Close'][:, None]
+    highest = _columns(lambda v, w: rolling_extreme_matrix(v, w, True),
+                       bars['High'], combos['entry'].to_numpy())
+    lowest = _columns(lambda v, w: rolling_extreme_matrix(v, w, False),
+                      bars['Low'], combos['exit'].to_numpy())
+    return _hold(close > highest, close < lowest)
+
+
+def rsi_threshold(bars, combos):
+    """
+    Long when the RSI falls below `low` (oversold), flat when it rises above
+    `high` (overbought).
+    """
+    values = _columns(rsi_matrix, bars['Close'], combos['window'].to_numpy())
+    return _hold(values < combos['low'].to_numpy(), values > combos['high'].to_numpy())
+
+
+# Name -> (rule, default grid, condition on the combinations or None)
+RULES = {
+    'SMA crossover': (sma_crossover, {'fast': range(5, 105, 5), 'slow': range(20, 210, 10)},
+                      lambda c: c['fast'] < c['slow']),
+    'EMA crossover': (ema_crossover, {'fast': range(5, 105, 5), 'slow': range(20, 210, 10)},
+                      lambda c: c['fast'] < c['slow']),
+    'Breakout': (breakout, {'entry': range(10, 110, 10), 'exit': range(5, 55, 5)}, None),
+    'RSI': (rsi_threshold, {'window': [7, 14, 21], 'low': [20, 25, 30, 35],
+                            'high': [60, 65, 70, 75, 80]}, None),
+}
+
+# Parameters of a single backtest, by rule
+DEFAULTS = {'SMA crossover': {'fast': 50, 'slow': 200},
+            'EMA crossover': {'fast': 12, 'slow': 26},
+            'Breakout': {'entry': 20, 'exit': 10},
+            'RSI': {'window': 14, 'low': 30, 'high': 70}}
+
+
+def parameter_grid(rule, **ranges):
+    """
+    This function returns every combination of the parameters of a rule (a
+    DataFrame, one row per combination). The ranges not given are the
+    default grid of the rule; combinations the rule cannot use (e.g. a fast
+    window longer than the slow one) are left out.
+    """
+    _, defaults, condition = RULES[rule]
+    ranges = {**defaults, **ranges}
+    combos = pd.DataFrame(list(itertools.product(*ranges.values())), columns=list(ranges))
+    if condition is not None:
+        combos = combos[condition(combos)]
+    return combos.reset_index(drop=True)
+
+#==============================================================================
+# Evaluation
+#==============================================================================
+
+def _bars(df):
+    """
+    This function returns the OHLC arrays and the dates of a price frame
+    (indexed by date, or with a 'Date' column like GetStockData).
+    """
+    if 'Date' in df.columns:
+        df = df.set_index('Date')
+    bars = {c: df[c].to_numpy(np.float64) for c in ('Open', 'High', 'Low', 'Close')}
+    return bars, df.index
+
+
+def evaluate(close, positions, cost=0.0005, equity=False):
+    """
+    This function computes the daily returns of the positions (days x
+    combinations, decided at each close and held until the next one) with a
+    cost per trade (a fraction of the amount traded), and their statistics.
+
+    Returns a dictionary of arrays, one value per combination: 'total
+    return', 'CAGR', 'volatility', 'Sharpe' (annualized, no risk-free rate),
+    'max drawdown', 'trades' and 'exposure' (share of the days invested);
+    plus the 'equity' curves (days x combinations, starting at 1) when asked.
+    """
+    returns = close[1:] / close[:-1] - 1
+    held = positions[:-1]
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    daily = held * returns[:, None] - cost * turnover
+
+    curve = np.cumprod(1 + daily, axis=0)
+    days = len(daily)
+    final = curve[-1] if days else np.ones(positions.shape[1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = daily.std(axis=0, ddof=1) if days > 1 else np.full(positions.shape[1], np.nan)
+        stats = {
+            'total return': final - 1,
+            'CAGR': np.maximum(final, 0) ** (TRADING_DAYS / max(days, 1)) - 1,
+            'volatility': std * np.sqrt(TRADING_DAYS),
+            'Sharpe': np.where(std > 0, daily.mean(axis=0) / std * np.sqrt(TRADING_DAYS), np.nan),
+            'max drawdown': (curve / np.maximum.accumulate(np.maximum(curve, 1), axis=0) - 1).min(
+                axis=0, initial=0.0),
+            'trades': (turnover > 0).sum(axis=0),
+            'exposure': held.mean(axis=0) if days else np.zeros(positions.shape[1]),
+        }
+    if equity:
+        stats['equity'] = np.vstack([np.ones((1, positions.shape[1])), curve])
+    return stats
+
+
+def drawdown_table(equity, top=5):
+    """
+    This function lists the worst drawdowns of an equity curve (a Series):
+    peak, trough and recovery dates (NaT when not recovered), depth and
+    length in days.
+    """
+    peak = equity.cummax()
+    under = (equity < peak).to_numpy()
+    rows = []
+    # Runs of days under the previous peak
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], under.astype(np.int8), [0]])))
+    for first, end in zip(edges[::2], edges[1::2]):
+        period = equity.iloc[first:end]
+        trough = period.idxmin()
+        rows.append({'peak': equity.index[first - 1] if first > 0 else equity.index[0],
+                     'trough': trough,
+                     'recovery': equity.index[end] if end < len(equity) else pd.NaT,
+                     'depth': float(period.min() / peak.iloc[first] - 1),
+                     'days': end - first})
+    table = pd.DataFrame(rows, columns=['peak', 'trough', 'recovery', 'depth', 'days'])
+    return table.sort_values('depth').head(top).reset_index(drop=True)
+
+
+def backtest(df, rule, cost=0.0005, **params):
+    """
+    This function backtests one combination of a rule on a price frame (the
+    parameters not given are the DEFAULTS of the rule). Returns a dictionary
+    with:
+        - 'equity'   : DataFrame of the equity curves of the strategy and of
+                       buy & hold, starting at 1
+        - 'positions': Series of the positions (0 or 1)
+        - 'stats'    : DataFrame of the statistics (see evaluate) of both
+        - 'drawdowns': the worst drawdowns of the strategy (drawdown_table)
+    """
+    bars, index = _bars(df)
+    combos = pd.DataFrame([{**DEFAULTS[rule], **params}])
+    positions = RULES[rule][0](bars, combos)
+    # Buy & hold pays the cost once, when it buys
+    both = np.column_stack([positions[:, 0], np.ones(len(index))])
+    stats = evaluate(bars['Close'], both, cost, equity=True)
+    curves = stats.pop('equity')
+    equity = pd.DataFrame(curves, index=index, columns=['Strategy', 'Buy & hold'])
+    return {'equity': equity,
+            'positions': pd.Series(positions[:, 0], index=index),
+            'stats': pd.DataFrame(stats, index=equity.columns).T,
+            'drawdowns': drawdown_table(equity['Strategy'])}
+
+#==============================================================================
+# Parameter sweeps
+#==============================================================================
+
+def _sweep_chunk(args):
+    """
+    This function evaluates a chunk of combinations of a rule on one ticker
+    (in a worker process).
+    """
+    ticker, bars, rule, combos, cost = args
+    stats = evaluate(bars['Close'], RULES[rule][0](bars, combos), cost)
+    table = combos.assign(ticker=ticker, **stats)
+    return table
+
+
+def sweep(frames, rule, grid=None, cost=0.0005, chunk_size=500, workers=None,
+          mp_context=None):
+    """
+    This function backtests every combination of the parameter grid (a
+    DataFrame from parameter_grid; default: the default grid of the rule)
+    on every price frame of frames (ticker -> DataFrame).
+
+    Each job is one ticker and a chunk of chunk_size combinations, evaluated
+    at once on (days x chunk_size) arrays. The jobs run on a process pool
+    when workers > 1 (default: all CPUs), started with mp_context (a
+    multiprocessing context, e.g. 'forkserver' from a threaded server;
+    default: the platform's). Returns one row per ticker and
+    combination with its parameters and statistics, best Sharpe first.
+    """
+    grid = parameter_grid(rule) if grid is None else grid.reset_index(drop=True)
+    jobs = []
+    for ticker, df in frames.items():
+        bars, _ = _bars(df)
+        if len(bars['Close']) < 2:
+            continue
+        for start in range(0, len(grid), chunk_size):
+            jobs.append((ticker, bars, rule, grid.iloc[start:start + chunk_size], cost))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, max(len(jobs), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            tables = list(pool.map(_sweep_chunk, jobs))
+    else:
+        tables = [_sweep_chunk(job) for job in jobs]
+
+    if not tables:
+        return pd.DataFrame(columns=['ticker', *grid.columns])
+    table = pd.concat(tables, ignore_index=True)
+    columns = ['ticker', *grid.columns]
+    table = table[columns + [c for c in table.columns if c not in columns]]
+    return table.sort_values('Sharpe', ascending=False, na_position='last').reset_index(drop=True)
+
+###############################################################################
+# END
+###############################################################################
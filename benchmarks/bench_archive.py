@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the memory-mapped price archive (archive.py): builds an archive
+of synthetic daily bars (500 tickers x 20 years by default), then measures
+the time and the resident memory to open it and to slice (ticker, range)
+views, against the same data held as one pandas DataFrame per ticker.
+
+Run from the repository root:
+    python benchmarks/bench_archive.py [--tickers 500] [--years 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from archive import PriceArchive, build_archive  # noqa: E402
+
+
+def rss_mib():
+    """
+    This function returns the resident memory of the process in MiB (Linux).
+    """
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def synthetic_history(years, end):
+    days = pd.bdate_range(end=end, periods=int(years * 252), tz='America/New_York', name='Date')
+
+    def history(ticker, start, end):
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(days))))
+        return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                             'Close': close, 'Volume': rng.integers(1e5, 1e7, len(days)),
+                             'Dividends': 0.0, 'Stock Splits': 0.0}, index=days)
+    return history, days
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=20)
+    parser.add_argument('--slices', type=int, default=10000)
+    args = parser.parse_args()
+
+    folder = os.path.join(tempfile.mkdtemp(prefix="finapp-archive-"), "archive")
+    tickers = [f'T{i:03d}' for i in range(args.tickers)]
+    history, days = synthetic_history(args.years, '2026-10-16')
+
+    start = time.perf_counter()
+    build_archive(tickers, history, days[0].date(), days[-1].date() + pd.Timedelta(days=1),
+                  folder=folder)
+    print(f"{args.tickers} tickers x {args.years} years ({len(days):,} days each)")
+    print(f"  build            : {time.perf_counter() - start:8.2f} s, "
+          f"{sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder)) / 2**20:.1f} MiB on disk")
+
+    rss = rss_mib()
+    start = time.perf_counter()
+    archive = PriceArchive(folder)
+    for column in ('Date', 'Open', 'High', 'Low', 'Close', 'Volume'):
+        archive.column(column)
+    opened = time.perf_counter() - start
+    print(f"  open             : {opened * 1000:8.2f} ms, +{rss_mib() - rss:.1f} MiB resident")
+
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, args.tickers, args.slices)
+    starts = rng.integers(0, len(days) - 300, args.slices)
+    start = time.perf_counter()
+    for t, s in zip(picks, starts):
+        view = archive.slice(tickers[t], days[s], days[s + 250])
+    sliced = time.perf_counter() - start
+    assert np.shares_memory(view['Close'], archive.column('Close'))
+    print(f"  1y slice (views) : {sliced / args.slices * 1e6:8.1f} us each")
+    start = time.perf_counter()
+    for t, s in zip(picks[:1000], starts[:1000]):
+        df = archive.frame(tickers[t], days[s], days[s + 250])
+    print(f"  1y slice (frame) : {(time.perf_counter() - start) / 1000 * 1e6:8.1f} us each")
+
+    rss = rss_mib()
+    start = time.perf_counter()
+    total = sum(float(archive.slice(t, columns=['Close'])['Close'].sum()) for t in tickers)
+    print(f"  scan all closes  : {(time.perf_counter() - start) * 1000:8.1f} ms, "
+          f"+{rss_mib() - rss:.1f} MiB resident (page cache, shared)")
+
+    rss = rss_mib()
+    start = time.perf_counter()
+    frames = {t: history(t, None, None) for t in tickers}
+    print(f"  pandas frames    : {time.perf_counter() - start:8.2f} s to build, "
+          f"+{rss_mib() - rss:.1f} MiB resident "
+          f"({sum(f.memory_usage(deep=True).sum() for f in frames.values()) / 2**20:.1f} MiB of data)")
+    return 0 if total > 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
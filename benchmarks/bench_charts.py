@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Payload size and build time of the 'MAX' price charts of tabs 1 and 2, with
+the original full-resolution traces on a category axis and with the
+downsampled traces of downsample.py on a date axis.
+
+Run from the repository root:
+    python benchmarks/bench_charts.py [--years 46]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from downsample import downsample_line, downsample_ohlc  # noqa: E402
+
+
+def daily_bars(years):
+    days = pd.bdate_range(end='2026-10-16', periods=int(years * 261), name='Date',
+                          tz='America/New_York')
+    rng = np.random.default_rng(0)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+    return pd.DataFrame({'Open': close * (1 + rng.normal(0, 0.005, len(days))),
+                         'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(1e6, 1e7, len(days))}, index=days)
+
+
+def full_figure(df):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df.index, y=df['Volume'], name='Volume'))
+    fig.add_trace(go.Scatter(x=df.index, y=df['Close'].rolling(50).mean(), mode='lines', name='SMA'))
+    fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', name='Stock Price'))
+    fig.add_trace(go.Candlestick(x=df.index, open=df['Open'], high=df['High'],
+                                 low=df['Low'], close=df['Close'], name='Candlestick'))
+    fig.update_xaxes(type='category')
+    return fig
+
+
+def downsampled_figure(df):
+    fig = go.Figure()
+    candles, resolution = downsample_ohlc(df)
+    sma = downsample_line(df['Close'].rolling(50).mean())
+    close = downsample_line(df['Close'])
+    fig.add_trace(go.Bar(x=candles.index, y=candles['Volume'], name='Volume'))
+    fig.add_trace(go.Scatter(x=sma.index, y=sma, mode='lines', name='SMA'))
+    fig.add_trace(go.Scatter(x=close.index, y=close, mode='lines', name='Stock Price'))
+    fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'],
+                                 low=candles['Low'], close=candles['Close'],
+                                 name=f'{resolution} candles'))
+    return fig
+
+
+def measure(build, df):
+    start = time.perf_counter()
+    payload = build(df).to_json()
+    return time.perf_counter() - start, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--years', type=float, default=46)
+    args = parser.parse_args()
+
+    df = daily_bars(args.years)
+    full_time, full_size = measure(full_figure, df)
+    small_time, small_size = measure(downsampled_figure, df)
+    print(f"{len(df)} daily bars ({args.years:g} years)")
+    print(f"  full resolution : {full_size / 1024:8.0f} KiB, built in {full_time * 1000:6.0f} ms")
+    print(f"  downsampled     : {small_size / 1024:8.0f} KiB, built in {small_time * 1000:6.0f} ms")
+    print(f"  payload ratio   : {full_size / small_size:8.1f}x")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
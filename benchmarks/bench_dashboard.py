@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark of the dashboard: drives the header and every tab of
+finappp.py with Streamlit's AppTest, plus the data-access functions on their
+own, against fixture data (see fixtures.py), without any network.
+
+For each stage it reports the wall time, the peak memory allocated and the
+payload size (figures sent to the browser, frames loaded). With --baseline
+it fails (exit code 1) when a stage got slower or bigger than the stored
+baseline allows. Tracing allocations slows everything down: compare runs
+made with the same options.
+
+Run from the repository root:
+    python benchmarks/bench_dashboard.py                      # synthetic fixtures
+    python benchmarks/bench_dashboard.py --fixtures DIR       # recorded fixtures
+    python benchmarks/bench_dashboard.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_dashboard.py --baseline benchmarks/baseline.json
+
+Fixtures can be recorded (with network) with:
+    python -c "import fixtures; fixtures.record(['AAPL', 'MSFT'], 'fixtures')"
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TICKERS = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL']
+
+
+def setup_environment(args):
+    """
+    This function points the app to the fixtures and to an empty cache
+    folder. It must run before the app modules are imported.
+    """
+    work = tempfile.mkdtemp(prefix="finapp-bench-")
+    fixture_dir = args.fixtures
+    if fixture_dir is None:
+        import fixtures
+        fixture_dir = os.path.join(work, "fixtures")
+        fixtures.make_synthetic(TICKERS, fixture_dir)
+    os.environ["FINAPP_FIXTURES"] = fixture_dir
+    os.environ["FINAPP_CACHE_DIR"] = os.path.join(work, "cache")
+    return fixture_dir
+
+#==============================================================================
+# Stages of the app
+#==============================================================================
+
+def _widget(elements, label):
+    return next(e for e in elements if e.label == label)
+
+
+def app_scenarios(trace_allocations):
+    """
+    This function runs the app through one interaction per tab and returns
+    {stage: record} with the stages recorded by the app itself.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    started = False
+    at = AppTest.from_file(os.path.join(ROOT, "finappp.py"), default_timeout=300)
+
+    def run(scenario, action=None):
+        nonlocal started
+        if action is not None:
+            action(at)
+        if started:
+            # Through the app's own sidebar toggles (the cold start has no
+            # payloads and is never traced)
+            _widget(at.sidebar.toggle, "Show timing panel").set_value(True)
+            if trace_allocations:
+                at.run()
+                _widget(at.sidebar.toggle, "Trace allocations").set_value(True)
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        started = True
+        if at.exception:
+            raise RuntimeError(f"{scenario}: {at.exception[0].value}")
+        results[f"{scenario} | rerun"] = {'seconds': elapsed, 'alloc_bytes': 0, 'payload_bytes': 0}
+        # The recorder of the app's session (see GetRecorder)
+        for stage, record in at.session_state['recorder'].records.items():
+            results[f"{scenario} | {stage}"] = dict(record)
+
+    def section(name):
+        return lambda at: _widget(at.radio, "Section").set_value(name)
+
+    run("cold start")
+    run("warm rerun")
+    run("chart MAX", lambda at: (
+        section("Chart")(at),
+        at.run(),
+        _widget(at.selectbox, "Date Style:").set_value("Time duration"),
+        at.run(),
+        _widget(at.radio, "Select:").set_value("MAX"),
+        _widget(at.multiselect, "Technical indicators:").set_value(["SMA", "RSI"]),
+        at.run(),
+        _widget(at.button, " Update ").click()))
+    run("financials", lambda at: (
+        section("Financials")(at), at.run(),
+        _widget(at.multiselect, "Show:").set_value(["Income statement", "Balance sheet",
+                                                    "Cash flow"])))
+    run("monte carlo", lambda at: (
+        section("Monte-Carlo Simulation")(at), at.run(),
+        _widget(at.slider, "Pick a number of simulations:").set_value(1000),
+        _widget(at.select_slider, "Number of days:").set_value(300)))
+    run("ratios", section("Financial ratios"))
+    return results
+
+#==============================================================================
+# Data-access functions
+#==============================================================================
+
+def function_stages(fixture_dir, trace_allocations):
+    """
+    This function times the data-access and computation functions the tabs
+    use, outside Streamlit.
+    """
+    from config import cache_path
+    from downsample import downsample_line, downsample_ohlc
+    from fixtures import FixtureSource
+    from montecarlo import simulate_price_df
+    from price_store import PriceStore
+    from ratios import ratio_table
+    from timing import Recorder
+
+    rec = Recorder()
+    rec.trace_allocations = trace_allocations
+    source = FixtureSource(fixture_dir)
+    tickers = sorted(os.listdir(fixture_dir))
+    store = PriceStore(path=cache_path("bench-prices.sqlite"), source=source.history)
+
+    with rec.stage("price store: cold history"):
+        df = rec.payload("price store: cold history",
+                         store.history(tickers[0], "1990-01-01", "2026-10-17"))
+    with rec.stage("price store: warm history"):
+        store.history(tickers[0], "1990-01-01", "2026-10-17")
+    with rec.stage("fixtures: info"):
+        for t in tickers:
+            source.info(t)
+    with rec.stage("ratios: all tickers"):
+        ratio_table(tickers, fetch=source.statements)
+    with rec.stage("monte carlo: 1000 x 300"):
+        simulate_price_df(100.0, 0.02, 1000, 300)
+    with rec.stage("downsample: MAX"):
+        downsample_line(df['Close'])
+        downsample_ohlc(df)
+    return {f"functions | {k}": dict(v) for k, v in rec.records.items()}
+
+#==============================================================================
+# Report and baseline
+#==============================================================================
+
+def print_report(results):
+    width = max(len(k) for k in results)
+    print(f"{'stage':<{width}}  {'ms':>9}  {'alloc KiB':>10}  {'payload KiB':>11}")
+    for stage, r in results.items():
+        print(f"{stage:<{width}}  {r['seconds'] * 1000:9.1f}  {r['alloc_bytes'] / 1024:10.1f}"
+              f"  {r['payload_bytes'] / 1024:11.1f}")
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """
+    This function returns the stages slower than tolerance x the baseline
+    (plus slack_ms), or with a bigger payload than tolerance x the baseline.
+    """
+    regressions = []
+    for stage, base in baseline.items():
+        r = results.get(stage)
+        if r is None:
+            continue
+        if r['seconds'] * 1000 > base['seconds'] * 1000 * tolerance + slack_ms:
+            regressions.append(f"{stage}: {r['seconds'] * 1000:.1f} ms "
+                               f"(baseline {base['seconds'] * 1000:.1f} ms)")
+        if r['payload_bytes'] > base['payload_bytes'] * tolerance + 1024:
+            regressions.append(f"{stage}: payload {r['payload_bytes'] / 1024:.1f} KiB "
+                               f"(baseline {base['payload_bytes'] / 1024:.1f} KiB)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='folder of recorded fixtures (default: synthetic)')
+    parser.add_argument('--allocations', action='store_true', help='trace memory allocations')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare with')
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--slack-ms', type=float, default=20.0)
+    parser.add_argument('--skip-app', action='store_true', help='only the data-access functions')
+    args = parser.parse_args()
+
+    fixture_dir = setup_environment(args)
+    results = function_stages(fixture_dir, args.allocations)
+    if not args.skip_app:
+        results.update(app_scenarios(args.allocations))
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.slack_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("\nNo regression against", args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
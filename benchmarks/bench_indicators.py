@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Time to add ten overlays to a 20-year daily chart with indicators.py: a
+first computation, a cache hit, and an append of one new bar. Then checks
+that the cache gives the same results as a full computation, also when the
+values of the bars change on the same dates (today's bar refreshed, the
+history adjusted after a split).
+
+Run from the repository root:
+    python benchmarks/bench_indicators.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from indicators import IndicatorCache, compute  # noqa: E402
+
+OVERLAYS = [('SMA', {'window': w}) for w in (10, 20, 50, 100, 200)] + \
+           [('EMA', {'window': w}) for w in (12, 26)] + \
+           [('Bollinger bands', {}), ('VWAP', {}), ('RSI', {}), ('MACD', {}), ('ATR', {})]
+
+
+def bars(n):
+    days = pd.bdate_range(end='2026-10-16', periods=n, name='Date')
+    rng = np.random.default_rng(0)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                         'Close': close, 'Volume': rng.integers(1e6, 1e7, n)}, index=days)
+
+
+def run(cache, df):
+    start = time.perf_counter()
+    for name, params in OVERLAYS:
+        cache.get('BENCH', df, name, **params)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    df = bars(20 * 252 + 1)
+    history, latest = df.iloc[:-1], df
+    cache = IndicatorCache()
+    print(f"{len(OVERLAYS)} indicators on {len(history)} daily bars")
+    print(f"  first computation : {run(cache, history):7.2f} ms")
+    print(f"  cache hit         : {run(cache, history):7.2f} ms")
+    print(f"  append 1 new bar  : {run(cache, latest):7.2f} ms")
+    print(f"  cache stats       : {cache.stats}")
+
+    # The same dates with other values must not be served from the cache
+    refreshed = latest.copy()
+    refreshed.iloc[-1, refreshed.columns.get_loc('Close')] += 10
+    adjusted = latest.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] /= 2
+    failed = []
+    for label, frame in [("last bar refreshed", refreshed), ("history adjusted", adjusted),
+                         ("append after a change", pd.concat([adjusted, bars(1).set_axis(
+                             [latest.index[-1] + pd.offsets.BDay()])]))]:
+        for name, params in OVERLAYS:
+            got = cache.get('BENCH', frame, name, **params)
+            expected = compute(frame, name, **params)
+            if not np.allclose(got.to_numpy(float), expected.to_numpy(float), equal_nan=True):
+                failed.append(f"{label}: {name} {params}")
+    print(f"  changed values    : {'FAIL ' + ', '.join(failed) if failed else 'ok'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
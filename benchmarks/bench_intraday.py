@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the intraday ring buffers: replays a session of synthetic
+1 minute bars (see fixtures.py) one poll at a time, and compares the
+incremental update (only the bars after the last one kept) with re-fetching
+and rebuilding the whole day at every poll. The feed is local here, so the
+number of bars asked from the feed at every poll is what matters for a real
+(network) feed; the times show the cost of the buffer itself.
+
+Run from the repository root:
+    python benchmarks/bench_intraday.py [--tickers 20] [--interval 1m]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fixtures import FixtureSource, make_synthetic  # noqa: E402
+from intraday import IntradayStream, ReplayFeed  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickers', type=int, default=20)
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--polls', type=int, default=390)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="finapp-intraday-")
+    tickers = [f'T{i}' for i in range(args.tickers)]
+    make_synthetic(tickers, folder, years=1)
+    source = FixtureSource(folder)
+
+    # The replay clock moves one minute per poll
+    clock = [0.0]
+    feed = ReplayFeed(source.intraday, speed=60, warmup=0, clock=lambda: clock[0])
+    stream = IntradayStream(feed)
+    for t in tickers:
+        stream.update(t, args.interval)
+
+    incremental = rebuild = 0.0
+    sent_new = sent_all = 0
+    for _ in range(args.polls):
+        clock[0] += 1
+        for t in tickers:
+            start = time.perf_counter()
+            buffer = stream.buffer(t, args.interval)
+            position = stream.update(t, args.interval)
+            new = buffer.since(position)
+            incremental += time.perf_counter() - start
+            sent_new += len(new)
+
+            # Whole day again: every bar of the session, rebuilt into a frame
+            start = time.perf_counter()
+            day = feed(t, args.interval)
+            day = pd.DataFrame(day.to_numpy(), index=day.index, columns=day.columns)
+            rebuild += time.perf_counter() - start
+            sent_all += len(day)
+
+    print(f"{args.tickers} tickers x {args.polls} polls of {args.interval} bars")
+    print(f"  incremental update : {incremental * 1000:9.1f} ms, {sent_new:>9,} bars handed out")
+    print(f"  whole day rebuilt  : {rebuild * 1000:9.1f} ms, {sent_all:>9,} bars handed out")
+    print(f"  bars per poll      : {sent_new / args.polls / args.tickers:9.1f} vs "
+          f"{sent_all / args.polls / args.tickers:.1f}")
+    print(f"  feed stats         : {stream.stats}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the vectorized Monte Carlo engine against the original nested
+loop of render_tab4 (1000 simulations x 300 days by default).
+
+With --large, also runs the chunked mode (simulate_price_summary) for
+100k and 1M paths. tracemalloc does not see the worker processes, so the
+peak traced memory is measured on a run with one worker (in this process),
+and should stay roughly the same for both sizes; the peak resident memory
+of the largest worker process of the parallel runs is reported too.
+
+With --portfolio, also runs the correlated portfolio simulation
+(simulate_portfolio) for 50 assets x 10k paths x 252 days on synthetic
+prices and fails when it takes more than --max-portfolio-seconds.
+
+Run from the repository root:
+    python benchmarks/bench_montecarlo.py [--large] [--portfolio]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from montecarlo import (simulate_portfolio, simulate_price_df,  # noqa: E402
+                        simulate_price_summary)
+
+
+def legacy_simulation(last_price, daily_volatility, simulations, time_horizon):
+    """
+    The original render_tab4 loop: one np.random.normal call per day and one
+    pd.concat per simulation.
+    """
+    np.random.seed(123)
+    simulation_df = pd.DataFrame()
+    for i in range(simulations):
+        next_price = []
+        price = last_price
+        for j in range(time_horizon):
+            future_return = np.random.normal(0, daily_volatility)
+            future_price = price * (1 + future_return)
+            next_price.append(future_price)
+            price = future_price
+        next_price_df = pd.Series(next_price, name='sim' + str(i))
+        simulation_df = pd.concat([simulation_df, next_price_df], axis=1)
+    return simulation_df
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=300)
+    parser.add_argument('--min-speedup', type=float, default=50.0)
+    parser.add_argument('--large', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--portfolio', action='store_true')
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--max-portfolio-seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    last_price, vol = 150.0, 0.02
+
+    legacy = best_of(lambda: legacy_simulation(last_price, vol, args.simulations, args.days), 1)
+    fast64 = best_of(lambda: simulate_price_df(last_price, vol, args.simulations, args.days), 5)
+    fast32 = best_of(lambda: simulate_price_df(last_price, vol, args.simulations, args.days,
+                                               dtype=np.float32), 5)
+
+    speedup = legacy / fast64
+    print(f"{args.simulations} simulations x {args.days} days")
+    print(f"  legacy loop       : {legacy * 1000:10.1f} ms")
+    print(f"  vectorized float64: {fast64 * 1000:10.1f} ms")
+    print(f"  vectorized float32: {fast32 * 1000:10.1f} ms")
+    print(f"  speedup (float64) : {speedup:10.1f}x")
+
+    if args.large:
+        for n in (100000, 1000000):
+            start = time.perf_counter()
+            simulate_price_summary(last_price, vol, n, args.days, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            # ru_maxrss is in KiB on Linux: the largest child since the start
+            worker_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+            tracemalloc.start()
+            simulate_price_summary(last_price, vol, n, args.days, workers=1)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            line = f"  chunked {n:>9,} paths: {elapsed:8.2f} s, peak {peak / 2**20:8.1f} MiB (1 worker)"
+            if (args.workers or os.cpu_count() or 1) > 1:
+                line += f", largest worker {worker_rss:8.1f} MiB RSS"
+            print(line)
+
+    failed = False
+    if args.portfolio:
+        # Synthetic history: one common factor plus an idiosyncratic part
+        rng = np.random.default_rng(0)
+        factor = rng.normal(0, 0.01, (1000, 1))
+        returns = 0.8 * factor + rng.normal(0, 0.012, (1000, args.assets))
+        prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0),
+                              columns=[f'A{i}' for i in range(args.assets)])
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = simulate_portfolio(prices, np.ones(args.assets), value=1e6,
+                                    simulations=10000, time_horizon=252, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  portfolio {args.assets} assets x 10,000 paths x 252 days: {elapsed:6.2f} s, "
+              f"peak {peak / 2**20:6.1f} MiB, VaR 95% {result['var']:,.0f}, "
+              f"CVaR 95% {result['cvar']:,.0f}")
+        if elapsed > args.max_portfolio_seconds:
+            print(f"FAIL: portfolio simulation slower than {args.max_portfolio_seconds} s")
+            failed = True
+
+    if speedup < args.min_speedup:
+        print(f"FAIL: speedup below {args.min_speedup}x")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
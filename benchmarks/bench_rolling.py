@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the rolling beta, volatility and correlation (rolling.py):
+random close prices of many tickers and a benchmark (500 tickers x 10 years
+by default), computed at once on NumPy arrays, against pandas rolling
+cov / var / std / corr on the same prices. Also checks that both agree.
+
+Run from the repository root:
+    python benchmarks/bench_rolling.py [--tickers 500] [--years 10] [--window 63]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rolling import TRADING_DAYS, rolling_stats  # noqa: E402
+
+
+def synthetic_prices(tickers, years, seed=0):
+    rng = np.random.default_rng(seed)
+    days = int(years * TRADING_DAYS)
+    market = rng.normal(0.0003, 0.01, days)
+    returns = market[:, None] * rng.uniform(0.3, 1.8, tickers) + rng.normal(0, 0.015, (days, tickers))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)),
+                          index=pd.bdate_range(end='2026-10-16', periods=days),
+                          columns=[f'T{i}' for i in range(tickers)])
+    prices['SPY'] = 100 * np.exp(np.cumsum(market))
+    return prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--window', type=int, default=63)
+    args = parser.parse_args()
+
+    prices = synthetic_prices(args.tickers, args.years)
+
+    start = time.perf_counter()
+    stats = rolling_stats(prices, 'SPY', args.window, min_periods=args.window)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    returns = prices.pct_change().iloc[1:]
+    market = returns.pop('SPY')
+    rolling = returns.rolling(args.window)
+    beta = rolling.cov(market).div(market.rolling(args.window).var(), axis=0)
+    volatility = rolling.std() * np.sqrt(TRADING_DAYS)
+    correlation = rolling.corr(market)
+    with_pandas = time.perf_counter() - start
+
+    error = max(float(np.nanmax(np.abs(stats['beta'].to_numpy() - beta.to_numpy()))),
+                float(np.nanmax(np.abs(stats['volatility'].to_numpy() - volatility.to_numpy()))),
+                float(np.nanmax(np.abs(stats['correlation'].to_numpy() - correlation.to_numpy()))))
+
+    print(f"{args.tickers} tickers x {len(prices)} days, window {args.window}")
+    print(f"  numpy, all tickers at once : {vectorized * 1000:8.1f} ms")
+    print(f"  pandas rolling             : {with_pandas * 1000:8.1f} ms")
+    print(f"  largest difference         : {error:.2e}")
+    return 0 if error < 1e-8 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the shared cache (shared_cache.py): several worker processes,
+each serving several sessions (threads), all pick the same tickers at the
+same time. The source is a stand-in for Yahoo that sleeps --latency seconds
+and counts its calls in a file. Without the cache every session calls the
+source; with it, one call per ticker is made and the others wait for it.
+
+Run from the repository root:
+    python benchmarks/bench_shared_cache.py [--processes 4] [--sessions 10]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared_cache import SharedCache  # noqa: E402
+
+
+def slow_source(log, latency):
+    def fetch(ticker):
+        with open(log, 'a') as f:
+            f.write(ticker + '\n')
+        time.sleep(latency)
+        return {'symbol': ticker, 'payload': 'x' * 10000}
+    return fetch
+
+
+def worker(path, log, tickers, sessions, latency, cached):
+    """
+    This function is one worker process: `sessions` threads that each ask
+    for all the tickers.
+    """
+    fetch = slow_source(log, latency)
+    if cached:
+        cache = SharedCache(path)
+        fetch = cache.wrap('info', fetch)
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(lambda _: [fetch(t) for t in tickers], range(sessions)))
+    if cached:
+        # The counters are written to the database in batches
+        cache.flush()
+
+
+def run(args, cached):
+    folder = tempfile.mkdtemp(prefix="finapp-shared-")
+    path, log = os.path.join(folder, "shared.sqlite"), os.path.join(folder, "calls.log")
+    open(log, 'w').close()
+    tickers = [f'T{i}' for i in range(args.tickers)]
+    # Fresh processes: an SQLite database must not be carried across fork()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(args.processes, mp_context=context) as pool:
+        # Start the processes first, so the timing is the requests only
+        list(pool.map(time.sleep, [0.1] * args.processes))
+        start = time.perf_counter()
+        list(pool.map(worker, *zip(*[(path, log, tickers, args.sessions, args.latency, cached)]
+                                   * args.processes)))
+        seconds = time.perf_counter() - start
+    with open(log) as f:
+        calls = len(f.read().split())
+    counters = SharedCache(path).counters() if cached else None
+    return seconds, calls, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--tickers', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    requests = args.processes * args.sessions * args.tickers
+    print(f"{args.processes} processes x {args.sessions} sessions x {args.tickers} tickers "
+          f"= {requests} requests, {args.latency * 1000:.0f} ms per source call")
+    for cached in (False, True):
+        seconds, calls, counters = run(args, cached)
+        name = "shared cache" if cached else "no cache"
+        print(f"  {name:13}: {seconds:6.2f} s, {calls:4d} source calls")
+    print(counters.to_string())
+    return 0 if calls == args.tickers else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Cold-start benchmark of the dashboard, each measure in a fresh interpreter:
+
+- import time of finappp.py (after Streamlit, which the server has already
+  imported), from `python -X importtime`, with the packages it pulls in;
+- first run of the app with Streamlit's AppTest on an empty cache folder
+  (synthetic fixtures, no network), and the time until the header is
+  rendered (see timing.py).
+
+Every measure is the best of --repeat runs. With --baseline it fails (exit
+code 1) when a measure got slower than the stored baseline allows, so the
+cold-start time can be tracked from release to release.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --save-baseline benchmarks/startup.json
+    python benchmarks/bench_startup.py --baseline benchmarks/startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TICKERS = ['AAPL', 'MSFT']
+
+#==============================================================================
+# Import time
+#==============================================================================
+
+def parse_importtime(stderr):
+    """
+    This function reads the output of -X importtime: a list of (self us,
+    cumulative us, depth, module), children before their parent.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((int(own), int(cumulative), depth, name.strip()))
+    return rows
+
+
+def import_times(env):
+    """
+    This function imports Streamlit then finappp in a new interpreter, and
+    returns the import time of finappp (ms) and of each package it imported
+    first (ms, by cumulative time).
+    """
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                           "import streamlit; import finappp"],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = parse_importtime(done.stderr)
+    start = max(i for i, r in enumerate(rows) if r[2] == 0 and r[3] == 'streamlit') + 1
+    end = next(i for i, r in enumerate(rows) if r[2] == 0 and r[3] == 'finappp')
+    packages = {}
+    for own, cumulative, depth, name in rows[start:end]:
+        if depth == 1:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + cumulative / 1000
+    return rows[end][1] / 1000, packages
+
+#==============================================================================
+# First run of the app
+#==============================================================================
+
+def first_run_child():
+    """
+    This function runs in the child process: the first two runs of the app
+    on an empty cache. Prints the times as JSON.
+    """
+    import time
+    work = tempfile.mkdtemp(prefix="finapp-startup-")
+    import fixtures
+    fixtures.make_synthetic(TICKERS, os.path.join(work, "fixtures"), years=5)
+    os.environ["FINAPP_FIXTURES"] = os.path.join(work, "fixtures")
+    os.environ["FINAPP_CACHE_DIR"] = os.path.join(work, "cache")
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "finappp.py"), default_timeout=300)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    header = at.session_state['recorder'].records['header']['seconds']
+    start = time.perf_counter()
+    at.run()
+    second = time.perf_counter() - start
+    print(json.dumps({'first run ms': first * 1000, 'header ms': header * 1000,
+                      'rerun ms': second * 1000, 'errors': len(at.exception)}))
+
+
+def first_run(env):
+    done = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+#==============================================================================
+# Report and baseline
+#==============================================================================
+
+def compare(results, baseline, tolerance, slack_ms):
+    """
+    This function returns the measures slower than tolerance x the baseline
+    (plus slack_ms).
+    """
+    return [f"{name}: {results[name]:.1f} ms (baseline {base:.1f} ms)"
+            for name, base in baseline.items()
+            if name in results and results[name] > base * tolerance + slack_ms]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=12, help='packages shown')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare with')
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--slack-ms', type=float, default=50.0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return first_run_child()
+
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    imports = [import_times(env) for _ in range(args.repeat)]
+    import_ms, packages = min(imports, key=lambda r: r[0])
+    runs = [first_run(env) for _ in range(args.repeat)]
+    results = {'import finappp ms': import_ms,
+               **{name: min(r[name] for r in runs) for name in ('header ms', 'first run ms',
+                                                                'rerun ms')}}
+
+    print("Packages imported by finappp (cumulative ms):")
+    for package, ms in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {package:<24} {ms:9.1f}")
+    print("\nCold start (best of", args.repeat, "runs):")
+    for name, ms in results.items():
+        print(f"  {name:<24} {ms:9.1f}")
+    if any(r['errors'] for r in runs):
+        print("\nThe app raised an exception during the runs")
+        return 1
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.slack_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("\nNo regression against", args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
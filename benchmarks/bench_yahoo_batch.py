@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the batch quoteSummary fetcher (yahoo.fetch_quote_summaries)
+against a local stub server with a fixed latency per request, compared with
+fetching the tickers one after the other with YFinance(ticker).info.
+
+Run from the repository root:
+    python benchmarks/bench_yahoo_batch.py [--tickers 500] [--latency 0.05]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from yahoo import YFinance, fetch_quote_summaries  # noqa: E402
+from yahoo_stub import YahooStub  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate-limit', type=float, default=None)
+    parser.add_argument('--sequential', type=int, default=50,
+                        help='number of tickers for the sequential baseline')
+    args = parser.parse_args()
+
+    stub = YahooStub(latency=args.latency).start()
+    YFinance.cookie_url = YFinance.query_url = stub.url
+    tickers = [f"T{i:04d}" for i in range(args.tickers)] + ["BAD TICKER"]
+    try:
+        start = time.perf_counter()
+        for ticker in tickers[:args.sequential]:
+            YFinance(ticker).info
+        sequential = (time.perf_counter() - start) / args.sequential
+
+        stub.calls.clear()
+        start = time.perf_counter()
+        df = fetch_quote_summaries(tickers, max_workers=args.workers,
+                                   rate_limit=args.rate_limit)
+        batch = time.perf_counter() - start
+    finally:
+        stub.stop()
+
+    print(f"{len(tickers)} tickers, {args.latency * 1000:.0f} ms latency per request")
+    print(f"  sequential : {1 / sequential:8.1f} tickers/s")
+    print(f"  batch      : {len(tickers) / batch:8.1f} tickers/s ({batch:.2f} s)")
+    print(f"  requests   : {dict(stub.calls)}")
+    print(f"  rows ok    : {df['error'].isna().sum()}, errors: {df['error'].notna().sum()}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Local stub HTTP server standing in for the Yahoo endpoints used by yahoo.py
+(cookie, getcrumb and quoteSummary), for the benchmarks and manual checks.
+
+    server = YahooStub(latency=0.05).start()
+    YFinance.cookie_url = YFinance.query_url = server.url
+    ...
+    server.stop()
+"""
+
+import json
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class YahooStub:
+
+    def __init__(self, latency=0.0, crumb="stubcrumb"):
+        self.latency = latency
+        self.crumb = crumb
+        self.calls = Counter()
+        self.connections = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=()):
+                data = body.encode()
+                self.send_response(status)
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                time.sleep(stub.latency)
+                if url.path == "/":
+                    stub._count("cookie")
+                    self._send(404, "", [("Set-Cookie", "A3=stubcookie; Path=/")])
+                elif url.path == "/v1/test/getcrumb":
+                    stub._count("crumb")
+                    self._send(200, stub.crumb)
+                elif url.path.startswith("/v10/finance/quoteSummary/"):
+                    stub._count("quoteSummary")
+                    if query.get("crumb", [None])[0] != stub.crumb:
+                        body = {"finance": {"result": None, "error": {
+                            "code": "Unauthorized", "description": "Invalid Crumb"}}}
+                        self._send(401, json.dumps(body))
+                        return
+                    ticker = urllib.parse.unquote(url.path.rsplit("/", 1)[1])
+                    if not ticker.replace(".", "").replace("-", "").isalnum():
+                        body = {"quoteSummary": {"result": None, "error": {
+                            "code": "Not Found", "description": "Quote not found"}}}
+                        self._send(404, json.dumps(body))
+                        return
+                    self._send(200, json.dumps(stub.quote_summary(ticker)),
+                               [("Content-Type", "application/json")])
+                else:
+                    self._send(404, "")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    @staticmethod
+    def quote_summary(ticker):
+        seed = sum(map(ord, ticker))
+        return {"quoteSummary": {"error": None, "result": [{
+            "assetProfile": {"longBusinessSummary": f"{ticker} stub company.",
+                             "sector": "Technology", "country": "United States",
+                             "fullTimeEmployees": 1000 + seed},
+            "summaryDetail": {"beta": {"raw": 0.5 + seed % 100 / 100, "fmt": ""},
+                              "marketCap": {"raw": seed * 1e9, "fmt": ""},
+                              "volume": {"raw": seed * 1000, "fmt": ""}},
+            "financialData": {"returnOnEquity": {"raw": seed % 40 / 100, "fmt": ""}},
+        }]}}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
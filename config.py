@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# SETTINGS SHARED BY THE DASHBOARD MODULES
+###############################################################################
+
+import os
+
+# Folder for the local data stores (prices, snapshots, ...). It can be moved
+# with the FINAPP_CACHE_DIR environment variable.
+CACHE_DIR = os.environ.get(
+    "FINAPP_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# Tickers loaded in the background when the app starts, e.g. "AAPL,MSFT"
+WATCHLIST = [t.strip() for t in os.environ.get("FINAPP_WATCHLIST", "").split(",") if t.strip()]
+
+# Folder of recorded data (see fixtures.py): when set, the app reads it
+# instead of calling Yahoo Finance
+FIXTURE_DIR = os.environ.get("FINAPP_FIXTURES")
+
+# Pace of the replay of recorded intraday bars (60: one minute per second)
+REPLAY_SPEED = float(os.environ.get("FINAPP_REPLAY_SPEED", "60"))
+
+
+def cache_path(*parts):
+    """
+    This function returns a path inside CACHE_DIR, creating the folder if needed.
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# DOWNSAMPLING OF LONG PRICE CHARTS
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import numpy as np
+import pandas as pd
+
+# Width of the charts in pixels (Streamlit does not tell the real width; this
+# is the width of a wide layout on a large screen).
+CHART_WIDTH_PX = 1200
+
+# Lines keep about 1 point per pixel, candles need about 2 pixels each
+POINTS_PER_PX = 1
+PX_PER_CANDLE = 2
+
+# Candle resolutions, from the finest to the coarsest
+OHLC_RULES = [('Daily', None), ('Weekly', 'W-FRI'), ('Monthly', 'ME'),
+              ('Quarterly', 'QE'), ('Yearly', 'YE')]
+
+#==============================================================================
+# Lines: largest-triangle-three-buckets
+#==============================================================================
+
+def lttb_indices(x, y, n_out):
+    """
+    This function returns the positions of the points kept by the LTTB
+    algorithm (largest triangle three buckets): the first and last points,
+    plus in each of the n_out - 2 buckets the point that makes the largest
+    triangle with the point kept in the previous bucket and the average of
+    the next bucket. This keeps the peaks and troughs that a plain
+    "one point out of k" would lose.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # NaN (e.g. the start of a moving average) would win no triangle
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    # Average point of every bucket (the last "next bucket" is the last point)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a])
+                      - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def lttb(series, n_out):
+    """
+    This function downsamples a Series with a DatetimeIndex (or a numeric
+    index) to about n_out points with LTTB.
+    """
+    if len(series) <= n_out:
+        return series
+    index = series.index
+    if isinstance(index, pd.DatetimeIndex):
+        x = index.asi8
+    else:
+        x = np.asarray(index, dtype=np.float64)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), n_out)]
+
+
+def line_points(width_px=CHART_WIDTH_PX):
+    """
+    This function returns the number of points a line needs at that width.
+    """
+    return int(width_px * POINTS_PER_PX)
+
+
+def downsample_line(series, width_px=CHART_WIDTH_PX):
+    """
+    This function downsamples a line to what the chart can show.
+    """
+    return lttb(series, line_points(width_px))
+
+#==============================================================================
+# Candles: OHLC resampling
+#==============================================================================
+
+def resample_ohlc(df, rule):
+    """
+    This function groups daily bars into bars of a pandas frequency
+    ('W-FRI', 'ME', ...): first open, highest high, lowest low, last close,
+    total volume. df has a DatetimeIndex.
+    """
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+    if 'Volume' in df:
+        agg['Volume'] = 'sum'
+    bars = df.resample(rule).agg(agg).dropna(subset=['Close'])
+    # Date each bar with its last trading day, not the end of the period
+    last_day = pd.Series(df.index, index=df.index).resample(rule).last()
+    bars.index = pd.DatetimeIndex(last_day.loc[bars.index], name=df.index.name)
+    return bars
+
+
+def choose_ohlc_rule(index, width_px=CHART_WIDTH_PX):
+    """
+    This function picks the finest candle resolution that fits in the chart
+    for the visible date range. Returns (name, pandas rule or None).
+    """
+    max_candles = width_px / PX_PER_CANDLE
+    if len(index) <= max_candles:
+        return OHLC_RULES[0]
+    days = (index[-1] - index[0]).days + 1
+    for name, rule in OHLC_RULES[1:]:
+        periods = {'W-FRI': 7, 'ME': 30.4, 'QE': 91.3, 'YE': 365.25}[rule]
+        if days / periods <= max_candles:
+            return name, rule
+    return OHLC_RULES[-1]
+
+
+def downsample_ohlc(df, width_px=CHART_WIDTH_PX):
+    """
+    This function returns the candles to draw for daily bars (DatetimeIndex)
+    and the name of the resolution used.
+    """
+    name, rule = choose_ohlc_rule(df.index, width_px)
+    if rule is None:
+        return df, name
+    return resample_ohlc(df, rule), name
+
+###############################################################################
+# END
+###############################################################################
@@ -8,107 +8,320 @@
 #==============================================================================
 
 # Libraries
+import multiprocessing
+import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import yfinance as yf
+from datetime import date, datetime, timedelta
 import streamlit as st
+from montecarlo import simulate_portfolio, simulate_price_df, simulate_price_summary
+from price_store import PriceStore
+from statement_store import StatementStore, earnings_date
+from shared_cache import SharedCache
+from archive import PriceArchive, build_archive
+from universe import SOURCES, TickerUniverse, load_csv
+from screener import FIELDS, Screener
+from ratios import RATIOS, compute_ratios, ratio_table, statements_panel
+from rolling import BENCHMARKS, WINDOWS, latest_stats, rolling_stats
+from prefetch import Prefetcher
+from config import FIXTURE_DIR, WATCHLIST
+from downsample import downsample_line, downsample_ohlc
+from indicators import INDICATORS, IndicatorCache
+from backtest import DEFAULTS, RULES, backtest, sweep
+from intraday import INTERVALS, IntradayStream
+from plotly.subplots import make_subplots
+from timing import Recorder
 #==============================================================================
 # HOT FIX FOR YFINANCE .INFO METHOD
 # Ref: https://github.com/ranaroussi/yfinance/issues/1729
 #==============================================================================
+# See yahoo.py, used through the data sources below
 
-import requests
-import urllib
+#==============================================================================
+# Data sources
+#==============================================================================
+# Yahoo Finance, or recorded data when FINAPP_FIXTURES is set (see sources.py)
 
-class YFinance:
-    user_agent_key = "User-Agent"
-    user_agent_value = ("Mozilla/5.0 (Windows NT 6.1; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/58.0.3029.110 Safari/537.36")
-    
-    def __init__(self, ticker):
-        self.yahoo_ticker = ticker
-
-    def __str__(self):
-        return self.yahoo_ticker
-
-    def _get_yahoo_cookie(self):
-        cookie = None
-
-        headers = {self.user_agent_key: self.user_agent_value}
-        response = requests.get("https://fc.yahoo.com",
-                                headers=headers,
-                                allow_redirects=True)
-
-        if not response.cookies:
-            raise Exception("Failed to obtain Yahoo auth cookie.")
-
-        cookie = list(response.cookies)[0]
-
-        return cookie
-
-    def _get_yahoo_crumb(self, cookie):
-        crumb = None
-
-        headers = {self.user_agent_key: self.user_agent_value}
-
-        crumb_response = requests.get(
-            "https://query1.finance.yahoo.com/v1/test/getcrumb",
-            headers=headers,
-            cookies={cookie.name: cookie.value},
-            allow_redirects=True,
-        )
-        crumb = crumb_response.text
-
-        if crumb is None:
-            raise Exception("Failed to retrieve Yahoo crumb.")
-
-        return crumb
-
-    @property
-    def info(self):
-        # Yahoo modules doc informations :
-        # https://cryptocointracker.com/yahoo-finance/yahoo-finance-api
-        cookie = self._get_yahoo_cookie()
-        crumb = self._get_yahoo_crumb(cookie)
-        info = {}
-        ret = {}
-
-        headers = {self.user_agent_key: self.user_agent_value}
-
-        yahoo_modules = ("assetProfile,"  # longBusinessSummary
-                         "summaryDetail,"
-                         "financialData,"
-                         "indexTrend,"
-                         "defaultKeyStatistics")
-
-        url = ("https://query1.finance.yahoo.com/v10/finance/"
-               f"quoteSummary/{self.yahoo_ticker}"
-               f"?modules={urllib.parse.quote_plus(yahoo_modules)}"
-               f"&ssl=true&crumb={urllib.parse.quote_plus(crumb)}")
-
-        info_response = requests.get(url,
-                                     headers=headers,
-                                     cookies={cookie.name: cookie.value},
-                                     allow_redirects=True)
-
-        info = info_response.json()
-        info = info['quoteSummary']['result'][0]
-
-        for mainKeys in info.keys():
-            for key in info[mainKeys].keys():
-                if isinstance(info[mainKeys][key], dict):
-                    try:
-                        ret[key] = info[mainKeys][key]['raw']
-                    except (KeyError, TypeError):
-                        pass
-                else:
-                    ret[key] = info[mainKeys][key]
+from sources import (STATEMENTS, FetchHistory, FetchHolders, FetchInfo, FetchInfoMany,
+                     FetchIntraday, FetchStatement)
+
+#==============================================================================
+# Worker processes
+#==============================================================================
+# Simulations and sweeps run on process pools. The server is threaded and
+# holds SQLite handles, so it is never forked: the workers are started by a
+# fork server (spawned where there is none), at most POOL_WORKERS per job.
 
-        return ret
+POOL_WORKERS = min(4, os.cpu_count() or 1)
+POOL_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+@st.cache_resource
+def GetSharedCache():
+    """
+    This function returns the cache of the data sources shared by all the
+    sessions and worker processes (see shared_cache.py): when several
+    sessions ask for the same data at once, only one request is made.
+    """
+    cache = SharedCache()
+    cache.purge()
+    return cache
+
+def SharedFetch(dataset, fetch):
+    """
+    This function returns a data source whose calls go through the shared
+    cache (dataset: its name in shared_cache.TTLS).
+    """
+    return GetSharedCache().wrap(dataset, fetch)
+
+@st.cache_data(ttl=60 * 60)
+def GetAllCompanyInfo(tickers):
+    """
+    This function get the profile and key statistics of many tickers at once.
+    A ticker that fails has its error in the 'error' column.
+    """
+    return SharedFetch('info_many', FetchInfoMany)(tickers)
+
+#==============================================================================
+# Local price store
+#==============================================================================
+
+@st.cache_resource
+def GetPriceStore():
+    """
+    This function returns the on-disk price store shared by all the tabs
+    (see price_store.py). Only the date ranges not stored yet are downloaded.
+    """
+    return PriceStore(source=SharedFetch('history', FetchHistory))
+
+@st.cache_resource
+def GetArchive():
+    """
+    This function opens the memory-mapped price archive (see archive.py), or
+    returns None when it was not built yet.
+    """
+    try:
+        return PriceArchive()
+    except (OSError, ValueError):
+        return None
+
+def GetHistory(ticker, start, end):
+    """
+    This function returns the daily bars of the ticker for [start, end). The
+    dates in the archive are zero-copy views of it, so nothing is cached per
+    date range; the other dates (e.g. after the archive was built) come from
+    the price store.
+    """
+    start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+    archive = GetArchive()
+    if archive is None or ticker not in archive or start < archive.start:
+        return GetPriceStore().history(ticker, start, end)
+    old = archive.frame(ticker, start, min(end, archive.end))
+    if end <= archive.end:
+        return old
+    recent = GetPriceStore().history(ticker, max(start, archive.end), end)
+    if recent.reindex(columns=['Dividends', 'Stock Splits']).fillna(0).to_numpy().any():
+        # Adjusted for a split or dividend the archive has not seen
+        return GetPriceStore().history(ticker, start, end)
+    return pd.concat([old, recent.reindex(columns=old.columns)])
+
+@st.cache_resource
+def GetIntradayStream():
+    """
+    This function returns the ring buffers of intraday bars shared by all the
+    sessions (see intraday.py).
+    """
+    return IntradayStream(FetchIntraday)
+
+@st.cache_data(ttl=60 * 60)
+def GetClosePrices(tickers, start, end):
+    """
+    This function returns the close prices of several tickers, one column
+    per ticker, aligned on the trading days.
+    """
+    return GetPriceStore().closes(list(tickers), start, end)
+
+@st.cache_data(ttl=60 * 60)
+def GetRollingStats(tickers, benchmark, window, years):
+    """
+    This function computes the rolling beta, volatility and correlation of
+    the tickers against the benchmark over the last years (see rolling.py),
+    from the stored close prices.
+    """
+    end = date.today() + timedelta(days=1)
+    # One more window of prices, so the first day shown has a full window
+    start = end - timedelta(days=int(365.25 * years + window * 7 / 5) + 1)
+    prices = GetClosePrices(tuple(dict.fromkeys((*tickers, benchmark))), start, end)
+    return rolling_stats(prices, benchmark, window), start + timedelta(days=int(window * 7 / 5))
+
+@st.cache_resource
+def GetIndicatorCache():
+    """
+    This function returns the cache of the technical indicators (see
+    indicators.py): new bars are appended to the cached results.
+    """
+    return IndicatorCache()
+
+#==============================================================================
+# Prefetch of the selected ticker
+#==============================================================================
+
+@st.cache_resource
+def GetStatementStore():
+    """
+    This function returns the on-disk store of the statements and holders
+    (see statement_store.py). They are downloaded again only when the
+    company is expected to have filed a new period, or the day after its
+    next earnings release (from the company information).
+    """
+    # The same shared request as LoadInfo: the statements loaded at the same
+    # time wait for it instead of deciding without the earnings date
+    info = SharedFetch('info', FetchInfo)
+    return StatementStore(SharedFetch('statement', FetchStatement),
+                          SharedFetch('holders', FetchHolders),
+                          earnings=lambda t: earnings_date(info(t)))
+
+def LoadInfo(ticker):
+    """
+    This function gets the company information, and gives its next earnings
+    date to the statement store.
+    """
+    info = SharedFetch('info', FetchInfo)(ticker)
+    GetStatementStore().set_earnings_date(ticker, earnings_date(info))
+    return info
+
+@st.cache_resource
+def GetPrefetcher():
+    """
+    This function returns the background loader of the ticker data (see
+    prefetch.py). When the ticker changes, all its data is requested at once
+    and the tabs wait only for what they show. The tickers of the watchlist
+    (FINAPP_WATCHLIST) are loaded when the app starts.
+    """
+    store = GetPriceStore()
+    statements = GetStatementStore()
+    loaders = {
+        'info': LoadInfo,
+        'holders': statements.holders,
+        # Fills the local price store: the tabs then read their range from disk
+        'history': lambda t: store.history(t, date.today() - timedelta(days=5 * 365),
+                                           date.today() + timedelta(days=1)),
+    }
+    # One job per statement, so they are downloaded in parallel
+    for name in STATEMENTS:
+        loaders[name] = lambda t, name=name: statements.statement(t, name)
+
+    prefetcher = Prefetcher(loaders)
+    if WATCHLIST:
+        prefetcher.warm_up(WATCHLIST)
+    return prefetcher
+
+#==============================================================================
+# Financial ratios
+#==============================================================================
+
+@st.cache_data(ttl=24 * 60 * 60)
+def GetRatioTable(tickers):
+    """
+    This function computes the financial ratios of the tickers (one row per
+    ticker and period) and the download errors.
+    """
+    return ratio_table(list(tickers), fetch=GetStatementStore().statements)
+
+#==============================================================================
+# Ticker universe
+#==============================================================================
+
+@st.cache_resource
+def GetUniverse(name):
+    """
+    This function returns the ticker universe (see universe.py). It is loaded
+    once per process from the local snapshot and refreshed in the background.
+    """
+    # Recorded runs never download a new version
+    return TickerUniverse(name, ttl=float('inf') if FIXTURE_DIR else 24 * 60 * 60)
+
+@st.cache_data
+def GetCustomUniverse(data):
+    """
+    This function reads a universe from the bytes of an uploaded CSV file.
+    """
+    import io
+    return load_csv(io.BytesIO(data))
+
+#==============================================================================
+# Stock screener
+#==============================================================================
+
+@st.cache_resource
+def GetScreener():
+    """
+    This function returns the screener (see screener.py): the key statistics
+    of the whole universe in a columnar snapshot, refreshed in the background.
+    """
+    return Screener(SharedFetch('info_many', FetchInfoMany), ttl=float('inf') if FIXTURE_DIR else 24 * 60 * 60)
+
+def SelectFromScreener():
+    """
+    This function selects the ticker of the row clicked in the screener.
+    """
+    rows = st.session_state['screener_table']['selection']['rows']
+    if rows:
+        st.session_state['ticker'] = st.session_state['screener_rows'][rows[0]]
+
+def render_screener(tickers):
+    """
+    This function shows the screener: range filters on the key statistics
+    and the top companies by one of them. Clicking a row selects its ticker.
+    """
+    with st.expander("Stock screener"):
+        # Expanders render their content even when closed: load nothing
+        # (and refresh nothing) until the screener is used
+        if not st.checkbox("Open the screener"):
+            return
+        snapshot = GetScreener().snapshot(tuple(tickers))
+        fields = st.multiselect("Filter on:", list(FIELDS), format_func=FIELDS.get,
+                                default=['beta', 'returnOnEquity'])
+        filters = []
+        for field in fields:
+            col1, col2 = st.columns(2)
+            low = col1.number_input(f"{FIELDS[field]} from:", value=None, format="%g",
+                                    key='screener_low_' + field)
+            high = col2.number_input(f"{FIELDS[field]} to:", value=None, format="%g",
+                                     key='screener_high_' + field)
+            if low is not None or high is not None:
+                filters.append((field, low, high))
+        col1, col2, col3 = st.columns(3)
+        order_by = col1.selectbox("Sort by:", list(FIELDS), format_func=FIELDS.get)
+        descending = col2.toggle("Largest first", value=True)
+        k = col3.slider("Results:", 5, 100, 20)
+
+        with recorder.stage('screener'):
+            result = snapshot.query(filters, order_by, k, descending, tickers=tickers)
+        st.session_state['screener_rows'] = list(result.index)
+        st.dataframe(result.rename(columns=FIELDS), use_container_width=True,
+                     on_select=SelectFromScreener, selection_mode="single-row",
+                     key='screener_table')
+        known = int((snapshot.fetched_at[snapshot.mask(tickers)] > 0).sum())
+        st.caption(f"{result.attrs['total']} of {len(tickers)} companies match "
+                   f"({known} with data). Ratios are fractions: 0.15 is 15%. "
+                   "Click a row to load the ticker.")
+        if GetScreener().refreshing():
+            st.caption("The key statistics are being refreshed in the background.")
+
+#==============================================================================
+# Charts
+#==============================================================================
+
+def ShowChart(fig, stage):
+    """
+    This function draws a Plotly figure and records the size of what is
+    sent to the browser in the timing panel.
+    """
+    with recorder.stage(stage):
+        recorder.payload(stage, fig)
+        st.plotly_chart(fig, use_container_width=True)
 
 #==============================================================================
 # Header
@@ -130,21 +343,58 @@ def render_header():
     
 
     # Add the ticker selection on the sidebar
-    # Get the list of stock tickers from S&P500
-    ticker_list = pd.read_html('https://en.wikipedia.org/wiki/List_of_S%26P_500_companies')[0]['Symbol']
+    # Get the list of stock tickers (S&P500 by default) from the local snapshot
+    with st.expander("Ticker universe"):
+        universe_name = st.selectbox("Universe", list(SOURCES) + ["Custom CSV"])
+        uploaded = None
+        if universe_name == "Custom CSV":
+            uploaded = st.file_uploader("CSV file with a Symbol column", type="csv")
+    with recorder.stage('universe'):
+        if uploaded is not None:
+            ticker_table = GetCustomUniverse(uploaded.getvalue())
+        else:
+            try:
+                ticker_table = GetUniverse(universe_name if universe_name in SOURCES else 'S&P 500').table()
+            except Exception:
+                # No snapshot of this universe yet, and no network to download it
+                st.warning(f"The {universe_name} list could not be downloaded, "
+                           "the S&P 500 is shown instead.")
+                ticker_table = GetUniverse('S&P 500').table()
+    with st.expander("Price archive"):
+        archive = GetArchive()
+        if archive is not None:
+            st.write(f"{len(archive.tickers)} tickers from {archive.start} to {archive.end}.")
+        years = st.select_slider("Years of history:", [5, 10, 20, 30], value=20)
+        if st.button("Build the archive of this universe"):
+            with st.spinner("Downloading and writing the archive..."):
+                missing = build_archive(list(ticker_table['Symbol']), GetPriceStore().history,
+                                        date.today() - timedelta(days=int(365.25 * years)),
+                                        date.today())
+            GetArchive.clear()
+            if missing:
+                st.warning("No data for: " + ", ".join(missing))
+    global ticker_list
+    ticker_list = ticker_table['Symbol']
+    render_screener(list(ticker_list))
 
     # Add the selection boxes
     col1, col2, col3 = st.columns(3)  # Create 3 columns
     # Ticker name
     global ticker  # Set this variable as global, so the functions in all of the tabs can read it
-    ticker = col1.selectbox("Ticker", ticker_list)
-    global my_var
-    my_var = yf.Ticker(ticker)
+    ticker = col1.selectbox("Ticker", ticker_list, key='ticker')
     # Begin and end dates
     global start_date, end_date  # Set this variable as global, so all functions can read it
     start_date = col2.date_input("Start date", datetime.today().date() - timedelta(days=30))
     end_date = col3.date_input("End date", datetime.today().date())
 
+    # Profile and key statistics of all the companies, fetched in one batch
+    with st.expander("Key statistics of all the companies"):
+        if st.checkbox("Load key statistics"):
+            all_info = GetAllCompanyInfo(tuple(ticker_list))
+            all_keys = ['sector', 'industry', 'country', 'marketCap', 'volume',
+                        'beta', 'trailingPE', 'returnOnEquity', 'error']
+            st.dataframe(all_info.reindex(columns=all_keys), use_container_width=True)
+
 
 #==============================================================================
 # Tab 1
@@ -160,18 +410,10 @@ def render_tab1():
     col1, col2, col3 = st.columns([1, 3, 1])
     
     
-    # Get the company information
-    @st.cache_data
-    def GetCompanyInfo(ticker):
-        """
-        This function get the company information from Yahoo Finance.
-        """
-        return YFinance(ticker).info
-    
     # If the ticker is already selected
     if ticker != '':
         # Get the company information in list format
-        info = GetCompanyInfo(ticker)
+        info = section_data['info']
 
         # Show the company description using markdown + HTML
         st.write('**1. Business Summary:**')
@@ -195,9 +437,9 @@ def render_tab1():
         profile_dic = pd.DataFrame({' ':pd.Series(profile_dic)}) 
         st.dataframe(profile_dic)
         st.write('Major Shareholders:')
-        st.write(my_var.major_holders)
+        st.write(section_data['holders'][0])
         st.write('Institutional Shareholders:')
-        st.write(my_var.institutional_holders)
+        st.write(section_data['holders'][1])
         
         # Show some statistics as a DataFrame
         st.write('**3. Key Statistics:**')
@@ -237,31 +479,138 @@ def render_tab1():
             start_date = datetime(1970, 1, 1)
             
         #Plotting the graph
-        @st.cache_data
-        def get_stock_data(ticker, start_date, end_date):
-            stock_df = yf.Ticker(ticker).history(start=start_date, end=end_date)
-            return stock_df
-    
         if ticker != '':
-            stock_price = get_stock_data(ticker, start_date, end_date)
+            stock_price = GetHistory(ticker, start_date, end_date)
             st.write('**Line Graph**')
+            # Keep only the points the chart can show (see downsample.py)
+            close_line = downsample_line(stock_price['Close'])
             fig = go.Figure(data=[go.Scatter(
-                x=stock_price.index,
-                y=stock_price['Close'],
+                x=close_line.index,
+                y=close_line,
                 mode='lines',
                 name='Close Price'
             )])
-            fig.update_xaxes(type='category')  # Use 'category' type for dates
             fig.update_layout(title=f'{ticker} Stock Price',
                               xaxis_title='Date',
                               yaxis_title='Price',
                               template='plotly_dark')
-            st.plotly_chart(fig, use_container_width=True)
+            ShowChart(fig, 'chart: profile')
             
 #==============================================================================
 # Tab 2
 #==============================================================================
 
+def render_intraday_chart(ticker, interval):
+    """
+    This function shows the intraday bars of the ticker for the last session.
+    The bars are kept in a ring buffer per ticker and interval; with live
+    updates on, only the chart is rerun on a timer, and each run only asks
+    the feed for the bars after the last one kept.
+    """
+    col1, col2 = st.columns([1, 3])
+    live = col1.toggle("Live updates", value=False)
+    refresh = col2.select_slider("Refresh every (seconds):", [1, 2, 5, 10, 30, 60],
+                                 value=5, disabled=not live)
+
+    @st.fragment(run_every=refresh if live else None)
+    def IntradayChart():
+        stream = GetIntradayStream()
+        with recorder.stage('data: intraday'):
+            stream.update(ticker, interval)
+        bars = stream.buffer(ticker, interval).frame()
+        if bars.empty:
+            st.info(f"No {interval} bars for {ticker} yet.")
+            return
+        session = bars[bars.index.normalize() == bars.index[-1].normalize()]
+
+        last, first = session['Close'].iloc[-1], session['Open'].iloc[0]
+        st.metric(f"{ticker} - last {interval} bar at {session.index[-1]:%H:%M}",
+                  f"{last:.2f}", f"{last - first:+.2f} ({last / first - 1:+.2%})")
+
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[3, 1],
+                            vertical_spacing=0.03)
+        fig.add_trace(go.Candlestick(x=session.index, open=session['Open'],
+                                     high=session['High'], low=session['Low'],
+                                     close=session['Close'], name=f'{interval} candles'),
+                      row=1, col=1)
+        fig.add_trace(go.Bar(x=session.index, y=session['Volume'], name='Volume'),
+                      row=2, col=1)
+        # uirevision keeps the zoom of the user between the refreshes
+        fig.update_layout(title=f'{ticker} Intraday ({interval})',
+                          xaxis_rangeslider_visible=False,
+                          uirevision=f'{ticker}-{interval}',
+                          yaxis_title='Price',
+                          template='plotly_dark')
+        ShowChart(fig, 'chart: intraday')
+
+    IntradayChart()
+
+
+@st.cache_data(ttl=60 * 60)
+def GetSweep(tickers, rule, cost, years):
+    """
+    This function backtests the default parameter grid of a rule on the
+    daily bars of the tickers over the last years (see backtest.sweep).
+    """
+    end = date.today() + timedelta(days=1)
+    start = end - timedelta(days=int(365.25 * years))
+    frames = {t: GetHistory(t, start, end) for t in tickers}
+    return sweep(frames, rule, cost=cost, workers=POOL_WORKERS, mp_context=POOL_CONTEXT)
+
+def render_backtest(stock_price):
+    """
+    This function backtests a trading rule on the bars of the chart, and
+    sweeps its parameters over several tickers.
+    """
+    with st.expander("Backtest a strategy"):
+        # Expanders render their content even when closed: compute and draw
+        # nothing until the backtest is used
+        if not st.checkbox("Run the backtest"):
+            return
+        col1, col2 = st.columns(2)
+        rule = col1.selectbox("Rule:", list(RULES))
+        cost = col2.number_input("Cost per trade (basis points):", 0.0, 100.0, 5.0) / 10000
+        columns = st.columns(len(DEFAULTS[rule]))
+        params = {name: column.number_input(f"{name.capitalize()}:", value=value, min_value=1,
+                                            key=f'backtest_{rule}_{name}')
+                  for column, (name, value) in zip(columns, DEFAULTS[rule].items())}
+
+        with recorder.stage('backtest'):
+            result = backtest(stock_price, rule, cost, **params)
+        fig = go.Figure()
+        for name in result['equity']:
+            line = downsample_line(result['equity'][name])
+            fig.add_trace(go.Scatter(x=line.index, y=line, mode='lines', name=name))
+        fig.update_layout(title=f'{ticker} {rule} equity curve', yaxis_title='Value of 1 invested')
+        ShowChart(fig, 'chart: backtest')
+        col1, col2 = st.columns([2, 3])
+        col1.dataframe(result['stats'], use_container_width=True)
+        col2.write("Worst drawdowns of the strategy:")
+        col2.dataframe(result['drawdowns'], hide_index=True, use_container_width=True)
+
+        # Every combination of the default grid, on several tickers and on
+        # their own history (the chart's range is often too short for the
+        # longest windows)
+        col1, col2 = st.columns([3, 1])
+        tickers = col1.multiselect("Sweep the parameters on:", ticker_list, default=[ticker])
+        years = col2.select_slider("Years of history:", [5, 10, 20], value=10,
+                                   key='backtest_years')
+        if tickers and st.checkbox("Run the parameter sweep"):
+            with st.spinner("Backtesting every combination..."), recorder.stage('backtest sweep'):
+                table = GetSweep(tuple(tickers), rule, cost, years)
+            st.write(f"{len(table):,} backtests, best Sharpe ratio first:")
+            st.dataframe(table.head(50), hide_index=True, use_container_width=True)
+            if rule in ('SMA crossover', 'EMA crossover'):
+                # Sharpe ratio of every window pair for the selected ticker
+                heatmap = table[table['ticker'] == ticker].pivot(index='slow', columns='fast',
+                                                                  values='Sharpe')
+                fig = go.Figure(go.Heatmap(z=heatmap.to_numpy(), x=heatmap.columns,
+                                           y=heatmap.index, colorscale='RdYlGn',
+                                           colorbar=dict(title='Sharpe')))
+                fig.update_layout(title=f'{ticker} Sharpe ratio by window pair',
+                                  xaxis_title='Fast window', yaxis_title='Slow window')
+                ShowChart(fig, 'chart: backtest sweep')
+
 def render_tab2():
     """
     This function renders Tab 2 - Chart of the dashboard.
@@ -306,16 +655,18 @@ def render_tab2():
 
         # Calculate start and end dates based on selected interval
         if selected_interval == 'Day':
-            start_date = datetime.today() - timedelta(days=1)
+            # Intraday bars, from the live feed instead of the daily history
+            bar_interval = col16.radio("Bars:", list(INTERVALS), index=0)
+            render_intraday_chart(ticker, bar_interval)
+            return
         elif selected_interval == 'Month':
             start_date = datetime.today() - timedelta(days=30)
         elif selected_interval == 'Year':
             start_date = datetime.today() - timedelta(days=365)
 
     # Add a table to show stock data
-    @st.cache_data
     def GetStockData(ticker, start_date, end_date):
-        stock_df = yf.Ticker(ticker).history(start=start_date, end=end_date)
+        stock_df = GetHistory(ticker, start_date, end_date)
         stock_df.reset_index(inplace=True)  # Drop the indexes
         stock_df['Date'] = stock_df['Date']#.dt.date  # Convert date-time to date
         return stock_df
@@ -323,7 +674,11 @@ def render_tab2():
     # Add check boxes to show/hide data
     show_data = st.checkbox("Show data table")
     show_volume = st.checkbox("Show Trading Volume")
-    show_sma = st.checkbox("Show Simple Moving Average (50 days)")
+    selected_indicators = st.multiselect("Technical indicators:", list(INDICATORS))
+    ma_windows = [50]
+    if "SMA" in selected_indicators or "EMA" in selected_indicators:
+        windows_text = st.text_input("SMA / EMA windows (comma separated):", "50")
+        ma_windows = [int(w) for w in windows_text.replace(' ', '').split(',') if w.isdigit() and int(w) > 0]
 
     if ticker != '':
         stock_price = GetStockData(ticker, start_date, end_date)
@@ -336,46 +691,60 @@ def render_tab2():
     if update_button:
         # chart based on selection
         st.write('**Stock Price Chart**')
-        fig = go.Figure()
+        # Oscillators (RSI, MACD, ATR) get their own panel under the price
+        oscillators = [name for name in selected_indicators if not INDICATORS[name][2]]
+        fig = make_subplots(rows=1 + len(oscillators), cols=1, shared_xaxes=True,
+                            row_heights=[3] + [1] * len(oscillators), vertical_spacing=0.03)
+
+        # Long ranges are drawn with weekly/monthly candles and downsampled
+        # lines, so the browser gets about as many points as pixels
+        chart_df = stock_price.set_index('Date')
+        candles, resolution = downsample_ohlc(chart_df)
 
         if show_volume:
             # Bar chart for trading volume
-            fig.add_trace(go.Bar(x=stock_price['Date'], y=stock_price['Volume'], name='Volume'))
+            fig.add_trace(go.Bar(x=candles.index, y=candles['Volume'], name='Volume'))
 
-        if show_sma:
-            stock_price['SMA'] = stock_price['Close'].rolling(window=50).mean()
-            # Line plot for simple moving average
-            fig.add_trace(go.Scatter(x=stock_price['Date'], y=stock_price['SMA'], mode='lines', name='SMA'))
+        # Technical indicators, computed on the daily bars (the cached price
+        # data is not modified) and then downsampled like the price
+        for name in selected_indicators:
+            row = 1 if INDICATORS[name][2] else 2 + oscillators.index(name)
+            params = [{'window': w} for w in ma_windows] if name in ("SMA", "EMA") else [{}]
+            for param in params:
+                values = GetIndicatorCache().get(ticker, chart_df, name, **param)
+                for column in values:
+                    line = downsample_line(values[column])
+                    fig.add_trace(go.Scatter(x=line.index, y=line, mode='lines', name=column),
+                                  row=row, col=1)
 
         if selected_style != "Time intervals" or (selected_style == "Time intervals" and selected_interval == 'Day'):
-            # Plot based on user-selected style
-            if selected_style == "Date range":
-                x_data = stock_price['Date']
-            elif selected_style == "Time duration":
-                x_data = stock_price['Date']
-            elif selected_style == "Time intervals":
-                x_data = stock_price['Date']
-                ##THIS DOESNT WORK FOR THE TIME INTERVALS AND I HAVE NO CLUE WHY :'(
-            if selected_style == "Date range" or selected_style == "Time duration" or selected_style == "Time intervals":
-                # Line plot for stock price
-                fig.add_trace(go.Scatter(x=x_data, y=stock_price['Close'], mode='lines', name='Stock Price'))
-                # Candlestick chart
-                fig.add_trace(go.Candlestick(x=x_data,
-                                             open=stock_price['Open'],
-                                             high=stock_price['High'],
-                                             low=stock_price['Low'],
-                                             close=stock_price['Close'], name='Candlestick'))
-            
+            # Line plot for stock price
+            close_line = downsample_line(chart_df['Close'])
+            fig.add_trace(go.Scatter(x=close_line.index, y=close_line, mode='lines', name='Stock Price'))
+            # Candlestick chart
+            fig.add_trace(go.Candlestick(x=candles.index,
+                                         open=candles['Open'],
+                                         high=candles['High'],
+                                         low=candles['Low'],
+                                         close=candles['Close'], name=f'{resolution} candles'))
             
-        # Customize the layout
-        fig.update_xaxes(type='category')  
+        # Customize the layout: real date axis, without the weekends for daily candles
+        if resolution == 'Daily':
+            fig.update_xaxes(rangebreaks=[dict(bounds=["sat", "mon"])])
+        if oscillators:
+            # The range slider of the candles would cover the lower panels
+            fig.update_layout(xaxis_rangeslider_visible=False)
         fig.update_layout(title=f'{ticker} Stock Price',
                           xaxis_title='Date',
                           yaxis_title='Price',
                           template='plotly_dark')
-        st.plotly_chart(fig, use_container_width=True)
+        ShowChart(fig, 'chart: price')
     
     st.write("Click on the legend to select the type of graph!")
+
+    # Trading rules tested on the same bars
+    if ticker != '':
+        render_backtest(stock_price)
 #==============================================================================
 # Tab 3
 #==============================================================================
@@ -385,70 +754,177 @@ def render_tab3():
     #User input for either the time freq. or the financial statement required
     time_frequency = st.selectbox("Select Time Frequency:", ("Annual", "Quarterly"))
     sel = st.multiselect("Show:", ["Income statement", "Balance sheet", "Cash flow"])
+    # The statements are stored on disk until a new period is expected
+    if st.button("Download the statements again"):
+        GetStatementStore().invalidate(ticker)
+        GetSharedCache().invalidate('statement', ticker)
+        GetPrefetcher().forget(ticker)
+        section_data.pop('statements', None)
+        load_section_data(['statements'])
       #Simply displays the appropriate financial statement depending on what the user chose
+    statements = section_data['statements']
     if "Income statement" in sel:
         if time_frequency == "Quarterly":
-            my_var.quarterly_income_stmt
+            st.write(statements['quarterly_income_stmt'])
         else:
-            my_var.income_stmt
+            st.write(statements['income_stmt'])
     if "Balance sheet" in sel:
         if time_frequency == "Quarterly":
-            my_var.quarterly_balance_sheet
+            st.write(statements['quarterly_balance_sheet'])
         else:
-            my_var.balance_sheet
+            st.write(statements['balance_sheet'])
     if "Cash flow" in sel:
         if time_frequency == "Quarterly":
-            my_var.quarterly_cash_flow
+            st.write(statements['quarterly_cash_flow'])
         else:
-            my_var.cash_flow
+            st.write(statements['cash_flow'])
    
 #==============================================================================
 # Tab 4
 #==============================================================================
 
+def FanChart(summary, title, yaxis_title):
+    """
+    This function draws the result of a chunked simulation: the 5-95 and
+    25-75 percentile bands, the median, the mean and a few paths.
+    """
+    bands = summary['bands']
+    fig = go.Figure()
+    for sim in summary['samples']:
+        fig.add_trace(go.Scatter(x=bands.index, y=summary['samples'][sim], mode='lines',
+                                 line=dict(width=0.5, color='rgba(150,150,150,0.4)'),
+                                 showlegend=False, hoverinfo='skip'))
+    for low, high, color, name in (('p5', 'p95', 'rgba(31,119,180,0.2)', '5% - 95%'),
+                                   ('p25', 'p75', 'rgba(31,119,180,0.4)', '25% - 75%')):
+        fig.add_trace(go.Scatter(x=bands.index, y=bands[low], mode='lines',
+                                 line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=bands.index, y=bands[high], mode='lines',
+                                 line=dict(width=0), fill='tonexty',
+                                 fillcolor=color, name=name))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p50'], mode='lines', name='Median'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['mean'], mode='lines',
+                             line=dict(dash='dash'), name='Mean'))
+    fig.update_layout(title=title,
+                      xaxis_title='Day',
+                      yaxis_title=yaxis_title,
+                      template='plotly_dark')
+    return fig
+
+
+def render_portfolio_simulation():
+    """
+    This function simulates a portfolio of several correlated tickers (see
+    montecarlo.simulate_portfolio) and shows the distribution of its value,
+    its VaR / CVaR and the contribution of each ticker.
+    """
+    assets = st.multiselect("Portfolio tickers:", ticker_list, default=[ticker])
+    if not assets:
+        st.info("Pick at least one ticker.")
+        return
+    weights = st.data_editor(pd.DataFrame({'Weight': 1.0 / len(assets)},
+                                          index=pd.Index(assets, name='Ticker')),
+                             disabled=['Ticker'])['Weight']
+
+    col1, col2, col3, col4 = st.columns(4)
+    value = col1.number_input("Portfolio value:", value=1_000_000.0, step=10_000.0)
+    years = col2.select_slider("Years of history:", [1, 2, 3, 5, 10], value=3)
+    simulations = col3.select_slider("Number of simulations:",
+                                     [1000, 5000, 10000, 25000, 50000], value=10000)
+    time_horizon = col4.select_slider("Number of days:", [21, 63, 126, 252], value=252)
+    use_mean = st.checkbox("Use the historical mean returns (otherwise zero mean)")
+
+    @st.cache_data
+    def GetPortfolioSimulation(prices, weights, value, simulations, time_horizon, use_mean):
+        return simulate_portfolio(prices, weights, value=value, simulations=simulations,
+                                  time_horizon=time_horizon, use_mean=use_mean,
+                                  workers=POOL_WORKERS, mp_context=POOL_CONTEXT)
+
+    with recorder.stage('data: portfolio prices'):
+        prices = GetClosePrices(tuple(assets), date.today() - timedelta(days=365 * years),
+                                date.today() + timedelta(days=1))
+    missing = [t for t in assets if prices[t].dropna().empty]
+    if missing:
+        st.warning("No price history for: " + ", ".join(missing))
+        return
+    with recorder.stage('monte carlo: portfolio'):
+        try:
+            summary = GetPortfolioSimulation(prices, weights, float(value), simulations,
+                                             time_horizon, use_mean)
+        except ValueError as e:
+            st.warning(str(e))
+            return
+
+    fig = FanChart(summary, f'Portfolio of {len(assets)} tickers - {simulations:,} simulations',
+                   'Value')
+    ShowChart(fig, 'chart: portfolio')
+
+    col1, col2 = st.columns(2)
+    col1.metric(f"VaR 95% at {time_horizon} days", f"{summary['var']:,.0f}")
+    col2.metric(f"CVaR 95% at {time_horizon} days", f"{summary['cvar']:,.0f}")
+
+    st.write("Contribution of each ticker (the CVaR contributions add up to the CVaR):")
+    st.dataframe(summary['contributions'].style.format({
+        'weight': '{:.1%}', 'daily volatility': '{:.2%}', 'variance share': '{:.1%}',
+        'expected profit': '{:,.0f}', 'CVaR contribution': '{:,.0f}', 'CVaR share': '{:.1%}'}),
+        use_container_width=True)
+    with st.expander("Correlation of the daily returns"):
+        st.dataframe(summary['correlation'].style.format('{:.2f}'), use_container_width=True)
+
+
 def render_tab4():
     """
     This function will render the fourth tab - the Monte Carlo Simulation
     """
     global start_date, end_date
     
-    stock_price = my_var.history(start=start_date, end=end_date)
+    stock_price = section_data['history']
     close_price = stock_price['Close']
     daily_return = close_price.pct_change()
     daily_volatility = np.std(daily_return)
     
     # Setup the Monte Carlo simulation
-    np.random.seed(123)
-    simulations = st.slider("Pick a number of simulations:", 0, 1000)
-    time_horizon = st.select_slider("Number of days:", [100, 150, 200, 250, 300])
-    
-    
-    simulation_df = pd.DataFrame()
-    
-    for i in range(simulations):
-        
-        next_price = []
-        
-        # Create the next stock price
-        last_price = close_price.iloc[-1]
-        
-        for j in range(time_horizon):
-            # Generate the random percentage change around the mean (0) and std (daily_volatility)
-            future_return = np.random.normal(0, daily_volatility)
-    
-            # Generate the random future price
-            future_price = last_price * (1 + future_return)
-    
-            # Save the price and go next
-            next_price.append(future_price)
-            last_price = future_price
+    mode = st.radio("Simulation mode:", ("All paths", "Large scale", "Portfolio"),
+                    horizontal=True)
+    last_price = close_price.iloc[-1]
+
+    if mode == "All paths":
+        simulations = st.slider("Pick a number of simulations:", 0, 1000)
+        time_horizon = st.select_slider("Number of days:", [100, 150, 200, 250, 300])
         
-        # Store the result of the simulation
-        next_price_df = pd.Series(next_price, name='sim' + str(i))
-        simulation_df = pd.concat([simulation_df, next_price_df], axis=1)
+        # Simulate all the paths at once (see montecarlo.py)
+        with recorder.stage('monte carlo'):
+            simulation_df = simulate_price_df(last_price, daily_volatility,
+                                              simulations, time_horizon, seed=123)
+
+        # Plot the simulation stock price in the future using Streamlit
+        st.line_chart(simulation_df)
+    elif mode == "Large scale":
+        col1, col2, col3 = st.columns(3)
+        simulations = col1.select_slider("Number of simulations:",
+                                         [10000, 50000, 100000, 250000, 500000, 1000000],
+                                         value=100000)
+        time_horizon = col2.select_slider("Number of days:", [100, 150, 200, 250, 300])
+        seed = col3.number_input("Seed:", value=123, step=1)
+
+        # Only the aggregated statistics are kept, whatever the number of paths
+        @st.cache_data
+        def GetSimulationSummary(last_price, daily_volatility, simulations, time_horizon, seed):
+            return simulate_price_summary(last_price, daily_volatility, simulations,
+                                          time_horizon, seed=seed, workers=POOL_WORKERS,
+                                          mp_context=POOL_CONTEXT)
+
+        with recorder.stage('monte carlo'):
+            summary = GetSimulationSummary(float(last_price), float(daily_volatility),
+                                           simulations, time_horizon, int(seed))
+
+        fig = FanChart(summary, f'{ticker} - {simulations:,} simulations', 'Price')
+        ShowChart(fig, 'chart: monte carlo')
 
-    # Plot the simulation stock price in the future using Streamlit
-    st.line_chart(simulation_df)
+        col1, col2 = st.columns(2)
+        col1.metric(f"VaR 95% at {time_horizon} days", f"{summary['var']:.2f}")
+        col2.metric(f"CVaR 95% at {time_horizon} days", f"{summary['cvar']:.2f}")
+    else:
+        render_portfolio_simulation()
 
     #Graph for the last known stock price
     toggle = st.toggle("Show last known stock price")
@@ -461,99 +937,235 @@ def render_tab4():
 
 def render_tab5():
     "This tab offers useful information about the selected company, for example the beta value and financial ratios"
-    #beta value
-    beta = YFinance(ticker).info['beta']
-    st.write(str(ticker), "has a beta of:", beta)
-    if beta == 1:
-        st.write(str(ticker), "has the same volatility as the market.")
-    elif beta < 1:
-        st.write(str(ticker), "is a stable stock!")
-    elif beta > 1:
-        st.write(str(ticker), "is a risky stock- be careful.")
-        
-    inc =  my_var.income_stmt
-    bal = my_var.balance_sheet
-    
-    #Following is the extraction of several different financial ratios
-    #Liquidity ratio
-    current_assets = bal.loc['Current Assets']
-    current_liabilities = bal.loc['Current Liabilities']
-    inventory = bal.loc['Inventory']
-    #Asset Management
-    cogs = inc.loc['Cost Of Revenue']
-    accounts_receivable = bal.loc['Accounts Receivable']
-    sales = inc.loc['Total Revenue']
-    net_fixed_assets = bal.loc['Total Non Current Assets']
-    total_assets = bal.loc['Total Assets']
-    #Debt Management
-    total_liabilities = bal.loc['Current Liabilities']
-    ebit = inc.loc['EBIT']
-    interest = inc.loc['Interest Expense']
-    #Profitability ratio
-    net_income = inc.loc['Net Income']
-    common_equity = bal.loc['Common Stock Equity']
+    #beta value, computed from the stored prices against a benchmark
+    col1, col2, col3 = st.columns(3)
+    benchmark = col1.selectbox("Benchmark:", list(BENCHMARKS), format_func=BENCHMARKS.get)
+    window = col2.selectbox("Rolling window:", list(WINDOWS), index=2)
+    years = col3.select_slider("Years:", [1, 2, 5, 10], value=5)
+    compare = st.multiselect("Compare with:", [t for t in ticker_list if t != ticker])
+    try:
+        with recorder.stage('rolling statistics'):
+            stats, first_day = GetRollingStats((ticker, *compare), benchmark, WINDOWS[window], years)
+    except Exception as e:
+        st.warning(f"Could not load the prices against {benchmark}: {e}")
+        stats = None
+    if stats is not None and ticker in stats['beta']:
+        beta = round(float(latest_stats(stats).loc[ticker, 'beta']), 2)
+        st.write(str(ticker), f"has a beta of ({window} against {benchmark}):", beta)
+        if beta == 1:
+            st.write(str(ticker), "has the same volatility as the market.")
+        elif beta < 1:
+            st.write(str(ticker), "is a stable stock!")
+        elif beta > 1:
+            st.write(str(ticker), "is a risky stock- be careful.")
+
+        # Beta, volatility and correlation over time
+        fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.05,
+                            subplot_titles=("Beta", "Volatility (annualized)", "Correlation"))
+        for row, name in enumerate(('beta', 'volatility', 'correlation'), 1):
+            df = stats[name][stats[name].index >= pd.Timestamp(first_day)]
+            for t in df.columns:
+                line = downsample_line(df[t].dropna())
+                fig.add_trace(go.Scatter(x=line.index, y=line, mode='lines', name=t,
+                                         legendgroup=t, showlegend=row == 1), row=row, col=1)
+        fig.update_layout(height=700, title=f"Rolling {window} statistics against {benchmark}")
+        ShowChart(fig, 'chart: rolling statistics')
+
+        # The same statistics for the whole universe, computed in one pass
+        with st.expander("Beta, volatility and correlation of the universe"):
+            if st.checkbox("Compute for all the tickers of the universe"):
+                try:
+                    with recorder.stage('rolling statistics: universe'):
+                        universe_stats, _ = GetRollingStats(tuple(ticker_list), benchmark,
+                                                           WINDOWS[window], years)
+                except Exception as e:
+                    st.warning(f"Could not load the prices of the universe against {benchmark}: {e}")
+                else:
+                    table = latest_stats(universe_stats).sort_values('beta', ascending=False)
+                    st.dataframe(table, use_container_width=True)
+
+    # All the ratios of the ticker, one row per period (see ratios.py)
+    ratios = section_data['ratios'][0]
+    if ticker not in ratios.index.get_level_values('ticker'):
+        st.write("No financial statements available for", str(ticker))
+        return
+    ratios = ratios.loc[ticker]
     
     col1, col2 = st.columns(2)
-    #Calculation of the ratios...
     #LIQUIDITY RATIOS
     with col1:
-        st.write("The current ratio is:", current_assets/current_liabilities)
+        st.write("The current ratio is:", ratios['current_ratio'])
     with col2:
-        st.write("Quick Ratio:", (current_assets - inventory)/current_liabilities)
+        st.write("Quick Ratio:", ratios['quick_ratio'])
     
     #ASSET MANAGEMENT RATIOS
     with col1:
-        st.write("Inventory turnover ratio:", cogs/inventory)
-        st.write("Days Sales Outstanding:", accounts_receivable/(sales/360))
+        st.write("Inventory turnover ratio:", ratios['inventory_turnover'])
+        st.write("Days Sales Outstanding:", ratios['days_sales_outstanding'])
     with col2:
-        st.write("Fixed Assets Turnover:", sales/net_fixed_assets)
-        st.write("Total Assets Turnover:", sales/total_assets)
+        st.write("Fixed Assets Turnover:", ratios['fixed_assets_turnover'])
+        st.write("Total Assets Turnover:", ratios['total_assets_turnover'])
     
     #DEBT MANAGEMENT RATIOS
     with col1:
-        st.write("Debt Ratio:", total_liabilities/total_assets)
+        st.write("Debt Ratio:", ratios['debt_ratio'])
     with col2:
-       st.write("Times Interest Earned Ratio:", ebit/interest)
+       st.write("Times Interest Earned Ratio:", ratios['times_interest_earned'])
     
     #PROFITABILITY RATIOS
     with col1:
-        st.write("Net Profit Margin Ratio:", net_income/sales)
-        st.write("Return On Equity:", net_income/common_equity)
+        st.write("Net Profit Margin Ratio:", ratios['net_profit_margin'])
+        st.write("Return On Equity:", ratios['return_on_equity'])
     with col2:
-        st.write("Return on Assets:", net_income/total_assets)
+        st.write("Return on Assets:", ratios['return_on_assets'])
+
+    # Same ratios for many tickers, computed in one pass
+    with st.expander("Compare ratios across tickers"):
+        compare = st.multiselect("Tickers:", ticker_list, default=[ticker])
+        if compare:
+            table, errors = GetRatioTable(tuple(compare))
+            latest = table.groupby(level='ticker').tail(1).droplevel('period')
+            latest.columns = [RATIOS[c][1] for c in latest.columns]
+            st.dataframe(latest, use_container_width=True)
+            for failed, error in errors.items():
+                st.write(failed, "-", error)
            
    
+#==============================================================================
+# Data used by the tabs
+#==============================================================================
+
+# Inputs shared by the tabs. Each one is loaded at most once per rerun, and
+# only when a tab that uses it is rendered.
+# The downloads are started in the background by the prefetcher as soon as the
+# ticker is selected, so most loaders only wait for a result.
+DATA_LOADERS = {
+    'info': lambda: GetPrefetcher().get('info', ticker),
+    'holders': lambda: GetPrefetcher().get('holders', ticker),
+    'statements': lambda: {name: GetPrefetcher().get(name, ticker) for name in STATEMENTS},
+    'history': lambda: GetHistory(ticker, start_date, end_date),
+    'ratios': lambda: RatiosFromStatements(),
+}
+
+
+def RatiosFromStatements():
+    """
+    This function computes the ratios of the ticker from the statements
+    already loaded for this rerun (same format as GetRatioTable).
+    """
+    load_section_data(['statements'])
+    statements = section_data['statements']
+    panel = statements_panel({ticker: [statements['income_stmt'], statements['balance_sheet']]})
+    return compute_ratios(panel), {}
+
+# Tab name -> (render function, data it uses)
+SECTIONS = {
+    "Company profile": (render_tab1, ('info', 'holders')),
+    "Chart": (render_tab2, ()),
+    "Financials": (render_tab3, ('statements',)),
+    "Monte-Carlo Simulation": (render_tab4, ('history',)),
+    "Financial ratios": (render_tab5, ('ratios',)),
+}
+
+section_data = {}   # data loaded during the current rerun
+
+
+def load_section_data(names):
+    """
+    This function loads the data used by a tab into section_data, skipping
+    what was already loaded during this rerun.
+    """
+    for name in names:
+        if name not in section_data:
+            with recorder.stage('data: ' + name):
+                section_data[name] = DATA_LOADERS[name]()
+            recorder.payload('data: ' + name, section_data[name])
+
+
+def render_section(name):
+    """
+    This function loads the data of a tab and renders it, timing both.
+    """
+    render, data = SECTIONS[name]
+    with recorder.stage('tab: ' + name):
+        load_section_data(data)
+        render()
+
+
+def render_timing_panel():
+    """
+    This function shows the time, memory and payload of each stage of the
+    rerun (see timing.py).
+    """
+    with st.sidebar.expander("Timing panel"):
+        report = recorder.report()
+        st.dataframe(report, use_container_width=True)
+        top = [k for k in report.index if k == 'header' or k.startswith('tab: ')]
+        st.write("Total:", round(report.loc[top, 'ms'].sum(), 1), "ms")
+    with st.sidebar.expander("Shared cache"):
+        # All the sessions and processes since the cache was created
+        st.dataframe(GetSharedCache().counters(), use_container_width=True)
+
 #==============================================================================
 # Main body
 #==============================================================================
- 
-# Render the header
-render_header()
-
-# Render the tabs
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Company profile", "Chart", "Financials", "Monte-Carlo Simulation", "Financial ratios"])
-with tab1:
-    render_tab1()
-with tab2:
-    render_tab2()
-with tab3:
-    render_tab3()
-with tab4:
-    render_tab4()
-with tab5:
-    render_tab5()
-    
-# Customize the dashboard with CSS
-st.markdown(
-    """
-    <style>
-        .stApp {
-            background: #F0F8FF;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+
+def GetRecorder():
+    """
+    This function returns the timing recorder of the session (see timing.py),
+    so the sessions do not reset or mix each other's timings.
+    """
+    if 'recorder' not in st.session_state:
+        st.session_state['recorder'] = Recorder()
+    return st.session_state['recorder']
+
+def main():
+    global recorder  # Read by the functions of all the tabs
+    recorder = GetRecorder()
+    section_data.clear()
+    recorder.reset()
+    show_timing = st.sidebar.toggle("Show timing panel", value=False)
+    recorder.measure_payloads = show_timing
+    recorder.trace_allocations = show_timing and st.sidebar.toggle("Trace allocations", value=False)
+
+    # Render the header
+    with recorder.stage('header'):
+        render_header()
+
+    # Start downloading everything about the selected ticker in the background
+    GetPrefetcher().prefetch(ticker)
+
+    # Lazy mode renders only the selected tab; the classic tabs render all
+    # of them on every rerun, because st.tabs does not skip hidden tabs.
+    lazy = st.sidebar.toggle("Render only the selected tab", value=True)
+    if lazy:
+        selected = st.radio("Section", list(SECTIONS), horizontal=True,
+                            label_visibility="collapsed")
+        render_section(selected)
+    else:
+        tabs = st.tabs(list(SECTIONS))
+        for tab, name in zip(tabs, SECTIONS):
+            with tab:
+                render_section(name)
+
+    if show_timing:
+        render_timing_panel()
+        
+    # Customize the dashboard with CSS
+    st.markdown(
+        """
+        <style>
+            .stApp {
+                background: #F0F8FF;
+            }
+        </style>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
 
 ###############################################################################
 # END
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# RECORDED DATA FOR OFFLINE RUNS (BENCHMARKS, DEMOS)
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+STATEMENTS = ['income_stmt', 'quarterly_income_stmt',
+              'balance_sheet', 'quarterly_balance_sheet',
+              'cash_flow', 'quarterly_cash_flow']
+
+#==============================================================================
+# Fixture source
+#==============================================================================
+
+class FixtureSource:
+    """
+    Serves recorded data instead of Yahoo Finance. The folder has one
+    sub-folder per ticker with:
+        history.pkl     daily bars (yf.Ticker.history format)
+        info.json       YFinance(ticker).info
+        holders.pkl     (major_holders, institutional_holders)
+        statements.pkl  dictionary statement name -> DataFrame
+        intraday.pkl    1 minute bars of the last sessions
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._history = {}
+
+    def _path(self, ticker, name):
+        path = os.path.join(self.folder, ticker, name)
+        if not os.path.exists(path):
+            raise KeyError(f"No recorded {name} for {ticker}")
+        return path
+
+    def history(self, ticker, start, end):
+        if ticker not in self._history:
+            self._history[ticker] = pd.read_pickle(self._path(ticker, "history.pkl"))
+        df = self._history[ticker]
+        tz = df.index.tz
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if tz is not None:
+            start, end = start.tz_localize(tz), end.tz_localize(tz)
+        return df[(df.index >= start) & (df.index < end)]
+
+    def intraday(self, ticker):
+        return pd.read_pickle(self._path(ticker, "intraday.pkl"))
+
+    def info(self, ticker):
+        with open(self._path(ticker, "info.json")) as f:
+            return json.load(f)
+
+    def holders(self, ticker):
+        return pd.read_pickle(self._path(ticker, "holders.pkl"))
+
+    def statement(self, ticker, name):
+        return pd.read_pickle(self._path(ticker, "statements.pkl"))[name]
+
+    def statements(self, ticker):
+        statements = pd.read_pickle(self._path(ticker, "statements.pkl"))
+        return statements['income_stmt'], statements['balance_sheet']
+
+#==============================================================================
+# Recording
+#==============================================================================
+
+def _save(folder, ticker, history, info, holders, statements, intraday):
+    path = os.path.join(folder, ticker)
+    os.makedirs(path, exist_ok=True)
+    history.to_pickle(os.path.join(path, "history.pkl"))
+    with open(os.path.join(path, "info.json"), "w") as f:
+        json.dump(info, f, default=str)
+    pd.to_pickle(holders, os.path.join(path, "holders.pkl"))
+    pd.to_pickle(statements, os.path.join(path, "statements.pkl"))
+    intraday.to_pickle(os.path.join(path, "intraday.pkl"))
+
+
+def record(tickers, folder, start="1970-01-01"):
+    """
+    This function downloads the data of the tickers from Yahoo Finance and
+    saves it as fixtures (needs network).
+    """
+    import yfinance as yf
+    from yahoo import YFinance
+    for ticker in tickers:
+        yf_ticker = yf.Ticker(ticker)
+        _save(folder, ticker,
+              yf_ticker.history(start=start),
+              YFinance(ticker).info,
+              (yf_ticker.major_holders, yf_ticker.institutional_holders),
+              {name: getattr(yf_ticker, name) for name in STATEMENTS},
+              yf_ticker.history(period='7d', interval='1m'))
+
+
+def make_synthetic(tickers, folder, years=30, end="2026-10-16"):
+    """
+    This function writes realistic-looking fixtures (random walk prices,
+    statements with the usual line items) for tickers, so the benchmarks can
+    run without any recording. The data of a ticker is always the same.
+    """
+    for ticker in tickers:
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        days = pd.bdate_range(end=end, periods=int(years * 252), tz="America/New_York",
+                              name="Date")
+        close = 20 * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(days))))
+        history = pd.DataFrame({
+            'Open': close * (1 + rng.normal(0, 0.004, len(days))),
+            'High': close * (1 + np.abs(rng.normal(0, 0.01, len(days)))),
+            'Low': close * (1 - np.abs(rng.normal(0, 0.01, len(days)))),
+            'Close': close,
+            'Volume': rng.integers(1_000_000, 50_000_000, len(days)),
+            'Dividends': 0.0, 'Stock Splits': 0.0}, index=days)
+
+        scale = float(rng.uniform(1e9, 1e11))
+        info = {'longBusinessSummary': f"{ticker} is a synthetic company used for benchmarks.",
+                'zip': '00000', 'address1': '1 Benchmark Way', 'country': 'United States',
+                'website': f'https://{ticker.lower()}.example.com', 'sector': 'Technology',
+                'industry': 'Software', 'fullTimeEmployees': int(rng.integers(100, 100000)),
+                'previousClose': float(close[-2]), 'open': float(history['Open'].iloc[-1]),
+                'bid': float(close[-1] * 0.999), 'ask': float(close[-1] * 1.001),
+                'marketCap': scale * 10, 'volume': int(history['Volume'].iloc[-1]),
+                'beta': float(rng.uniform(0.4, 1.8)), 'trailingPE': float(rng.uniform(8, 40)),
+                'returnOnEquity': float(rng.uniform(-0.05, 0.4))}
+        # Other key statistics (for the screener), drawn apart so the data
+        # above stays the same
+        extra = np.random.default_rng(zlib.crc32(ticker.encode()) + 1)
+        info.update({'shortName': f"{ticker} Inc.",
+                     'returnOnAssets': float(extra.uniform(-0.02, 0.2)),
+                     'profitMargins': float(extra.uniform(-0.05, 0.35)),
+                     'currentRatio': float(extra.uniform(0.6, 3.0)),
+                     'quickRatio': float(extra.uniform(0.4, 2.5)),
+                     'debtToEquity': float(extra.uniform(10, 250)),
+                     'dividendYield': float(extra.uniform(0, 0.05))})
+
+        holders = (pd.DataFrame({'Value': [0.01, 0.6, 0.61, 3000]},
+                                index=['insidersPercentHeld', 'institutionsPercentHeld',
+                                       'institutionsFloatPercentHeld', 'institutionsCount']),
+                   pd.DataFrame({'Holder': [f'Fund {i}' for i in range(10)],
+                                 'Shares': rng.integers(1e6, 1e8, 10),
+                                 'pctHeld': rng.uniform(0.001, 0.08, 10)}))
+
+        def statement(items, periods, freq):
+            dates = pd.date_range(end=end, periods=periods, freq=freq)[::-1]
+            values = rng.uniform(0.2, 1.0, (len(items), periods)) * scale
+            return pd.DataFrame(values, index=items, columns=dates)
+
+        income = ['Total Revenue', 'Cost Of Revenue', 'Gross Profit', 'EBIT',
+                  'Interest Expense', 'Net Income']
+        balance = ['Total Assets', 'Current Assets', 'Inventory', 'Accounts Receivable',
+                   'Total Non Current Assets', 'Current Liabilities',
+                   'Total Liabilities Net Minority Interest', 'Common Stock Equity']
+        cash = ['Operating Cash Flow', 'Capital Expenditure', 'Free Cash Flow']
+        statements = {}
+        for prefix, periods, freq in (('', 4, 'YE'), ('quarterly_', 5, 'QE')):
+            statements[prefix + 'income_stmt'] = statement(income, periods, freq)
+            statements[prefix + 'balance_sheet'] = statement(balance, periods, freq)
+            statements[prefix + 'cash_flow'] = statement(cash, periods, freq)
+
+        # 1 minute bars of the last 5 sessions, 9:30 - 16:00 New York time
+        minutes = pd.DatetimeIndex(
+            [t for day in days[-5:]
+             for t in pd.date_range(day.normalize() + pd.Timedelta(hours=9, minutes=30),
+                                    periods=390, freq='min')], name='Datetime')
+        walk = close[-6] * np.exp(np.cumsum(rng.normal(0, 0.0008, len(minutes))))
+        intraday = pd.DataFrame({
+            'Open': walk * (1 + rng.normal(0, 0.0002, len(minutes))),
+            'High': walk * (1 + np.abs(rng.normal(0, 0.0005, len(minutes)))),
+            'Low': walk * (1 - np.abs(rng.normal(0, 0.0005, len(minutes)))),
+            'Close': walk,
+            'Volume': rng.integers(1_000, 100_000, len(minutes)),
+            'Dividends': 0.0, 'Stock Splits': 0.0}, index=minutes)
+
+        _save(folder, ticker, history, info, holders, statements, intraday)
+
+###############################################################################
+# END
+###############################################################################
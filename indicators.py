@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# TECHNICAL INDICATORS
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+#==============================================================================
+# Kernels
+#==============================================================================
+# Every indicator is a function (bars, state, **params) -> (columns, state):
+#   - bars: dictionary 'Open', 'High', 'Low', 'Close', 'Volume' -> numpy arrays
+#           with the new bars only
+#   - state: what the indicator needs to continue from the previous bars
+#           (None the first time)
+#   - columns: dictionary column name -> numpy array, one value per new bar
+# So an indicator computed on a history can be extended with the bars that
+# arrive later without going over the whole history again.
+
+def _ema_scan(x, alpha, last=None):
+    """
+    This function computes the exponential moving average
+        y[t] = alpha * x[t] + (1 - alpha) * y[t - 1]
+    without a Python loop over the values. The series is cut in blocks short
+    enough for the powers of (1 - alpha) to stay in float64 precision; inside
+    a block the recursion is a cumulative sum of weighted values. last is the
+    EMA before x (None: start from x[0]).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty_like(x)
+    if len(x) == 0:
+        return out
+    decay = 1.0 - alpha
+    if last is None:
+        last = x[0]
+    if decay <= 0:
+        return x.copy()
+    # Block length such that decay ** -block stays below 1e12
+    block = max(1, min(len(x), int(12 * np.log(10) / -np.log(decay))))
+    powers = decay ** np.arange(1, block + 1)      # decay^1 .. decay^block
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        p = powers[:len(chunk)]
+        # y[j] = decay^(j+1) * last + alpha * sum_i decay^(j-i) * x[i]
+        out[start:start + len(chunk)] = p * (last + alpha * np.cumsum(chunk / p))
+        last = out[start + len(chunk) - 1]
+    return out
+
+
+def _rolling_tail(x, window, state):
+    """
+    This function returns the previous window - 1 values followed by x, and
+    the number of values before x.
+    """
+    tail = state['tail'] if state else np.empty(0)
+    seen = state['seen'] if state else 0
+    return np.concatenate([tail, x]), seen, len(tail)
+
+
+def _rolling_mean_std(xx, window, want_std):
+    """
+    This function computes the rolling mean (and standard deviation) over a
+    window with cumulative sums. The values are centered first to keep the
+    precision of the sums of squares.
+    """
+    n = len(xx)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan) if want_std else None
+    if n >= window:
+        shift = xx[0]
+        c = np.concatenate([[0.0], np.cumsum(xx - shift)])
+        sums = c[window:] - c[:-window]
+        mean[window - 1:] = sums / window + shift
+        if want_std:
+            c2 = np.concatenate([[0.0], np.cumsum((xx - shift) ** 2)])
+            sq = c2[window:] - c2[:-window]
+            var = np.maximum(sq / window - (sums / window) ** 2, 0.0) * window / (window - 1)
+            std[window - 1:] = np.sqrt(var)
+    return mean, std
+
+
+def _next_tail(xx, window, seen, n_new):
+    return {'tail': xx[-(window - 1):] if window > 1 else np.empty(0), 'seen': seen + n_new}
+
+
+def sma(bars, state, window=50):
+    x = bars['Close']
+    xx, seen, offset = _rolling_tail(x, window, state)
+    mean, _ = _rolling_mean_std(xx, window, False)
+    return {f'SMA({window})': mean[offset:]}, _next_tail(xx, window, seen, len(x))
+
+
+def bollinger(bars, state, window=20, k=2.0):
+    x = bars['Close']
+    xx, seen, offset = _rolling_tail(x, window, state)
+    mean, std = _rolling_mean_std(xx, window, True)
+    mean, std = mean[offset:], std[offset:]
+    return ({f'BB upper({window},{k:g})': mean + k * std,
+             f'BB middle({window},{k:g})': mean,
+             f'BB lower({window},{k:g})': mean - k * std},
+            _next_tail(xx, window, seen, len(x)))
+
+
+def _warmup_mask(values, seen, warmup):
+    """
+    This function hides the first `warmup` values of a smoothed series.
+    """
+    position = seen + np.arange(len(values))
+    return np.where(position < warmup, np.nan, values)
+
+
+def ema(bars, state, window=20):
+    x = bars['Close']
+    seen = state['seen'] if state else 0
+    values = _ema_scan(x, 2.0 / (window + 1), state['last'] if state else None)
+    new_state = {'last': values[-1] if len(values) else (state or {}).get('last'),
+                 'seen': seen + len(x)}
+    return {f'EMA({window})': _warmup_mask(values, seen, window - 1)}, new_state
+
+
+def macd(bars, state, fast=12, slow=26, signal=9):
+    x = bars['Close']
+    state = state or {'fast': None, 'slow': None, 'signal': None, 'seen': 0}
+    ema_fast = _ema_scan(x, 2.0 / (fast + 1), state['fast'])
+    ema_slow = _ema_scan(x, 2.0 / (slow + 1), state['slow'])
+    line = ema_fast - ema_slow
+    signal_line = _ema_scan(line, 2.0 / (signal + 1), state['signal'])
+    seen = state['seen']
+    new_state = state if not len(x) else {
+        'fast': ema_fast[-1], 'slow': ema_slow[-1], 'signal': signal_line[-1],
+        'seen': seen + len(x)}
+    name = f'({fast},{slow},{signal})'
+    return ({'MACD' + name: _warmup_mask(line, seen, slow - 1),
+             'MACD signal' + name: _warmup_mask(signal_line, seen, slow + signal - 2),
+             'MACD histogram' + name: _warmup_mask(line - signal_line, seen, slow + signal - 2)},
+            new_state)
+
+
+def rsi(bars, state, window=14):
+    """
+    Relative Strength Index with Wilder's smoothing (alpha = 1 / window).
+    """
+    x = bars['Close']
+    state = state or {'close': None, 'gain': None, 'loss': None, 'seen': 0}
+    if state['close'] is None:
+        # The very first bar has no change: the smoothing starts on the second
+        delta = np.concatenate([[np.nan], np.diff(x)])
+        start = 1
+    else:
+        delta = np.diff(np.concatenate([[state['close']], x]))
+        start = 0
+    gain = np.full(len(x), np.nan)
+    loss = np.full(len(x), np.nan)
+    gain[start:] = _ema_scan(np.maximum(delta[start:], 0), 1.0 / window, state['gain'])
+    loss[start:] = _ema_scan(np.maximum(-delta[start:], 0), 1.0 / window, state['loss'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+    seen = state['seen']
+    smoothed = len(x) > start
+    new_state = state if not len(x) else {
+        'close': x[-1], 'seen': seen + len(x),
+        'gain': gain[-1] if smoothed else state['gain'],
+        'loss': loss[-1] if smoothed else state['loss']}
+    return {f'RSI({window})': _warmup_mask(values, seen, window)}, new_state
+
+
+def atr(bars, state, window=14):
+    """
+    Average True Range with Wilder's smoothing (alpha = 1 / window).
+    """
+    high, low, close = bars['High'], bars['Low'], bars['Close']
+    state = state or {'close': None, 'atr': None, 'seen': 0}
+    prev_close = np.concatenate([[state['close'] if state['close'] is not None else np.nan],
+                                 close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    values = _ema_scan(true_range, 1.0 / window, state['atr'])
+    seen = state['seen']
+    new_state = state if not len(close) else {
+        'close': close[-1], 'atr': values[-1], 'seen': seen + len(close)}
+    return {f'ATR({window})': _warmup_mask(values, seen, window - 1)}, new_state
+
+
+def vwap(bars, state):
+    """
+    Volume Weighted Average Price, anchored at the first bar of the range.
+    """
+    typical = (bars['High'] + bars['Low'] + bars['Close']) / 3
+    state = state or {'pv': 0.0, 'volume': 0.0}
+    cum_pv = state['pv'] + np.cumsum(typical * bars['Volume'])
+    cum_volume = state['volume'] + np.cumsum(bars['Volume'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(cum_volume > 0, cum_pv / cum_volume, np.nan)
+    new_state = state if not len(typical) else {'pv': cum_pv[-1], 'volume': cum_volume[-1]}
+    return {'VWAP': values}, new_state
+
+
+# Name -> (function, default parameters, drawn over the price or in its own panel)
+INDICATORS = {
+    'SMA': (sma, {'window': 50}, True),
+    'EMA': (ema, {'window': 20}, True),
+    'Bollinger bands': (bollinger, {'window': 20, 'k': 2.0}, True),
+    'VWAP': (vwap, {}, True),
+    'RSI': (rsi, {'window': 14}, False),
+    'MACD': (macd, {'fast': 12, 'slow': 26, 'signal': 9}, False),
+    'ATR': (atr, {'window': 14}, False),
+}
+
+#==============================================================================
+# Cache
+#==============================================================================
+
+def _bars_arrays(df):
+    return {c: df[c].to_numpy(dtype=np.float64) for c in ('Open', 'High', 'Low', 'Close', 'Volume')
+            if c in df}
+
+
+def _fingerprint(arrays, end=None):
+    """
+    This function hashes the values of the bars (the first `end` ones), so a
+    cached result is only used for the same prices, not just the same dates.
+    """
+    digest = hashlib.sha1()
+    for column in sorted(arrays):
+        digest.update(memoryview(np.ascontiguousarray(arrays[column][:end])))
+    return digest.digest()
+
+
+def compute(df, name, **params):
+    """
+    This function computes an indicator over all the bars of df (a DataFrame
+    with a DatetimeIndex). Returns a new DataFrame; df is not modified.
+    """
+    func, defaults, _ = INDICATORS[name]
+    params = {**defaults, **params}
+    columns, _ = func(_bars_arrays(df), None, **params)
+    return pd.DataFrame(columns, index=df.index)
+
+
+class IndicatorCache:
+    """
+    Results of the indicators, keyed by (ticker, indicator, parameters, first
+    bar). Each entry remembers its last bar, a fingerprint of the values of
+    its bars and the state of the indicator: when the same request comes with
+    newer bars, only the new bars are computed and appended. Bars whose
+    values changed (today's bar refreshed, the history adjusted after a
+    split) are computed again in full. The cached frames are never given out: callers get
+    copies, and the price frames passed in are never modified.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'appends': 0, 'misses': 0}
+
+    def get(self, ticker, df, name, **params):
+        func, defaults, _ = INDICATORS[name]
+        params = {**defaults, **params}
+        if len(df) == 0:
+            return compute(df, name, **params)
+        key = (ticker, name, tuple(sorted(params.items())), df.index[0])
+
+        with self._lock:
+            entry = self._entries.get(key)
+        arrays = _bars_arrays(df)
+
+        if (entry is not None and entry['result'].index.equals(df.index)
+                and entry['fingerprint'] == _fingerprint(arrays)):
+            with self._lock:
+                self.stats['hits'] += 1
+            return entry['result'].copy()
+
+        # Position just after the cached last bar (when it is in df). The
+        # bars before it must be the cached ones, with the same values: a bar
+        # added, removed or changed in the middle means a full computation.
+        pos = df.index.searchsorted(entry['last_bar'], side='right') if entry is not None else 0
+        if (entry is not None and 0 < pos < len(df) and len(entry['result']) == pos
+                and entry['result'].index.equals(df.index[:pos])
+                and entry['fingerprint'] == _fingerprint(arrays, pos)):
+            # Only the bars after the cached ones
+            new_bars = {c: values[pos:] for c, values in arrays.items()}
+            columns, state = func(new_bars, entry['state'], **params)
+            cached = entry['result']
+            result = pd.DataFrame({c: np.concatenate([cached[c].to_numpy(), columns[c]])
+                                   for c in cached}, index=df.index)
+            counter = 'appends'
+        else:
+            columns, state = func(arrays, None, **params)
+            result = pd.DataFrame(columns, index=df.index)
+            counter = 'misses'
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = {'result': result, 'state': state, 'last_bar': df.index[-1],
+                                  'fingerprint': _fingerprint(arrays)}
+            self.stats[counter] += 1
+        return result.copy()
+
+###############################################################################
+# END
+###############################################################################
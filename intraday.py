@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# INTRADAY BARS: RING BUFFERS AND LIVE FEEDS
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Supported bar intervals -> pandas frequency
+INTERVALS = {'1m': '1min', '5m': '5min', '15m': '15min'}
+
+# Bars kept per ticker and interval: 5 sessions of 1 minute bars
+BUFFER_BARS = 5 * 390
+
+#==============================================================================
+# Ring buffer
+#==============================================================================
+
+class BarBuffer:
+    """
+    Fixed-size buffer of the last `capacity` bars of one ticker and interval,
+    stored in preallocated numpy arrays (bar times in UTC nanoseconds and the
+    OHLCV values). Appending overwrites the oldest bars, so the memory never
+    grows.
+
+    Every bar gets a position: the number of bars appended before it. Readers
+    remember the position they stopped at and ask since(position) for the
+    bars after it. The last bar of a live feed is still changing: when the
+    feed sends it again with the same time, it is updated in place (its
+    position does not change).
+    """
+
+    def __init__(self, capacity=BUFFER_BARS, tz=None):
+        self.capacity = capacity
+        self.tz = tz
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(FIELDS)))
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def last_time(self):
+        """
+        This function returns the time of the last bar (a Timestamp), or None.
+        """
+        with self._lock:
+            if self.total == 0:
+                return None
+            value = self.times[(self.total - 1) % self.capacity]
+        return pd.Timestamp(value, tz='UTC').tz_convert(self.tz)
+
+    def append(self, times, values):
+        """
+        This function adds bars (times: int64 UTC nanoseconds in increasing
+        order, values: array of shape (n, 5)). Bars older than the last one
+        are ignored; a bar at the time of the last one replaces it.
+
+        Returns the position of the first bar changed (self.total when
+        nothing changed).
+        """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(times), len(FIELDS))
+        with self._lock:
+            first_changed = self.total
+            if self.total and len(times):
+                last_slot = (self.total - 1) % self.capacity
+                keep = times >= self.times[last_slot]
+                times, values = times[keep], values[keep]
+                if len(times) and times[0] == self.times[last_slot]:
+                    self.values[last_slot] = values[0]
+                    times, values = times[1:], values[1:]
+                    first_changed = self.total - 1
+            n = len(times)
+            if n:
+                # Only the last `capacity` new bars can be kept
+                skip = max(0, n - self.capacity)
+                slots = (self.total + np.arange(skip, n)) % self.capacity
+                self.times[slots] = times[skip:]
+                self.values[slots] = values[skip:]
+                self.total += n
+        return first_changed
+
+    def append_frame(self, df):
+        """
+        This function adds the bars of a DataFrame (DatetimeIndex, FIELDS
+        columns). See append.
+        """
+        if df is None or len(df) == 0:
+            return self.total
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is None:
+            index = index.tz_localize(self.tz or 'UTC')
+        if self.tz is None:
+            self.tz = str(index.tz)
+        times = index.tz_convert('UTC').as_unit('ns').asi8
+        return self.append(times, df.reindex(columns=FIELDS).to_numpy(dtype=np.float64))
+
+    def since(self, position=0):
+        """
+        This function returns the bars from position on (the ones that were
+        overwritten are skipped) as a DataFrame, oldest first.
+        """
+        with self._lock:
+            start = max(position, self.total - self.capacity, 0)
+            slots = np.arange(start, self.total) % self.capacity
+            times, values = self.times[slots], self.values[slots]
+        index = pd.DatetimeIndex(pd.to_datetime(times, utc=True), name='Datetime')
+        return pd.DataFrame(values, index=index.tz_convert(self.tz), columns=FIELDS)
+
+    def frame(self):
+        """
+        This function returns all the bars kept, oldest first.
+        """
+        return self.since(0)
+
+#==============================================================================
+# Feeds
+#==============================================================================
+# A feed is a function (ticker, interval, since) -> DataFrame of the bars
+# from `since` on (a Timestamp, included, or None for the latest session),
+# with a DatetimeIndex and the FIELDS columns.
+
+def yahoo_intraday(ticker, interval, since=None):
+    """
+    This function is the live feed: intraday bars from Yahoo Finance (1m bars
+    go back 7 days, 5m and 15m bars 60 days). Only the bars from `since` on
+    are requested.
+    """
+    import yfinance as yf
+    if since is None:
+        df = yf.Ticker(ticker).history(period='1d', interval=interval)
+    else:
+        df = yf.Ticker(ticker).history(start=since, interval=interval)
+        df = df[df.index >= since]
+    return df.reindex(columns=FIELDS)
+
+
+def resample_bars(df, interval):
+    """
+    This function groups 1 minute bars into bars of the interval. The last
+    bar is partial when its interval is not over yet.
+    """
+    rule = INTERVALS[interval]
+    if rule == '1min' or len(df) == 0:
+        return df
+    bars = df.resample(rule, label='left', closed='left').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    return bars.dropna(subset=['Close'])
+
+
+class ReplayFeed:
+    """
+    Feed that replays recorded 1 minute bars as if they were arriving now, at
+    `speed` times the real pace (60: one minute of bars per second). The
+    replay starts `warmup` bars after the first recorded bar and stops at the
+    last one; 5m and 15m bars are built from the 1m bars, with a partial last
+    bar like a live feed.
+
+    source is a function ticker -> DataFrame of 1 minute bars (e.g.
+    FixtureSource.intraday). clock can be replaced to drive the replay
+    without waiting.
+    """
+
+    def __init__(self, source, speed=60.0, warmup=60, clock=time.monotonic):
+        self.source = source
+        self.speed = speed
+        self.warmup = warmup
+        self.clock = clock
+        self._bars = {}
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def replay_time(self, ticker):
+        """
+        This function returns the current time of the replay of the ticker.
+        """
+        with self._lock:
+            if ticker not in self._bars:
+                self._bars[ticker] = self.source(ticker).reindex(columns=FIELDS)
+                self._started[ticker] = self.clock()
+            bars, started = self._bars[ticker], self._started[ticker]
+        if len(bars) == 0:
+            return None
+        first = bars.index[min(self.warmup, len(bars) - 1)]
+        # Whole seconds, to compare with the bar times in any time unit
+        return first + pd.Timedelta(seconds=int((self.clock() - started) * self.speed))
+
+    def __call__(self, ticker, interval, since=None):
+        now = self.replay_time(ticker)
+        bars = self._bars[ticker]
+        if now is None:
+            return bars.reindex(columns=FIELDS)
+        # The bars that started before the replay time, from the start of the
+        # day (or of the interval of `since`, to rebuild it)
+        first = now.normalize() if since is None else since
+        lo = bars.index.searchsorted(first, side='left')
+        hi = bars.index.searchsorted(now, side='right')
+        return resample_bars(bars.iloc[lo:hi], interval)
+
+#==============================================================================
+# Streams
+#==============================================================================
+
+class IntradayStream:
+    """
+    Ring buffers of intraday bars per (ticker, interval), fed by a feed.
+    update() asks the feed only for the bars from the last one kept (which
+    may still be changing) and appends them; nothing is fetched again.
+    """
+
+    def __init__(self, feed=yahoo_intraday, capacity=BUFFER_BARS):
+        self.feed = feed
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self.stats = {'updates': 0, 'bars_received': 0}
+
+    def buffer(self, ticker, interval):
+        with self._lock:
+            key = (ticker, interval)
+            if key not in self._buffers:
+                self._buffers[key] = BarBuffer(self.capacity)
+            return self._buffers[key]
+
+    def update(self, ticker, interval):
+        """
+        This function appends the new bars of the ticker and returns the
+        position of the first bar changed (see BarBuffer.append).
+        """
+        buffer = self.buffer(ticker, interval)
+        bars = self.feed(ticker, interval, buffer.last_time())
+        with self._lock:
+            self.stats['updates'] += 1
+            self.stats['bars_received'] += len(bars)
+        return buffer.append_frame(bars)
+
+###############################################################################
+# END
+###############################################################################
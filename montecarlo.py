@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# MONTE CARLO SIMULATION ENGINE
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+#==============================================================================
+# Single ticker simulation
+#==============================================================================
+
+def simulate_price_paths(last_price, daily_volatility, simulations, time_horizon,
+                         seed=123, mean=0.0, dtype=np.float64):
+    """
+    This function simulates future stock prices with a random walk on the
+    daily returns, the same model used by the Monte Carlo tab:
+
+        price[t] = price[t - 1] * (1 + r[t]),  r[t] ~ Normal(mean, daily_volatility)
+
+    All the returns are drawn in one batch into a preallocated
+    (time_horizon x simulations) array, which is then turned into prices with
+    a cumulative product, so there is no Python loop over paths or days.
+
+    Returns a numpy array of shape (time_horizon, simulations).
+    """
+    rng = np.random.default_rng(seed)
+    paths = np.empty((time_horizon, simulations), dtype=dtype)
+    if paths.size == 0:
+        return paths
+
+    # Returns: standard normal -> Normal(mean, daily_volatility) -> growth factor
+    rng.standard_normal(out=paths, dtype=dtype)
+    paths *= daily_volatility
+    paths += 1 + mean
+
+    # Growth factors -> prices
+    np.cumprod(paths, axis=0, out=paths)
+    paths *= last_price
+    return paths
+
+
+def simulate_price_df(last_price, daily_volatility, simulations, time_horizon,
+                      seed=123, mean=0.0, dtype=np.float64):
+    """
+    This function runs simulate_price_paths and returns the result as a
+    DataFrame with one column per simulation ('sim0', 'sim1', ...) and one row
+    per future day, ready for st.line_chart.
+    """
+    paths = simulate_price_paths(last_price, daily_volatility, simulations,
+                                 time_horizon, seed=seed, mean=mean, dtype=dtype)
+    columns = ['sim' + str(i) for i in range(simulations)]
+    return pd.DataFrame(paths, columns=columns, copy=False)
+
+#==============================================================================
+# Large scale simulation (chunked, streaming statistics)
+#==============================================================================
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Every day gets its own histogram of simulated prices. The bins cover
+# +/- HIST_SIGMAS standard deviations of the cumulated return around the last
+# price; prices outside that range are counted in the first/last bin.
+HIST_BINS = 2000
+HIST_SIGMAS = 8.0
+
+
+def _histogram_grid(last_price, daily_volatility, time_horizon, bins=HIST_BINS):
+    """
+    This function returns the lower edge and the bin width of the price
+    histogram for each future day (two arrays of length time_horizon).
+    """
+    days = np.arange(1, time_horizon + 1)
+    spread = last_price * max(daily_volatility, 1e-6) * HIST_SIGMAS * np.sqrt(days)
+    low = last_price - spread
+    width = 2 * spread / bins
+    return low, width
+
+
+def _simulate_chunk(args):
+    """
+    This function simulates one chunk of paths and reduces it to statistics
+    that can be added to the ones of the other chunks:
+        - count of prices per (day, bin)
+        - sum of prices per day (for the mean)
+        - count and sum of the final prices per bin (for VaR / CVaR)
+        - the first paths of the chunk (for the sample shown in the chart)
+    """
+    (seed, last_price, daily_volatility, n_paths, time_horizon,
+     bins, n_samples) = args
+    paths = simulate_price_paths(last_price, daily_volatility, n_paths,
+                                 time_horizon, seed=seed, dtype=np.float32)
+    low, width = _histogram_grid(last_price, daily_volatility, time_horizon, bins)
+
+    idx = (paths - low[:, None].astype(np.float32)) / width[:, None].astype(np.float32)
+    idx = np.clip(idx, 0, bins - 1, out=idx).astype(np.int64)
+    idx += (np.arange(time_horizon) * bins)[:, None]
+    counts = np.bincount(idx.ravel(), minlength=time_horizon * bins)
+
+    final_idx = idx[-1] - (time_horizon - 1) * bins
+    final_sums = np.bincount(final_idx, weights=paths[-1], minlength=bins)
+
+    return {'counts': counts.reshape(time_horizon, bins),
+            'sums': paths.sum(axis=1, dtype=np.float64),
+            'final_sums': final_sums,
+            'samples': np.array(paths[:, :n_samples], dtype=np.float64)}
+
+
+def _histogram_quantiles(counts, low, width, quantiles):
+    """
+    This function reads quantiles (between 0 and 1) from per-day histograms,
+    interpolating linearly inside the bin where each quantile falls.
+    Returns an array of shape (days, len(quantiles)).
+    """
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1:]
+    out = np.empty((counts.shape[0], len(quantiles)))
+    rows = np.arange(counts.shape[0])
+    for k, q in enumerate(quantiles):
+        target = q * total[:, 0]
+        b = np.argmax(cum >= target[:, None], axis=1)
+        before = np.where(b > 0, cum[rows, b - 1], 0)
+        inside = counts[rows, b]
+        frac = np.divide(target - before, inside,
+                         out=np.zeros(len(rows)), where=inside > 0)
+        out[:, k] = low + (b + frac) * width
+    return out
+
+
+def simulate_price_summary(last_price, daily_volatility, simulations, time_horizon,
+                           seed=123, chunk_size=20000, workers=None,
+                           percentiles=PERCENTILES, confidence=0.95,
+                           n_samples=20, bins=HIST_BINS, mp_context=None):
+    """
+    This function runs a large Monte Carlo simulation (100k - 1M paths) in
+    chunks of chunk_size paths and returns only aggregated statistics, so the
+    memory used does not depend on the number of simulations.
+
+    Each chunk gets its own seed spawned from the root seed, so the result is
+    the same for a given (seed, chunk_size) whatever the number of workers.
+    The chunks run on a process pool when workers > 1 (default: all CPUs),
+    started with mp_context (a multiprocessing context, e.g. 'forkserver'
+    from a threaded server; default: the platform's).
+
+    Returns a dictionary with:
+        - 'bands'  : DataFrame (one row per day) with the percentile bands
+                     ('p5', 'p25', ...) and the 'mean' price
+        - 'samples': DataFrame with a few simulated paths
+        - 'var', 'cvar': Value at Risk and Conditional VaR at the horizon, as
+                     a loss in price from last_price at the given confidence
+        - 'simulations': number of simulated paths
+    """
+    n_chunks = max(1, -(-simulations // chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    jobs = []
+    for i in range(n_chunks):
+        n_paths = min(chunk_size, simulations - i * chunk_size)
+        jobs.append((seeds[i], last_price, daily_volatility, n_paths,
+                     time_horizon, bins, n_samples if i == 0 else 0))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, n_chunks)
+
+    counts = np.zeros((time_horizon, bins), dtype=np.int64)
+    sums = np.zeros(time_horizon)
+    final_sums = np.zeros(bins)
+    samples = None
+
+    def merge(result):
+        nonlocal counts, sums, final_sums, samples
+        counts += result['counts']
+        sums += result['sums']
+        final_sums += result['final_sums']
+        if samples is None:
+            samples = result['samples']
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            for result in pool.map(_simulate_chunk, jobs):
+                merge(result)
+    else:
+        for job in jobs:
+            merge(_simulate_chunk(job))
+
+    # Percentile bands and mean for each day
+    low, width = _histogram_grid(last_price, daily_volatility, time_horizon, bins)
+    qs = [p / 100 for p in percentiles]
+    bands = pd.DataFrame(_histogram_quantiles(counts, low, width, qs),
+                         columns=['p' + str(p) for p in percentiles])
+    bands['mean'] = sums / simulations
+
+    # VaR / CVaR of the final price
+    alpha = 1 - confidence
+    var_price = _histogram_quantiles(counts[-1:], low[-1:], width[-1:], [alpha])[0, 0]
+    final_counts = counts[-1]
+    cum = np.cumsum(final_counts)
+    b = int(np.argmax(cum >= alpha * simulations))
+    tail_count = alpha * simulations
+    # Whole bins below the VaR bin, plus the needed part of the VaR bin
+    before = cum[b - 1] if b > 0 else 0
+    tail_sum = final_sums[:b].sum()
+    if final_counts[b] > 0:
+        tail_sum += (tail_count - before) * final_sums[b] / final_counts[b]
+    cvar_price = tail_sum / tail_count
+
+    columns = ['sim' + str(i) for i in range(samples.shape[1])]
+    return {'bands': bands,
+            'samples': pd.DataFrame(samples, columns=columns),
+            'var': last_price - var_price,
+            'cvar': last_price - cvar_price,
+            'simulations': simulations}
+
+#==============================================================================
+# Portfolio simulation (correlated assets)
+#==============================================================================
+
+def estimate_covariance(prices):
+    """
+    This function estimates the mean and the covariance matrix of the daily
+    returns of several assets. prices is a DataFrame with one column of close
+    prices per asset; only the days where every asset has a price are used,
+    so the returns of all the assets cover the same days.
+
+    Returns (mean Series, covariance DataFrame) indexed by the asset names.
+    """
+    aligned = prices.dropna(how='any')
+    returns = aligned.pct_change().iloc[1:]
+    if len(returns) < 2:
+        raise ValueError("Not enough common history to estimate the covariance")
+    return returns.mean(), returns.cov()
+
+
+def _cholesky(cov):
+    """
+    This function returns the lower Cholesky factor L (cov = L L^T). A matrix
+    that is only positive semi-definite (e.g. two assets moving together, or
+    more assets than days of history) is repaired first by clipping its
+    negative eigenvalues and adding a tiny jitter to the diagonal.
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        cov = (vectors * np.maximum(values, 0)) @ vectors.T
+        jitter = 1e-10 * max(np.trace(cov) / len(cov), 1e-12)
+        return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+
+
+def _simulate_portfolio_chunk(args):
+    """
+    This function simulates one chunk of portfolio paths and reduces it to
+    statistics that can be added to the ones of the other chunks (see
+    _simulate_chunk), plus the final profit of every asset on every path (for
+    the contribution of the assets to the tail losses).
+
+    The correlated returns of all the days, paths and assets are one matrix
+    product Z L^T of standard normals, done in float32 batches of
+    batch_paths paths to bound the memory.
+    """
+    (seed, holdings, mean, chol, n_paths, time_horizon, bins, n_samples,
+     batch_paths, low, width) = args
+    rng = np.random.default_rng(seed)
+    n_assets = len(holdings)
+    value = holdings.sum()
+    chol_t = chol.T.astype(np.float32)
+    growth_offset = (1 + mean).astype(np.float32)
+    holdings32 = holdings.astype(np.float32)
+
+    counts = np.zeros(time_horizon * bins, dtype=np.int64)
+    sums = np.zeros(time_horizon)
+    final_values = np.empty(n_paths)
+    final_profits = np.empty((n_paths, n_assets), dtype=np.float32)
+    samples = np.empty((time_horizon, 0))
+    day_offsets = (np.arange(time_horizon) * bins)[:, None]
+
+    for start in range(0, n_paths, batch_paths):
+        n = min(batch_paths, n_paths - start)
+        # (days * paths, assets) standard normals -> correlated returns
+        z = rng.standard_normal((time_horizon * n, n_assets), dtype=np.float32)
+        growth = (z @ chol_t).reshape(time_horizon, n, n_assets)
+        del z
+        growth += growth_offset
+        np.cumprod(growth, axis=0, out=growth)
+
+        # Buy and hold: value of the portfolio = sum of the grown holdings
+        values = growth @ holdings32                       # (days, paths)
+        final_profits[start:start + n] = growth[-1] * holdings32 - holdings32
+        del growth
+
+        idx = (values - low[:, None].astype(np.float32)) / width[:, None].astype(np.float32)
+        idx = np.clip(idx, 0, bins - 1, out=idx).astype(np.int64)
+        idx += day_offsets
+        counts += np.bincount(idx.ravel(), minlength=time_horizon * bins)
+        sums += values.sum(axis=1, dtype=np.float64)
+        final_values[start:start + n] = values[-1]
+        if samples.shape[1] < n_samples:
+            samples = np.hstack([samples, values[:, :n_samples - samples.shape[1]]])
+
+    return {'counts': counts.reshape(time_horizon, bins),
+            'sums': sums,
+            'final_values': final_values,
+            'final_profits': final_profits,
+            'samples': samples}
+
+
+def simulate_portfolio(prices, weights, value=1.0, simulations=10000, time_horizon=252,
+                       seed=123, use_mean=False, chunk_size=2500, batch_paths=500,
+                       workers=None, percentiles=PERCENTILES, confidence=0.95,
+                       n_samples=20, bins=HIST_BINS, mp_context=None):
+    """
+    This function simulates a buy-and-hold portfolio of several correlated
+    assets. The daily returns of the assets are drawn together from a
+    multivariate normal distribution whose covariance matrix is estimated
+    from the aligned history of prices (see estimate_covariance), with a
+    zero mean like the single ticker simulation unless use_mean is True.
+
+    prices is a DataFrame with one column of close prices per asset and
+    weights the share of value of each asset (a dictionary or Series by
+    column name, or a list in the column order); the weights are scaled to
+    sum to 1. value is the initial value of the portfolio.
+
+    The paths run in chunks of chunk_size paths (on a process pool started
+    with mp_context when workers > 1, default: all CPUs and the platform's
+    context), each one simulated in batches of
+    batch_paths paths: the memory used is about
+    batch_paths x time_horizon x assets x 8 bytes per worker, plus one final
+    profit per path and asset. The result does not depend on workers.
+
+    Returns a dictionary with:
+        - 'bands'        : DataFrame (one row per day) with the percentile
+                           bands ('p5', ...) and the 'mean' portfolio value
+        - 'samples'      : DataFrame with a few simulated portfolio paths
+        - 'final'        : numpy array of the final portfolio values
+        - 'var', 'cvar'  : Value at Risk and Conditional VaR at the horizon,
+                           as a loss of value at the given confidence
+        - 'contributions': DataFrame (one row per asset) with the weight, the
+                           daily volatility, the share of the portfolio
+                           variance, the expected profit and the contribution
+                           to the CVaR (the mean loss of the asset on the
+                           paths beyond the VaR; they add up to the CVaR)
+        - 'correlation'  : correlation matrix of the daily returns
+        - 'simulations'  : number of simulated paths
+    """
+    mean, cov = estimate_covariance(prices)
+    assets = list(cov.columns)
+    if isinstance(weights, (dict, pd.Series)):
+        weights = pd.Series(weights, dtype=np.float64).reindex(assets).fillna(0.0)
+    else:
+        weights = pd.Series(np.asarray(weights, dtype=np.float64), index=assets)
+    if weights.sum() == 0:
+        raise ValueError("The weights sum to zero")
+    weights = weights / weights.sum()
+    holdings = weights.to_numpy() * value
+    mean_vector = mean.to_numpy() if use_mean else np.zeros(len(assets))
+    chol = _cholesky(cov.to_numpy())
+
+    # Histogram grid of the portfolio value, from its daily volatility
+    cov_matrix = cov.to_numpy()
+    portfolio_vol = float(np.sqrt(max(weights.to_numpy() @ cov_matrix @ weights.to_numpy(), 0)))
+    drift = float(weights.to_numpy() @ mean_vector)
+    low, width = _histogram_grid(value, portfolio_vol, time_horizon, bins)
+    low = low + value * drift * np.arange(1, time_horizon + 1)
+
+    n_chunks = max(1, -(-simulations // chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    jobs = []
+    for i in range(n_chunks):
+        n_paths = min(chunk_size, simulations - i * chunk_size)
+        jobs.append((seeds[i], holdings, mean_vector, chol, n_paths, time_horizon, bins,
+                     n_samples if i == 0 else 0, batch_paths, low, width))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, n_chunks)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+            results = list(pool.map(_simulate_portfolio_chunk, jobs))
+    else:
+        results = [_simulate_portfolio_chunk(job) for job in jobs]
+
+    counts = sum(r['counts'] for r in results)
+    sums = sum(r['sums'] for r in results)
+    final = np.concatenate([r['final_values'] for r in results])
+    profits = np.concatenate([r['final_profits'] for r in results])
+
+    # Percentile bands and mean for each day
+    qs = [p / 100 for p in percentiles]
+    bands = pd.DataFrame(_histogram_quantiles(counts, low, width, qs),
+                         columns=['p' + str(p) for p in percentiles])
+    bands['mean'] = sums / simulations
+
+    # VaR / CVaR of the final value, from the exact final values
+    losses = value - final
+    var = float(np.quantile(losses, confidence))
+    tail = losses >= var
+    cvar = float(losses[tail].mean())
+
+    # Contributions of the assets
+    marginal = cov_matrix @ weights.to_numpy()
+    contributions = pd.DataFrame({
+        'weight': weights.to_numpy(),
+        'daily volatility': np.sqrt(np.diag(cov_matrix)),
+        'variance share': weights.to_numpy() * marginal / portfolio_vol ** 2
+        if portfolio_vol > 0 else np.nan,
+        'expected profit': profits.mean(axis=0, dtype=np.float64),
+        'CVaR contribution': -profits[tail].mean(axis=0, dtype=np.float64),
+    }, index=pd.Index(assets, name='asset'))
+    contributions['CVaR share'] = contributions['CVaR contribution'] / cvar if cvar else np.nan
+
+    samples = results[0]['samples']
+    std = np.sqrt(np.diag(cov_matrix))
+    return {'bands': bands,
+            'samples': pd.DataFrame(samples, columns=['sim' + str(i)
+                                                      for i in range(samples.shape[1])]),
+            'final': final,
+            'var': var,
+            'cvar': cvar,
+            'contributions': contributions,
+            'correlation': pd.DataFrame(cov_matrix / np.outer(std, std),
+                                        index=assets, columns=assets),
+            'simulations': simulations}
+
+###############################################################################
+# END
+###############################################################################
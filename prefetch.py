@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# PREFETCH AND WARM-UP OF THE TICKER DATA
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+#==============================================================================
+# Prefetcher
+#==============================================================================
+
+class Prefetcher:
+    """
+    Runs the data loaders of a ticker (profile, holders, history, ...) in
+    parallel on a background thread pool and keeps their results for ttl
+    seconds.
+
+    loaders: dictionary name -> function(ticker) returning the data.
+
+    prefetch(ticker) starts all the loaders as soon as the ticker is picked;
+    get(name, ticker) then waits only for the loader it needs (or runs it if
+    it was never started).
+
+    warm_up(tickers) queues a watchlist on its own small pool, so it never
+    delays the ticker the user picks: a warm-up job that has not started yet
+    is moved to the main pool when that ticker is asked for.
+    """
+
+    def __init__(self, loaders, max_workers=8, ttl=15 * 60, warm_up_workers=2):
+        self.loaders = loaders
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="prefetch")
+        self._warm_up_pool = ThreadPoolExecutor(max_workers=warm_up_workers,
+                                                thread_name_prefix="warm-up")
+        self._futures = {}      # (name, ticker) -> (future, start time, warm-up job)
+        self._lock = threading.Lock()
+
+    def _submit(self, name, ticker, warm_up=False):
+        """
+        This function returns the future of a loader, starting it when there
+        is no fresh one. A failed future is replaced, so errors are retried.
+        """
+        key = (name, ticker)
+        with self._lock:
+            entry = self._futures.get(key)
+            if entry is not None:
+                future, started, queued_for_warm_up = entry
+                expired = time.monotonic() - started > self.ttl
+                failed = future.done() and not future.cancelled() and future.exception() is not None
+                # Still waiting behind the watchlist: run it now instead
+                promoted = queued_for_warm_up and not warm_up and future.cancel()
+                if not expired and not failed and not promoted:
+                    return future
+            self._prune()
+            pool = self._warm_up_pool if warm_up else self._pool
+            future = pool.submit(self.loaders[name], ticker)
+            self._futures[key] = (future, time.monotonic(), warm_up)
+            return future
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, (future, started, _) in list(self._futures.items()):
+            if future.done() and now - started > self.ttl:
+                del self._futures[key]
+
+    def prefetch(self, ticker, names=None):
+        """
+        This function starts all the loaders (or only names) of the ticker in
+        the background and returns their futures.
+        """
+        return {name: self._submit(name, ticker) for name in (names or self.loaders)}
+
+    def _warm_up(self, ticker, names=None):
+        return {name: self._submit(name, ticker, warm_up=True)
+                for name in (names or self.loaders)}
+
+    def get(self, name, ticker, timeout=None):
+        """
+        This function returns the data of a loader, waiting for it if it is
+        still running.
+        """
+        return self._submit(name, ticker).result(timeout=timeout)
+
+    def warm_up(self, tickers, names=None):
+        """
+        This function queues the loaders of a whole watchlist on the warm-up
+        pool, so their data is ready (and stored in the local caches) before
+        anyone asks for it.
+        """
+        return {ticker: self._warm_up(ticker, names) for ticker in tickers}
+
+    def forget(self, ticker=None):
+        """
+        This function drops the kept results (of one ticker, or all of them).
+        """
+        with self._lock:
+            for key in [k for k in self._futures if ticker is None or k[1] == ticker]:
+                del self._futures[key]
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# PERSISTENT OHLCV PRICE STORE
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+from config import cache_path
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+_SQL_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'dividends', 'splits']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker    TEXT NOT NULL,
+    day       TEXT NOT NULL,
+    open      REAL, high REAL, low REAL, close REAL,
+    volume    INTEGER, dividends REAL, splits REAL,
+    PRIMARY KEY (ticker, day)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker    TEXT NOT NULL,
+    start_day TEXT NOT NULL,
+    end_day   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_ticker ON coverage (ticker);
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker       TEXT PRIMARY KEY,
+    tz           TEXT,
+    refreshed_at REAL
+);
+"""
+
+
+def yahoo_history(ticker, start, end):
+    """
+    This function is the default data source of the store: the daily history
+    from Yahoo Finance for [start, end).
+    """
+    import yfinance as yf
+    return yf.Ticker(ticker).history(start=start, end=end)
+
+
+def _to_day(value):
+    """
+    This function converts a date, datetime or string to a datetime.date.
+    """
+    return pd.Timestamp(value).date()
+
+
+def _missing_ranges(covered, start, end):
+    """
+    This function returns the parts of [start, end) that are not in the
+    sorted list of covered [start, end) ranges.
+    """
+    missing = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end <= cursor:
+            continue
+        if c_start >= end:
+            break
+        if c_start > cursor:
+            missing.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def _corporate_actions(df, since):
+    """
+    This function returns the days (ISO strings) of the bars with a split or
+    a dividend after the day `since`.
+    """
+    if not len(df):
+        return set()
+    events = df.reindex(columns=['Dividends', 'Stock Splits']).fillna(0).to_numpy().any(axis=1)
+    days = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+    return set(days[events & (days > pd.Timestamp(since))].strftime('%Y-%m-%d'))
+
+
+def _merge_ranges(ranges):
+    """
+    This function merges overlapping or touching [start, end) ranges.
+    """
+    merged = []
+    for r_start, r_end in sorted(ranges):
+        if merged and r_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], r_end))
+        else:
+            merged.append((r_start, r_end))
+    return merged
+
+#==============================================================================
+# Price store
+#==============================================================================
+
+class PriceStore:
+    """
+    Local SQLite store of daily OHLCV bars. For every ticker it records which
+    date ranges were already downloaded, so a request only fetches the missing
+    edges from the data source and merges them in. The store lives on disk, so
+    it survives app restarts and is shared by all the tabs.
+
+    The bars of the current day can still change, so the range from today on
+    is never marked as covered: it is fetched again when the last refresh of
+    the ticker is older than live_ttl seconds.
+
+    The source returns bars adjusted for splits and dividends, and a new
+    split or dividend changes every bar before it. So when a fetched gap has
+    one after the first stored day, the stored bars are out of date: the
+    whole range of the ticker is downloaded again in one request.
+
+    source is a function (ticker, start, end) -> DataFrame with the same
+    format as yf.Ticker.history (a fake one can be given for testing).
+    """
+
+    def __init__(self, path=None, source=yahoo_history, live_ttl=15 * 60):
+        self.path = path or cache_path("prices.sqlite")
+        self.source = source
+        self.live_ttl = live_ttl
+        self.stats = {'requests': 0, 'hits': 0, 'fetches': 0, 'rows_fetched': 0,
+                      'refetches': 0}
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def covered_ranges(self, ticker):
+        """
+        This function returns the sorted, merged list of (start, end) dates
+        already stored for the ticker.
+        """
+        with self._connect() as con:
+            rows = con.execute("SELECT start_day, end_day FROM coverage WHERE ticker = ?",
+                               (ticker,)).fetchall()
+        return _merge_ranges((date.fromisoformat(s), date.fromisoformat(e)) for s, e in rows)
+
+    def history(self, ticker, start, end):
+        """
+        This function returns the daily bars of the ticker for [start, end),
+        downloading only the ranges that are not stored yet.
+        """
+        start, end = _to_day(start), _to_day(end)
+        with self._lock:
+            ticker_lock = self._ticker_locks.setdefault(ticker, threading.Lock())
+        # One download at a time per ticker, different tickers in parallel
+        with ticker_lock:
+            fetched = self._fill_gaps(ticker, start, end)
+        with self._lock:
+            self.stats['requests'] += 1
+            if not fetched:
+                self.stats['hits'] += 1
+        return self._read(ticker, start, end)
+
+    def closes(self, tickers, start, end, max_workers=8):
+        """
+        This function returns the close prices of several tickers for
+        [start, end) as one DataFrame (one column per ticker), aligned on the
+        trading days. The index is the date without time zone, so tickers of
+        different exchanges line up. Missing tickers are fetched in parallel.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+            frames = list(pool.map(lambda t: self.history(t, start, end), tickers))
+        columns = {}
+        for ticker, df in zip(tickers, frames):
+            close = df['Close']
+            close.index = close.index.tz_localize(None).normalize()
+            columns[ticker] = close
+        return pd.DataFrame(columns).sort_index()
+
+    def _fill_gaps(self, ticker, start, end):
+        today = date.today()
+        covered = self.covered_ranges(ticker)
+        missing = _missing_ranges(covered, start, end)
+
+        # The live edge (today and after) is only refreshed after live_ttl
+        if missing and missing[-1][1] > today:
+            with self._connect() as con:
+                row = con.execute("SELECT refreshed_at FROM tickers WHERE ticker = ?",
+                                  (ticker,)).fetchone()
+            if row and row[0] and time.time() - row[0] < self.live_ttl:
+                missing[-1] = (missing[-1][0], today)
+                if missing[-1][0] >= missing[-1][1]:
+                    missing.pop()
+
+        for gap_start, gap_end in missing:
+            df = self._fetch(ticker, gap_start, gap_end)
+            actions = _corporate_actions(df, covered[0][0]) if covered else set()
+            if actions - self._stored_actions(ticker):
+                # The bars stored before it were adjusted without it
+                self._refetch(ticker, min(start, covered[0][0]), max(end, covered[-1][1]))
+                return len(missing)
+            self._write(ticker, df, gap_start, min(gap_end, today),
+                        refreshed=gap_end > today)
+        return len(missing)
+
+    def _fetch(self, ticker, start, end):
+        df = self.source(ticker, start, end)
+        with self._lock:
+            self.stats['fetches'] += 1
+            self.stats['rows_fetched'] += len(df)
+        return df
+
+    def _stored_actions(self, ticker):
+        """
+        This function returns the days of the stored splits and dividends,
+        already taken into account (e.g. today's, refreshed again).
+        """
+        with self._connect() as con:
+            rows = con.execute("SELECT day FROM prices WHERE ticker = ? AND "
+                               "(dividends != 0 OR splits != 0)", (ticker,)).fetchall()
+        return {day for (day,) in rows}
+
+    def _refetch(self, ticker, start, end):
+        """
+        This function replaces all the stored bars of the ticker with
+        [start, end) downloaded again.
+        """
+        today = date.today()
+        df = self._fetch(ticker, start, end)
+        with self._lock:
+            self.stats['refetches'] += 1
+        self.invalidate(ticker)
+        self._write(ticker, df, start, min(end, today), refreshed=end > today)
+
+    def _write(self, ticker, df, covered_start, covered_end, refreshed):
+        tz = None
+        rows = []
+        if len(df):
+            index = pd.DatetimeIndex(df.index)
+            tz = str(index.tz) if index.tz is not None else None
+            frame = df.reindex(columns=COLUMNS)
+            frame.index = index.strftime('%Y-%m-%d')
+            frame = frame.astype(object).where(frame.notna(), None)
+            rows = [(ticker, day) + tuple(values)
+                    for day, values in zip(frame.index, frame.itertuples(index=False))]
+
+        covered = self.covered_ranges(ticker)
+        if covered_start < covered_end:
+            covered = _merge_ranges(covered + [(covered_start, covered_end)])
+
+        with self._connect() as con:
+            con.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            con.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
+            con.executemany("INSERT INTO coverage VALUES (?, ?, ?)",
+                            [(ticker, s.isoformat(), e.isoformat()) for s, e in covered])
+            con.execute("INSERT INTO tickers (ticker, tz, refreshed_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(ticker) DO UPDATE SET "
+                        "tz = COALESCE(excluded.tz, tz), "
+                        "refreshed_at = CASE WHEN ? THEN excluded.refreshed_at ELSE refreshed_at END",
+                        (ticker, tz, time.time() if refreshed else None, refreshed))
+
+    def _read(self, ticker, start, end):
+        with self._connect() as con:
+            df = pd.read_sql_query(
+                "SELECT day, " + ", ".join(_SQL_COLUMNS) + " FROM prices "
+                "WHERE ticker = ? AND day >= ? AND day < ? ORDER BY day",
+                con, params=(ticker, start.isoformat(), end.isoformat()))
+            row = con.execute("SELECT tz FROM tickers WHERE ticker = ?", (ticker,)).fetchone()
+
+        index = pd.DatetimeIndex(pd.to_datetime(df.pop('day')), name='Date')
+        if row and row[0]:
+            index = index.tz_localize(row[0])
+        df.index = index
+        df.columns = COLUMNS
+        return df
+
+    def invalidate(self, ticker, start=None, end=None):
+        """
+        This function forgets the stored bars of the ticker (all of them, or
+        only [start, end)), so they are downloaded again on the next request.
+        """
+        if start is None and end is None:
+            with self._connect() as con:
+                con.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+                con.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
+                con.execute("DELETE FROM tickers WHERE ticker = ?", (ticker,))
+            return
+
+        start = _to_day(start) if start is not None else date.min
+        end = _to_day(end) if end is not None else date.max
+        kept = []
+        for c_start, c_end in self.covered_ranges(ticker):
+            if c_start < start:
+                kept.append((c_start, min(c_end, start)))
+            if c_end > end:
+                kept.append((max(c_start, end), c_end))
+        with self._connect() as con:
+            con.execute("DELETE FROM prices WHERE ticker = ? AND day >= ? AND day < ?",
+                        (ticker, start.isoformat(), end.isoformat()))
+            con.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
+            con.executemany("INSERT INTO coverage VALUES (?, ?, ?)",
+                            [(ticker, s.isoformat(), e.isoformat()) for s, e in kept])
+
+
+def fake_history_source(seed=0, tz='America/New_York'):
+    """
+    This function returns a local data source with the same format as
+    yf.Ticker.history (random walk prices on business days), plus the list of
+    the (ticker, start, end) calls made to it. Useful to check hits, misses
+    and gap filling without network.
+    """
+    import zlib
+    import numpy as np
+    calls = []
+
+    def source(ticker, start, end):
+        calls.append((ticker, start, end))
+        days = pd.bdate_range(start, pd.Timestamp(end) - timedelta(days=1), tz=tz, name='Date')
+        # The price of a day only depends on the ticker and the day
+        keys = np.array([zlib.crc32(f'{ticker}{seed}{d}'.encode()) % 10000 for d in days.date])
+        close = 100 + keys / 100
+        return pd.DataFrame({'Open': close * 0.99, 'High': close * 1.01,
+                             'Low': close * 0.98, 'Close': close,
+                             'Volume': (keys * 1000).astype('int64'),
+                             'Dividends': 0.0, 'Stock Splits': 0.0}, index=days)
+
+    return source, calls
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# FINANCIAL RATIO ENGINE
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Line items used by the ratios. When a label is missing, the next one in the
+# list is tried; when none is found the values are NaN.
+LINE_ITEMS = {
+    'current_assets': ['Current Assets'],
+    'current_liabilities': ['Current Liabilities'],
+    'inventory': ['Inventory'],
+    'cogs': ['Cost Of Revenue', 'Reconciled Cost Of Revenue'],
+    'accounts_receivable': ['Accounts Receivable', 'Receivables'],
+    'sales': ['Total Revenue', 'Operating Revenue'],
+    'net_fixed_assets': ['Total Non Current Assets'],
+    'total_assets': ['Total Assets'],
+    'total_liabilities': ['Total Liabilities Net Minority Interest', 'Total Liabilities'],
+    'ebit': ['EBIT'],
+    'interest': ['Interest Expense', 'Interest Expense Non Operating'],
+    'net_income': ['Net Income', 'Net Income Common Stockholders'],
+    'common_equity': ['Common Stock Equity', 'Stockholders Equity'],
+}
+
+# Ratio -> (group, label shown in the dashboard)
+RATIOS = {
+    'current_ratio': ('Liquidity', 'Current Ratio'),
+    'quick_ratio': ('Liquidity', 'Quick Ratio'),
+    'inventory_turnover': ('Asset management', 'Inventory Turnover Ratio'),
+    'days_sales_outstanding': ('Asset management', 'Days Sales Outstanding'),
+    'fixed_assets_turnover': ('Asset management', 'Fixed Assets Turnover'),
+    'total_assets_turnover': ('Asset management', 'Total Assets Turnover'),
+    'debt_ratio': ('Debt management', 'Debt Ratio'),
+    'times_interest_earned': ('Debt management', 'Times Interest Earned Ratio'),
+    'net_profit_margin': ('Profitability', 'Net Profit Margin Ratio'),
+    'return_on_equity': ('Profitability', 'Return On Equity'),
+    'return_on_assets': ('Profitability', 'Return On Assets'),
+}
+
+#==============================================================================
+# Panel of statements
+#==============================================================================
+
+def fetch_statements(ticker):
+    """
+    This function downloads the annual income statement and balance sheet of
+    a ticker from Yahoo Finance.
+    """
+    import yfinance as yf
+    yf_ticker = yf.Ticker(ticker)
+    return yf_ticker.income_stmt, yf_ticker.balance_sheet
+
+
+def statements_panel(statements):
+    """
+    This function turns statements in the yfinance layout (one row per line
+    item, one column per period) into one aligned panel: one row per
+    (ticker, period), one column per line item.
+
+    statements: dictionary ticker -> list of statement DataFrames.
+    """
+    frames = {}
+    for ticker, stmts in statements.items():
+        stmts = [s for s in stmts if s is not None and not s.empty]
+        if not stmts:
+            continue
+        combined = pd.concat(stmts)
+        combined = combined[~combined.index.duplicated()]
+        frames[ticker] = combined.T.apply(pd.to_numeric, errors='coerce')
+    if not frames:
+        return pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=['ticker', 'period']))
+    panel = pd.concat(frames, names=['ticker', 'period'])
+    return panel.sort_index()
+
+
+def _item(panel, name):
+    """
+    This function returns the column of a line item (first label found in
+    LINE_ITEMS), or NaN when the item is missing.
+    """
+    result = pd.Series(np.nan, index=panel.index)
+    for label in LINE_ITEMS[name]:
+        if label in panel:
+            result = result.fillna(panel[label])
+    return result
+
+
+def _div(num, den):
+    return num / den.replace(0, np.nan)
+
+#==============================================================================
+# Ratios
+#==============================================================================
+
+def compute_ratios(panel):
+    """
+    This function computes all the ratios of RATIOS for every row of the
+    panel at once. Missing line items give NaN ratios.
+    """
+    item = {name: _item(panel, name) for name in LINE_ITEMS}
+    sales = item['sales']
+
+    ratios = pd.DataFrame({
+        # Liquidity
+        'current_ratio': _div(item['current_assets'], item['current_liabilities']),
+        'quick_ratio': _div(item['current_assets'] - item['inventory'].fillna(0),
+                            item['current_liabilities']),
+        # Asset management
+        'inventory_turnover': _div(item['cogs'], item['inventory']),
+        'days_sales_outstanding': _div(item['accounts_receivable'], sales / 360),
+        'fixed_assets_turnover': _div(sales, item['net_fixed_assets']),
+        'total_assets_turnover': _div(sales, item['total_assets']),
+        # Debt management
+        'debt_ratio': _div(item['total_liabilities'], item['total_assets']),
+        'times_interest_earned': _div(item['ebit'], item['interest']),
+        # Profitability
+        'net_profit_margin': _div(item['net_income'], sales),
+        'return_on_equity': _div(item['net_income'], item['common_equity']),
+        'return_on_assets': _div(item['net_income'], item['total_assets']),
+    }, index=panel.index)
+    return ratios
+
+
+def ratio_table(tickers, fetch=fetch_statements, max_workers=8):
+    """
+    This function downloads the statements of many tickers concurrently and
+    computes their ratios in one pass. Returns the ratio table (one row per
+    (ticker, period)) and a dictionary ticker -> error for the tickers that
+    could not be downloaded.
+    """
+    def load(ticker):
+        try:
+            return ticker, fetch(ticker), None
+        except Exception as e:
+            return ticker, None, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(load, tickers))
+
+    statements = {t: s for t, s, e in results if e is None}
+    errors = {t: e for t, s, e in results if e is not None}
+    return compute_ratios(statements_panel(statements)), errors
+
+###############################################################################
+# END
+###############################################################################
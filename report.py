@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# HEADLESS BATCH REPORTS
+###############################################################################
+# The analytics of the dashboard (profile, prices, statements, Monte Carlo,
+# ratios) without Streamlit, for nightly reports on many tickers:
+#
+#   python report.py --tickers AAPL MSFT --start 2020-01-01 --out reports
+#   python report.py --universe "S&P 500" --workers 8 --simulations 100000
+#
+# Every ticker gets a folder with one Parquet file per table and a static
+# report.html; index.html links them all. Each finished ticker writes a
+# done.json with its parameters. With --resume, the tickers done with the
+# same parameters are skipped, so a rerun after a crash only does the
+# tickers left; it needs explicit --start and --end, since their defaults
+# move with the day:
+#
+#   python report.py --universe "S&P 500" --start 2021-10-18 --end 2026-10-19 --resume
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from downsample import downsample_line
+from montecarlo import simulate_price_summary
+from price_store import PriceStore
+from ratios import compute_ratios, statements_panel
+from sources import STATEMENTS, FetchHistory, FetchHolders, FetchInfo, FetchStatement
+from statement_store import StatementStore, earnings_date
+
+# Fields of the company profile and key statistics (as in the Company profile tab)
+PROFILE_KEYS = {'longName': 'Name', 'sector': 'Sector', 'industry': 'Industry',
+                'country': 'Country', 'website': 'Website',
+                'fullTimeEmployees': 'Full time employees',
+                'previousClose': 'Previous Close', 'open': 'Open', 'bid': 'Bid',
+                'ask': 'Ask', 'marketCap': 'Market Cap', 'volume': 'Volume',
+                'beta': 'Beta', 'trailingPE': 'Trailing P/E'}
+
+#==============================================================================
+# Pipeline
+#==============================================================================
+
+def load_ticker(ticker, start, end):
+    """
+    This function loads everything the report of a ticker needs: the company
+    information, the daily bars for [start, end) and the statements. Prices
+    and statements go through the local stores, so nightly runs only
+    download what changed; the statements are due again the day after the
+    earnings release found in the information.
+    """
+    prices = PriceStore(source=FetchHistory)
+    statements = StatementStore(FetchStatement, FetchHolders)
+    info = FetchInfo(ticker)
+    statements.set_earnings_date(ticker, earnings_date(info))
+    return {'info': info,
+            'history': prices.history(ticker, start, end),
+            'statements': {name: statements.statement(ticker, name) for name in STATEMENTS}}
+
+
+def analyze(ticker, data, simulations=10000, time_horizon=252, seed=123):
+    """
+    This function computes the tables of the report of a ticker from the
+    loaded data. Returns a dictionary name -> DataFrame, plus 'risk' with the
+    VaR / CVaR of the simulation.
+    """
+    info, history = data['info'], data['history']
+    tables = {'profile': pd.DataFrame({'Value': pd.Series(
+        {label: info.get(key) for key, label in PROFILE_KEYS.items()})}),
+              'prices': history}
+
+    for name, statement in data['statements'].items():
+        if statement is not None and len(statement):
+            tables[name] = statement
+
+    # Monte Carlo on the daily volatility of the period (as in the tab)
+    close = history['Close']
+    if len(close) > 2:
+        daily_volatility = float(np.std(close.pct_change()))
+        summary = simulate_price_summary(float(close.iloc[-1]), daily_volatility, simulations,
+                                         time_horizon, seed=seed, workers=1)
+        tables['monte_carlo'] = summary['bands']
+        tables['risk'] = pd.DataFrame({'Value': pd.Series({
+            'Last price': float(close.iloc[-1]), 'Daily volatility': daily_volatility,
+            'Simulations': simulations, 'Days': time_horizon,
+            'VaR 95%': summary['var'], 'CVaR 95%': summary['cvar']})})
+
+    statements = data['statements']
+    if statements.get('income_stmt') is not None and statements.get('balance_sheet') is not None:
+        panel = statements_panel({ticker: [statements['income_stmt'],
+                                           statements['balance_sheet']]})
+        tables['ratios'] = compute_ratios(panel)
+    return tables
+
+#==============================================================================
+# Output
+#==============================================================================
+
+def _for_parquet(df):
+    """
+    This function returns a copy of df that Parquet accepts: text column
+    names, and text for the columns of mixed objects.
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].map(lambda v: None if v is None else str(v))
+    return df
+
+
+def _figure_html(fig):
+    fig.update_layout(template='plotly_white', height=420, margin=dict(l=40, r=20, t=50, b=40))
+    return fig.to_html(full_html=False, include_plotlyjs='cdn')
+
+
+def render_html(ticker, tables, start, end):
+    """
+    This function returns the static HTML report of a ticker.
+    """
+    parts = [f"<h1>{html.escape(ticker)}</h1>",
+             f"<p>Prices from {start} to {end}, generated on {date.today()}.</p>",
+             "<h2>Company profile</h2>", tables['profile'].to_html()]
+
+    prices = tables['prices']
+    if len(prices):
+        line = downsample_line(prices['Close'])
+        fig = go.Figure(go.Scatter(x=line.index, y=line, mode='lines', name='Close'))
+        fig.update_layout(title=f'{ticker} Close Price')
+        parts += ["<h2>Price</h2>", _figure_html(fig)]
+
+    if 'monte_carlo' in tables:
+        bands = tables['monte_carlo']
+        fig = go.Figure()
+        for low, high, name in (('p5', 'p95', '5% - 95%'), ('p25', 'p75', '25% - 75%')):
+            fig.add_trace(go.Scatter(x=bands.index, y=bands[low], mode='lines',
+                                     line=dict(width=0), showlegend=False))
+            fig.add_trace(go.Scatter(x=bands.index, y=bands[high], mode='lines',
+                                     line=dict(width=0), fill='tonexty', name=name))
+        fig.add_trace(go.Scatter(x=bands.index, y=bands['p50'], mode='lines', name='Median'))
+        fig.update_layout(title=f'{ticker} Monte Carlo simulation', xaxis_title='Day')
+        parts += ["<h2>Monte Carlo simulation</h2>", _figure_html(fig),
+                  tables['risk'].to_html(float_format=lambda v: f"{v:,.4g}")]
+
+    if 'ratios' in tables:
+        parts += ["<h2>Financial ratios</h2>",
+                  tables['ratios'].to_html(float_format=lambda v: f"{v:.3f}", na_rep='')]
+
+    for name in STATEMENTS:
+        if name in tables:
+            parts += [f"<h2>{name.replace('_', ' ').capitalize()}</h2>",
+                      tables[name].to_html(float_format=lambda v: f"{v:,.0f}", na_rep='')]
+
+    return ("<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<title>{html.escape(ticker)} report</title>"
+            "<style>body{font-family:sans-serif;margin:2em}"
+            "table{border-collapse:collapse;font-size:12px}"
+            "td,th{border:1px solid #ddd;padding:3px 6px;text-align:right}</style>"
+            "</head><body>" + "\n".join(parts) + "</body></html>")
+
+
+def write_report(folder, ticker, tables, start, end):
+    """
+    This function writes the Parquet files and report.html of a ticker.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for name, df in tables.items():
+        _for_parquet(df).to_parquet(os.path.join(folder, name + ".parquet"))
+    with open(os.path.join(folder, "report.html"), "w", encoding="utf-8") as f:
+        f.write(render_html(ticker, tables, start, end))
+
+#==============================================================================
+# Batch
+#==============================================================================
+
+def _done_path(out, ticker):
+    return os.path.join(out, ticker, "done.json")
+
+
+def is_done(out, ticker, params):
+    """
+    This function tells if the report of the ticker was already written with
+    the same parameters.
+    """
+    try:
+        with open(_done_path(out, ticker)) as f:
+            return json.load(f)['params'] == params
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def run_ticker(ticker, out, params):
+    """
+    This function makes the report of one ticker (in a worker process).
+    Returns (ticker, seconds, error or None). The checkpoint is written last,
+    so a report interrupted half way is done again on the next run.
+    """
+    started = time.perf_counter()
+    try:
+        data = load_ticker(ticker, params['start'], params['end'])
+        tables = analyze(ticker, data, params['simulations'], params['days'], params['seed'])
+        write_report(os.path.join(out, ticker), ticker, tables, params['start'], params['end'])
+        with open(_done_path(out, ticker), "w") as f:
+            json.dump({'params': params, 'finished': time.time()}, f)
+        return ticker, time.perf_counter() - started, None
+    except Exception as e:
+        return ticker, time.perf_counter() - started, f"{type(e).__name__}: {e}"
+
+
+def write_index(out, results):
+    """
+    This function writes index.html with the status of every ticker and a
+    link to its report.
+    """
+    rows = []
+    for ticker, (status, detail) in sorted(results.items()):
+        link = (f"<a href='{html.escape(ticker)}/report.html'>{html.escape(ticker)}</a>"
+                if status != 'failed' else html.escape(ticker))
+        rows.append(f"<tr><td>{link}</td><td>{status}</td><td>{html.escape(detail)}</td></tr>")
+    with open(os.path.join(out, "index.html"), "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html><html><head><meta charset='utf-8'><title>Reports</title></head>"
+                f"<body><h1>Reports of {date.today()}</h1><table>"
+                "<tr><th>Ticker</th><th>Status</th><th></th></tr>"
+                + "\n".join(rows) + "</table></body></html>")
+
+
+def run_batch(tickers, start, end, out, workers=None, simulations=10000, days=252,
+              seed=123, resume=False, log=print):
+    """
+    This function makes the reports of the tickers on a process pool and
+    returns {ticker: (status, detail)}, status being 'done', 'skipped' or
+    'failed'. With resume, the tickers already done with the same
+    parameters are skipped.
+    """
+    params = {'start': str(start), 'end': str(end), 'simulations': simulations,
+              'days': days, 'seed': seed}
+    os.makedirs(out, exist_ok=True)
+    results = {}
+    todo = []
+    for ticker in dict.fromkeys(tickers):
+        if resume and is_done(out, ticker, params):
+            results[ticker] = ('skipped', 'already done')
+        else:
+            todo.append(ticker)
+    log(f"{len(todo)} tickers to do, {len(results)} already done")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_ticker, t, out, params) for t in todo]
+        for i, future in enumerate(as_completed(futures), 1):
+            ticker, seconds, error = future.result()
+            results[ticker] = ('failed', error) if error else ('done', f"{seconds:.1f} s")
+            log(f"[{i}/{len(todo)}] {ticker}: {error or f'{seconds:.1f} s'}")
+
+    write_index(out, results)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch reports of the dashboard analytics.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--tickers', nargs='+', help='ticker symbols')
+    group.add_argument('--universe', help='name of a universe (see universe.py)')
+    group.add_argument('--tickers-file', help='CSV file with a Symbol column')
+    parser.add_argument('--start', help='first day of the prices (default: 5 years ago)')
+    parser.add_argument('--end', help='day after the last one (default: tomorrow)')
+    parser.add_argument('--out', default='reports')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--simulations', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=252)
+    parser.add_argument('--seed', type=int, default=123)
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the tickers already done with the same parameters')
+    args = parser.parse_args(argv)
+    if args.resume and (args.start is None or args.end is None):
+        # The default dates change every day, so they would never match
+        parser.error("--resume needs explicit --start and --end dates")
+    start = args.start or str(date.today() - timedelta(days=5 * 365))
+    end = args.end or str(date.today() + timedelta(days=1))
+
+    if args.tickers:
+        tickers = args.tickers
+    else:
+        from universe import TickerUniverse, load_csv
+        table = (load_csv(args.tickers_file) if args.tickers_file
+                 else TickerUniverse(args.universe).table())
+        tickers = list(table['Symbol'])
+
+    results = run_batch(tickers, start, end, args.out, args.workers,
+                        args.simulations, args.days, args.seed, args.resume)
+    failed = [t for t, (status, _) in results.items() if status == 'failed']
+    print(f"{len(results) - len(failed)} reports in {args.out}, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# ROLLING BETA, VOLATILITY AND CORRELATION AGAINST A BENCHMARK
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import numpy as np
+import pandas as pd
+
+# Benchmarks offered in the dashboard -> label
+BENCHMARKS = {'SPY': 'S&P 500 ETF (SPY)', '^GSPC': 'S&P 500 index',
+              'QQQ': 'Nasdaq-100 ETF (QQQ)', '^DJI': 'Dow Jones index'}
+
+# Window label -> trading days
+WINDOWS = {'1 month': 21, '3 months': 63, '6 months': 126, '1 year': 252, '2 years': 504}
+
+TRADING_DAYS = 252
+
+#==============================================================================
+# Rolling statistics
+#==============================================================================
+
+def _window_sums(values, window):
+    """
+    This function returns the sum over the last `window` rows of every row
+    (axis 0), from running sums: one pass whatever the window.
+    """
+    cumulative = np.cumsum(values, axis=0)
+    sums = cumulative.copy()
+    sums[window:] -= cumulative[:-window]
+    return sums
+
+
+def rolling_stats(prices, benchmark, window=63, min_periods=None):
+    """
+    This function computes, for every ticker (column of prices) and every
+    day, the beta, the annualized volatility and the correlation of the daily
+    returns against the returns of the benchmark column, over the last
+    `window` days.
+
+    All the tickers are computed at once on (days x tickers) arrays: the
+    rolling sums of x, y, x*x, y*y and x*y come from running sums, so the
+    cost does not depend on the window. Days where a ticker or the benchmark
+    has no return are left out of its windows; a window needs min_periods
+    returns (default: 80% of it), otherwise the statistics are NaN.
+
+    Returns {'beta', 'volatility', 'correlation'}: DataFrames shaped like
+    prices, without the benchmark column.
+    """
+    min_periods = min_periods or max(2, int(window * 0.8))
+    tickers = [c for c in prices.columns if c != benchmark]
+    values = prices[tickers].to_numpy(np.float64)
+    market = prices[benchmark].to_numpy(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = values[1:] / values[:-1] - 1
+        y = (market[1:] / market[:-1] - 1)[:, None]
+        valid = np.isfinite(x) & np.isfinite(y)
+        x = np.where(valid, x, 0.0)
+        y = np.where(valid, y, 0.0)
+
+        n = _window_sums(valid.astype(np.float64), window)
+        sx, sy = _window_sums(x, window), _window_sums(y, window)
+        sxx, syy = _window_sums(x * x, window), _window_sums(y * y, window)
+        sxy = _window_sums(x * y, window)
+
+        # Sample (co)variances; tiny negative values from rounding are 0
+        cov = (sxy - sx * sy / n) / (n - 1)
+        var_x = np.maximum((sxx - sx * sx / n) / (n - 1), 0)
+        var_y = np.maximum((syy - sy * sy / n) / (n - 1), 0)
+        beta = cov / var_y
+        volatility = np.sqrt(var_x * TRADING_DAYS)
+        correlation = cov / np.sqrt(var_x * var_y)
+
+    enough = n >= min_periods
+    index = prices.index[1:]
+    return {name: pd.DataFrame(np.where(enough, stat, np.nan), index=index, columns=tickers)
+            for name, stat in (('beta', beta), ('volatility', volatility),
+                               ('correlation', correlation))}
+
+
+def latest_stats(stats):
+    """
+    This function returns the last known value of each statistic of each
+    ticker, one row per ticker.
+    """
+    return pd.DataFrame({name: df.ffill().iloc[-1] if len(df) else pd.Series(dtype=float)
+                         for name, df in stats.items()})
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# INDEXED STOCK SCREENER
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import cache_path
+
+# Numeric fields of the company information (Yahoo Finance names) -> label.
+# Ratios are fractions (returnOnEquity 0.15 is 15%).
+FIELDS = {'marketCap': 'Market Cap', 'volume': 'Volume', 'beta': 'Beta',
+          'trailingPE': 'Trailing P/E', 'returnOnEquity': 'Return on equity',
+          'returnOnAssets': 'Return on assets', 'profitMargins': 'Profit margin',
+          'currentRatio': 'Current ratio', 'quickRatio': 'Quick ratio',
+          'debtToEquity': 'Debt to equity', 'dividendYield': 'Dividend yield'}
+
+# Text fields kept with the numbers
+TEXT_FIELDS = ['shortName', 'sector']
+
+#==============================================================================
+# Snapshot
+#==============================================================================
+
+class Snapshot:
+    """
+    Columnar snapshot of the screener fields: one row per ticker, one numpy
+    array per field (NaN when unknown), plus the time each row was
+    downloaded (0 when never). A snapshot is never modified: updates build a
+    new one, so queries need no lock.
+
+    The sorted index of a field (the rows with a value, by increasing value)
+    is built on first use. A range filter is then two binary searches, and
+    the top rows by a field are read from the end of its index.
+    """
+
+    def __init__(self, symbols, columns, text, fetched_at):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.rows = {s: i for i, s in enumerate(self.symbols)}
+        self.columns = {f: np.asarray(columns[f], dtype=np.float64) for f in FIELDS}
+        self.text = {f: np.asarray(text[f], dtype=str) for f in TEXT_FIELDS}
+        self.fetched_at = np.asarray(fetched_at, dtype=np.float64)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def empty(cls):
+        return cls([], {f: [] for f in FIELDS}, {f: [] for f in TEXT_FIELDS}, [])
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def index(self, field):
+        """
+        This function returns (sorted values, rows) of a field, without the
+        rows where it is unknown.
+        """
+        with self._lock:
+            if field not in self._indexes:
+                values = self.columns[field]
+                rows = np.flatnonzero(~np.isnan(values))
+                rows = rows[np.argsort(values[rows], kind='stable')]
+                self._indexes[field] = (values[rows], rows)
+            return self._indexes[field]
+
+    def mask(self, tickers):
+        """
+        This function returns the boolean mask of the rows of the tickers.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        rows = [self.rows[t] for t in tickers if t in self.rows]
+        mask[rows] = True
+        return mask
+
+    def between(self, field, low=None, high=None):
+        """
+        This function returns the boolean mask of the rows where
+        low <= field <= high (None for no bound).
+        """
+        values, rows = self.index(field)
+        lo = 0 if low is None else np.searchsorted(values, low, side='left')
+        hi = len(values) if high is None else np.searchsorted(values, high, side='right')
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows[lo:hi]] = True
+        return mask
+
+    def query(self, filters=(), order_by='marketCap', k=20, descending=True, tickers=None):
+        """
+        This function returns the first k rows, by order_by, of the tickers
+        (all of them when None) that pass the filters: a list of
+        (field, low, high) ranges. Rows where order_by is unknown come last.
+        """
+        mask = np.ones(len(self), dtype=bool) if tickers is None else self.mask(tickers)
+        for field, low, high in filters:
+            mask &= self.between(field, low, high)
+
+        _, rows = self.index(order_by)
+        if descending:
+            rows = rows[::-1]
+        top = rows[mask[rows]][:k]
+        if len(top) < k:
+            unknown = np.flatnonzero(mask & np.isnan(self.columns[order_by]))
+            top = np.concatenate([top, unknown[:k - len(top)]])
+        return self.frame(top, total=int(mask.sum()))
+
+    def frame(self, rows, total=None):
+        """
+        This function returns the rows as a DataFrame indexed by ticker. The
+        number of rows that passed the filters is in attrs['total'].
+        """
+        df = pd.DataFrame({**{f: self.text[f][rows] for f in TEXT_FIELDS},
+                           **{f: self.columns[f][rows] for f in FIELDS}},
+                          index=pd.Index(self.symbols[rows], name='ticker'))
+        df.attrs['total'] = len(rows) if total is None else total
+        return df
+
+    def updated(self, info):
+        """
+        This function returns a new snapshot with the rows of info (a
+        DataFrame indexed by ticker, like yahoo.fetch_quote_summaries) added
+        or replaced. Rows with an error are left as they were.
+        """
+        if 'error' in info:
+            info = info[info['error'].isna()]
+        new = [t for t in info.index if t not in self.rows]
+        symbols = np.concatenate([self.symbols, np.asarray(new, dtype=str)])
+        positions = {**self.rows, **{t: len(self) + i for i, t in enumerate(new)}}
+        rows = np.array([positions[t] for t in info.index], dtype=np.int64)
+
+        def grow(column, fill):
+            return np.concatenate([column, np.full(len(new), fill, dtype=column.dtype)])
+
+        columns = {f: grow(self.columns[f], np.nan) for f in FIELDS}
+        text = {f: grow(self.text[f], '').astype(object) for f in TEXT_FIELDS}
+        fetched_at = grow(self.fetched_at, 0.0)
+        for f in FIELDS:
+            if f in info:
+                values = pd.to_numeric(info[f], errors='coerce').to_numpy(np.float64)
+                columns[f][rows] = np.where(np.isfinite(values), values, np.nan)
+        for f in TEXT_FIELDS:
+            if f in info:
+                text[f][rows] = ['' if v is None or v != v else str(v) for v in info[f]]
+        fetched_at[rows] = time.time()
+        return Snapshot(symbols, columns, text, fetched_at)
+
+    #--------------------------------------------------------------------------
+    # Storage
+    #--------------------------------------------------------------------------
+
+    def save(self, path):
+        """
+        This function writes the snapshot to a .npz file (replaced at once).
+        """
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, symbols=self.symbols, fetched_at=self.fetched_at,
+                     **{'num_' + k: v for k, v in self.columns.items()},
+                     **{'text_' + k: v for k, v in self.text.items()})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        This function reads a snapshot written by save. Fields added since
+        are unknown for every row.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            n = len(data['symbols'])
+            columns = {f: data['num_' + f] if 'num_' + f in data else np.full(n, np.nan)
+                       for f in FIELDS}
+            text = {f: data['text_' + f] if 'text_' + f in data else np.full(n, '')
+                    for f in TEXT_FIELDS}
+            return cls(data['symbols'], columns, text, data['fetched_at'])
+
+#==============================================================================
+# Screener
+#==============================================================================
+
+class Screener:
+    """
+    Keeps the snapshot of the screener fields of all the tickers seen, on
+    disk (<cache>/screener.npz) and in memory.
+
+    snapshot(tickers) answers at once with what is stored, and starts a
+    background thread that downloads, `batch` tickers at a time, the rows of
+    the tickers missing or older than ttl seconds, most outdated first. A new
+    snapshot is published after every batch, so the results fill in while
+    the refresh runs.
+
+    fetch_many is a function tickers -> DataFrame indexed by ticker with the
+    FIELDS columns and an 'error' column (see sources.FetchInfoMany).
+    """
+
+    def __init__(self, fetch_many, path=None, ttl=24 * 60 * 60, batch=50,
+                 retry_after=5 * 60):
+        self.fetch_many = fetch_many
+        self.path = path or cache_path("screener.npz")
+        self.ttl = ttl
+        self.batch = batch
+        self.retry_after = retry_after
+        self.stats = {'refreshes': 0, 'batches': 0, 'fetched': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._last_attempt = 0.0
+        try:
+            self._snapshot = Snapshot.load(self.path)
+        except (OSError, ValueError, KeyError):
+            self._snapshot = Snapshot.empty()
+
+    def stale(self, tickers):
+        """
+        This function returns the tickers to download: never downloaded
+        first, then by age, only those older than ttl.
+        """
+        snapshot = self._snapshot
+        tickers = list(dict.fromkeys(tickers))
+        fetched = np.array([snapshot.fetched_at[snapshot.rows[t]] if t in snapshot.rows else 0.0
+                            for t in tickers])
+        order = np.argsort(fetched, kind='stable')
+        limit = time.time() - self.ttl
+        return [tickers[i] for i in order if fetched[i] == 0 or fetched[i] < limit]
+
+    def refresh(self, tickers):
+        """
+        This function downloads the stale rows of the tickers batch by
+        batch, publishing and saving a new snapshot after each batch.
+        """
+        todo = self.stale(tickers)
+        with self._lock:
+            self.stats['refreshes'] += 1
+        for i in range(0, len(todo), self.batch):
+            info = self.fetch_many(todo[i:i + self.batch])
+            errors = int(info['error'].notna().sum()) if 'error' in info else 0
+            with self._lock:
+                self._snapshot = self._snapshot.updated(info)
+                snapshot = self._snapshot
+                self.stats['batches'] += 1
+                self.stats['fetched'] += len(info) - errors
+                self.stats['errors'] += errors
+            snapshot.save(self.path)
+        return self._snapshot
+
+    def _safe_refresh(self, tickers):
+        try:
+            self.refresh(tickers)
+        except Exception:
+            # Offline: keep the stored snapshot, try again after retry_after
+            pass
+
+    def refreshing(self):
+        with self._lock:
+            return self._refreshing is not None and self._refreshing.is_alive()
+
+    def snapshot(self, tickers=None):
+        """
+        This function returns the current snapshot, and starts refreshing
+        the stale rows of the tickers in the background.
+        """
+        if tickers is not None and self.stale(tickers):
+            with self._lock:
+                running = self._refreshing is not None and self._refreshing.is_alive()
+                if not running and time.time() - self._last_attempt >= self.retry_after:
+                    self._last_attempt = time.time()
+                    self._refreshing = threading.Thread(target=self._safe_refresh,
+                                                        args=(list(tickers),), daemon=True)
+                    self._refreshing.start()
+        return self._snapshot
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# CACHE SHARED BY ALL THE SESSIONS AND WORKER PROCESSES
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from config import cache_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    dataset   TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    value     BLOB NOT NULL,    -- pickled result
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (dataset, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    dataset    TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    owner      TEXT NOT NULL,   -- process and thread running the fetch
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (dataset, key)
+);
+CREATE TABLE IF NOT EXISTS failures (
+    dataset   TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    error     BLOB NOT NULL,    -- pickled exception, for the waiting processes
+    failed_at REAL NOT NULL,
+    PRIMARY KEY (dataset, key)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    dataset   TEXT PRIMARY KEY,
+    hits      INTEGER NOT NULL DEFAULT 0,
+    misses    INTEGER NOT NULL DEFAULT 0,
+    coalesced INTEGER NOT NULL DEFAULT 0,
+    errors    INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Dataset -> seconds a result is served without asking the source again
+TTLS = {
+    'info': 15 * 60,            # quotes in the company information move
+    'info_many': 15 * 60,
+    'holders': 60 * 60,         # the stores above these keep them longer
+    'statement': 60 * 60,
+    'history': 5 * 60,          # gaps of the price store, incl. the live edge
+}
+
+COUNTERS = ['hits', 'misses', 'coalesced', 'errors']
+
+#==============================================================================
+# Shared cache
+#==============================================================================
+
+class SharedCache:
+    """
+    Results of the data sources kept in SQLite (<cache>/shared.sqlite), so
+    every session of every worker process reads the same copy.
+
+    get(dataset, key, fetch) returns the stored result when it is younger
+    than the TTL of the dataset (see TTLS). Otherwise only one caller
+    fetches it, and the others wait for its result instead of making the
+    same request (single flight):
+        - in the same process, they wait on its future;
+        - in other processes, a lease row marks the key as being fetched,
+          and they poll for the stored result. The fetching thread renews
+          its lease while the fetch runs; a lease that is not renewed
+          expires after `lease` seconds, so a process that dies does not
+          block the key. Only the owner of a lease can release it.
+    When the fetch fails, its error is raised to all the callers waiting on
+    it, in every process (a failure row is left for the other processes);
+    it is not cached: the next request fetches again.
+
+    The hits, misses (fetches), coalesced requests and errors of each
+    dataset are counted in memory and added to the database at most every
+    `flush_every` seconds (and by flush), for all the processes together.
+
+    Like any SQLite database, the cache must not be carried across fork():
+    worker processes started by a process that already used it should be
+    started with 'spawn' or 'forkserver'.
+    """
+
+    def __init__(self, path=None, ttls=None, default_ttl=15 * 60, lease=60.0, poll=0.05,
+                 flush_every=5.0):
+        self.path = path or cache_path("shared.sqlite")
+        self.ttls = {**TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.lease = lease
+        self.poll = poll
+        self.flush_every = flush_every
+        self._flights = {}          # (dataset, key) -> Future of the fetch
+        self._lock = threading.Lock()
+        self._counts = {}           # dataset -> counters not flushed yet
+        self._flushed = time.monotonic()
+        self._counts_lock = threading.Lock()
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def ttl(self, dataset):
+        return self.ttls.get(dataset, self.default_ttl)
+
+    def _count(self, dataset, counter):
+        # No write on the hot path: one transaction every flush_every seconds
+        with self._counts_lock:
+            counts = self._counts.setdefault(dataset, dict.fromkeys(COUNTERS, 0))
+            counts[counter] += 1
+            due = time.monotonic() - self._flushed >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        This function adds the counters of this process to the database.
+        """
+        with self._counts_lock:
+            counts, self._counts = self._counts, {}
+            self._flushed = time.monotonic()
+        if not counts:
+            return
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in COUNTERS)
+        with self._connect() as con:
+            con.executemany(f"INSERT INTO counters (dataset, {', '.join(COUNTERS)}) "
+                            f"VALUES (?, ?, ?, ?, ?) ON CONFLICT(dataset) DO UPDATE SET {updates}",
+                            [(dataset, *(c[name] for name in COUNTERS))
+                             for dataset, c in counts.items()])
+
+    def _read(self, dataset, key):
+        """
+        This function returns (True, value) when the result is fresh, else
+        (False, None).
+        """
+        with self._connect() as con:
+            row = con.execute("SELECT value, stored_at FROM entries WHERE dataset = ? AND key = ?",
+                              (dataset, key)).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl(dataset):
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def _write(self, dataset, key, value):
+        with self._connect() as con:
+            con.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                        (dataset, key, pickle.dumps(value), time.time()))
+            con.execute("DELETE FROM failures WHERE dataset = ? AND key = ?", (dataset, key))
+
+    def _write_failure(self, dataset, key, error):
+        try:
+            blob = pickle.dumps(error)
+        except Exception:
+            # Not every exception can be pickled: keep its message
+            blob = pickle.dumps(RuntimeError(f"{type(error).__name__}: {error}"))
+        with self._connect() as con:
+            con.execute("INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?)",
+                        (dataset, key, blob, time.time()))
+
+    def _read_failure(self, dataset, key, since):
+        """
+        This function returns the error of a fetch of the key that failed
+        after since (a time), or None.
+        """
+        with self._connect() as con:
+            row = con.execute("SELECT error FROM failures WHERE dataset = ? AND key = ? "
+                              "AND failed_at >= ?", (dataset, key, since)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    #--------------------------------------------------------------------------
+    # Leases
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def _owner():
+        return f"{os.getpid()}-{threading.get_ident()}"
+
+    def _acquire(self, dataset, key):
+        """
+        This function takes the lease of a key, unless another caller holds
+        one that has not expired. Returns True when taken.
+        """
+        now = time.time()
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute("SELECT expires_at FROM leases WHERE dataset = ? AND key = ?",
+                              (dataset, key)).fetchone()
+            if row is not None and row[0] > now:
+                con.execute("ROLLBACK")
+                return False
+            con.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)",
+                        (dataset, key, self._owner(), now + self.lease))
+            con.execute("COMMIT")
+            return True
+        finally:
+            con.close()
+
+    def _release(self, dataset, key, owner):
+        # A lease taken over after it expired belongs to another caller
+        with self._connect() as con:
+            con.execute("DELETE FROM leases WHERE dataset = ? AND key = ? AND owner = ?",
+                        (dataset, key, owner))
+
+    def _renew(self, dataset, key, owner, done):
+        """
+        This function pushes back the expiry of the lease every third of the
+        lease until done is set (runs in a thread during the fetch).
+        """
+        while not done.wait(self.lease / 3):
+            with self._connect() as con:
+                con.execute("UPDATE leases SET expires_at = ? "
+                            "WHERE dataset = ? AND key = ? AND owner = ?",
+                            (time.time() + self.lease, dataset, key, owner))
+
+    def _leased(self, dataset, key):
+        with self._connect() as con:
+            row = con.execute("SELECT expires_at FROM leases WHERE dataset = ? AND key = ?",
+                              (dataset, key)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    #--------------------------------------------------------------------------
+    # Requests
+    #--------------------------------------------------------------------------
+
+    def get(self, dataset, key, fetch):
+        """
+        This function returns the result of fetch() for the key of the
+        dataset (a string, or a tuple of values with a stable repr), from
+        the cache when it is fresh. Errors of fetch are raised to all the
+        callers waiting on it (in all the processes), and are not cached.
+        """
+        key = key if isinstance(key, str) else repr(key)
+        found, value = self._read(dataset, key)
+        if found:
+            self._count(dataset, 'hits')
+            return value
+
+        with self._lock:
+            flight = self._flights.get((dataset, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(dataset, key)] = Future()
+        if not leader:
+            self._count(dataset, 'coalesced')
+            return flight.result()
+
+        try:
+            value = self._fetch_once(dataset, key, fetch)
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._flights[(dataset, key)]
+
+    def _fetch_once(self, dataset, key, fetch):
+        """
+        This function fetches the key under its lease, or waits for the
+        process holding the lease to store the result.
+        """
+        while True:
+            attempt = time.time()
+            if self._acquire(dataset, key):
+                owner = self._owner()
+                done = threading.Event()
+                try:
+                    # Stored by another process between the read and the lease
+                    found, value = self._read(dataset, key)
+                    if found:
+                        self._count(dataset, 'coalesced')
+                        return value
+                    # Slow fetches (retries, backoff) keep their lease
+                    threading.Thread(target=self._renew, args=(dataset, key, owner, done),
+                                     daemon=True).start()
+                    try:
+                        value = fetch()
+                    except Exception as e:
+                        self._count(dataset, 'errors')
+                        self._write_failure(dataset, key, e)
+                        raise
+                    self._write(dataset, key, value)
+                    self._count(dataset, 'misses')
+                    return value
+                finally:
+                    done.set()
+                    self._release(dataset, key, owner)
+
+            # Another process is fetching it: wait for its result, or its
+            # error. When the lease goes away with neither (the process
+            # died), try again.
+            while self._leased(dataset, key):
+                time.sleep(self.poll)
+            found, value = self._read(dataset, key)
+            if found:
+                self._count(dataset, 'coalesced')
+                return value
+            error = self._read_failure(dataset, key, attempt)
+            if error is not None:
+                self._count(dataset, 'coalesced')
+                raise error
+
+    def wrap(self, dataset, fetch):
+        """
+        This function returns fetch going through the cache: its arguments
+        are the key.
+        """
+        def cached(*args):
+            return self.get(dataset, args, lambda: fetch(*args))
+        return cached
+
+    #--------------------------------------------------------------------------
+    # Maintenance
+    #--------------------------------------------------------------------------
+
+    def counters(self):
+        """
+        This function returns the counters of each dataset (all the
+        processes, as far as they were flushed), with the hit ratio.
+        """
+        self.flush()
+        with self._connect() as con:
+            df = pd.read_sql_query("SELECT * FROM counters ORDER BY dataset", con,
+                                   index_col='dataset')
+        requests = df[COUNTERS[:3]].sum(axis=1)
+        df['hit ratio'] = (df['hits'] + df['coalesced']) / requests.where(requests > 0)
+        return df
+
+    def invalidate(self, dataset, *values):
+        """
+        This function deletes the results of a dataset whose key starts with
+        the values (keys made by wrap), or all of them when there are none.
+        """
+        key = repr(values)
+        # "('AAPL'," matches ('AAPL',) and ('AAPL', ...)
+        head = key[:-1] if len(values) == 1 else key[:-1] + ','
+        with self._connect() as con:
+            if values:
+                con.execute("DELETE FROM entries WHERE dataset = ? AND "
+                            "(key = ? OR substr(key, 1, ?) = ?)",
+                            (dataset, key, len(head), head))
+            else:
+                con.execute("DELETE FROM entries WHERE dataset = ?", (dataset,))
+
+    def purge(self):
+        """
+        This function deletes the results older than the TTL of their
+        dataset, the expired leases and the old failures.
+        """
+        now = time.time()
+        with self._connect() as con:
+            for (dataset,) in con.execute("SELECT DISTINCT dataset FROM entries").fetchall():
+                con.execute("DELETE FROM entries WHERE dataset = ? AND stored_at < ?",
+                            (dataset, now - self.ttl(dataset)))
+            con.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            con.execute("DELETE FROM failures WHERE failed_at < ?", (now - self.lease,))
+
+###############################################################################
+# END
+###############################################################################
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# DATA SOURCES
+###############################################################################
+# Yahoo Finance, or recorded data when FINAPP_FIXTURES points to a fixture
+# folder (see fixtures.py), for offline runs and benchmarks. Shared by the
+# dashboard and the batch reports (see report.py).
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries (yfinance is imported by the functions that use it: it takes a
+# few hundred milliseconds, and recorded runs never need it)
+import pandas as pd
+
+from config import FIXTURE_DIR, REPLAY_SPEED
+from intraday import ReplayFeed, yahoo_intraday
+from price_store import yahoo_history
+from ratios import fetch_statements
+from yahoo import YFinance, fetch_quote_summaries
+
+#==============================================================================
+# Sources
+#==============================================================================
+
+STATEMENTS = ['income_stmt', 'quarterly_income_stmt',
+              'balance_sheet', 'quarterly_balance_sheet',
+              'cash_flow', 'quarterly_cash_flow']
+
+if FIXTURE_DIR:
+    from fixtures import FixtureSource
+    fixture_source = FixtureSource(FIXTURE_DIR)
+    FetchInfo = fixture_source.info
+    FetchHolders = fixture_source.holders
+    FetchStatement = fixture_source.statement
+    FetchStatements = fixture_source.statements
+    FetchHistory = fixture_source.history
+    # The recorded 1 minute bars are replayed as a live feed
+    FetchIntraday = ReplayFeed(fixture_source.intraday, speed=REPLAY_SPEED)
+
+    def FetchInfoMany(tickers):
+        """
+        This function get the recorded information of many tickers, in the
+        format of yahoo.fetch_quote_summaries.
+        """
+        rows = {}
+        for t in tickers:
+            try:
+                rows[t] = {**fixture_source.info(t), 'error': None}
+            except Exception as e:
+                rows[t] = {'error': f"{type(e).__name__}: {e}"}
+        df = pd.DataFrame.from_dict(rows, orient='index')
+        df.index.name = 'ticker'
+        return df
+else:
+    def FetchInfo(ticker):
+        """
+        This function get the company information from Yahoo Finance.
+        """
+        return YFinance(ticker).info
+
+    def FetchHolders(ticker):
+        """
+        This function get the major and institutional shareholders.
+        """
+        import yfinance as yf
+        yf_ticker = yf.Ticker(ticker)
+        return yf_ticker.major_holders, yf_ticker.institutional_holders
+
+    def FetchStatement(ticker, name):
+        """
+        This function get one financial statement (see STATEMENTS).
+        """
+        import yfinance as yf
+        return getattr(yf.Ticker(ticker), name)
+
+    FetchStatements = fetch_statements
+    FetchHistory = yahoo_history
+    FetchIntraday = yahoo_intraday
+
+    def FetchInfoMany(tickers):
+        """
+        This function get the profile and key statistics of many tickers at
+        once. A ticker that fails has its error in the 'error' column.
+        """
+        return fetch_quote_summaries(list(tickers), rate_limit=20)
+
+###############################################################################
+# END
+###############################################################################
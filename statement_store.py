@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# PERSISTENT STORE OF FINANCIAL STATEMENTS AND HOLDERS
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from config import cache_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS periods (
+    ticker  TEXT NOT NULL,
+    name    TEXT NOT NULL,      -- statement name, or 'holders'
+    period  TEXT NOT NULL,      -- period end (YYYY-MM-DD), '' for holders
+    data    BLOB NOT NULL,      -- pickled Series (one period), or tuple of frames
+    PRIMARY KEY (ticker, name, period)
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    ticker     TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    fetched_at REAL,            -- last download that returned data
+    checked_at REAL,            -- last download attempt
+    PRIMARY KEY (ticker, name)
+);
+"""
+
+# Statement -> (days between two periods, days before the earliest filing
+# after a period end). Annual reports (10-K) come 60 to 90 days after the
+# year end, quarterly reports (10-Q) 40 to 45 days after the quarter end;
+# large companies file earlier, so the store starts to look a bit before.
+CADENCE = {'annual': (365, 30), 'quarterly': (91, 20)}
+
+# Institutional holdings (13F) are filed 45 days after the quarter end
+HOLDERS_LAG = 45
+
+#==============================================================================
+# Schedule
+#==============================================================================
+
+def _quarter_end(day):
+    """
+    This function returns the last day of the quarter of a date.
+    """
+    month = 3 * ((day.month - 1) // 3 + 1)
+    return (pd.Timestamp(day.year, month, 1) + pd.offsets.MonthEnd(0)).date()
+
+
+def statement_due(name, last_period, earnings_date=None):
+    """
+    This function returns the first day a statement can have a new period:
+    the end of the next period plus the filing lag (see CADENCE), or the day
+    after the next earnings release when it is known and comes earlier.
+    """
+    cadence, lag = CADENCE['quarterly' if name.startswith('quarterly_') else 'annual']
+    due = last_period + timedelta(days=cadence + lag)
+    if earnings_date is not None and last_period < earnings_date < due:
+        due = earnings_date + timedelta(days=1)
+    return due
+
+
+def earnings_date(info):
+    """
+    This function returns the date of the next earnings release from the
+    company information of Yahoo Finance, or None.
+    """
+    stamp = info.get('earningsTimestampStart') or info.get('earningsTimestamp')
+    try:
+        return datetime.fromtimestamp(float(stamp)).date() if stamp else None
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def holders_due(fetched_on):
+    """
+    This function returns the first day new holders can be published: the
+    first 13F deadline (a quarter end plus HOLDERS_LAG days) after the day of
+    the last download, i.e. the one of the previous quarter when it is still
+    ahead.
+    """
+    previous = _quarter_end(fetched_on - pd.offsets.QuarterEnd(1))
+    for quarter_end in (previous, _quarter_end(fetched_on)):
+        deadline = quarter_end + timedelta(days=HOLDERS_LAG)
+        if deadline > fetched_on:
+            return deadline
+
+#==============================================================================
+# Store
+#==============================================================================
+
+class StatementStore:
+    """
+    Local SQLite store of the financial statements (one row per ticker,
+    statement and period) and of the holders of each ticker. The data only
+    changes when the company files, so a statement is downloaded again only
+    once a new period is expected (see statement_due), or after invalidate.
+    Periods that Yahoo no longer returns are kept, so the history grows.
+
+    When a new period is expected but not published yet, the download is
+    retried at most every `recheck` seconds. If a download fails, the stored
+    data is returned when there is some.
+
+    fetch_statement is a function (ticker, name) -> DataFrame (line items x
+    period ends) and fetch_holders a function ticker -> (major, institutional).
+    The date of the next earnings release of a ticker, when it is known (see
+    set_earnings_date), makes the statements due the day after it. When a
+    statement is not due yet and the date was never set, it is asked from
+    earnings, a function ticker -> date or None (if given), before deciding.
+    """
+
+    def __init__(self, fetch_statement, fetch_holders, path=None,
+                 recheck=12 * 60 * 60, clock=time.time, earnings=None):
+        self.fetch_statement = fetch_statement
+        self.fetch_holders = fetch_holders
+        self.earnings = earnings
+        self.earnings_dates = {}
+        self.path = path or cache_path("statements.sqlite")
+        self.recheck = recheck
+        self.clock = clock
+        self.stats = {'requests': 0, 'hits': 0, 'fetches': 0}
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _count(self, hit):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['hits' if hit else 'fetches'] += 1
+
+    def _fetch_times(self, ticker, name):
+        with self._connect() as con:
+            row = con.execute("SELECT fetched_at, checked_at FROM fetches "
+                              "WHERE ticker = ? AND name = ?", (ticker, name)).fetchone()
+        return row or (None, None)
+
+    def _rows(self, ticker, name):
+        with self._connect() as con:
+            return con.execute("SELECT period, data FROM periods WHERE ticker = ? AND name = ? "
+                               "ORDER BY period DESC", (ticker, name)).fetchall()
+
+    def _mark(self, con, ticker, name, fetched):
+        now = self.clock()
+        con.execute("INSERT INTO fetches (ticker, name, fetched_at, checked_at) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(ticker, name) DO UPDATE SET "
+                    "fetched_at = COALESCE(excluded.fetched_at, fetched_at), "
+                    "checked_at = excluded.checked_at",
+                    (ticker, name, now if fetched else None, now))
+
+    def _due(self, ticker, name, last_period, fetched_at, checked_at):
+        """
+        This function tells if the data must be downloaded again.
+        """
+        now = self.clock()
+        if fetched_at is None:
+            # Never downloaded (or only failures): retry after `recheck`
+            return checked_at is None or now - checked_at >= self.recheck
+        today = datetime.fromtimestamp(now).date()
+        if name == 'holders':
+            due = holders_due(datetime.fromtimestamp(fetched_at).date())
+        elif last_period is None:
+            due = today
+        else:
+            due = statement_due(name, last_period, self.earnings_dates.get(ticker))
+            if today < due and ticker not in self.earnings_dates:
+                # E.g. the company information is still loading: do not
+                # decide on the cadence alone
+                due = statement_due(name, last_period, self._lookup_earnings_date(ticker))
+        return today >= due and now - checked_at >= self.recheck
+
+    def _lookup_earnings_date(self, ticker):
+        """
+        This function gets the next earnings date of the ticker from the
+        earnings function, once (None when unknown or when it fails).
+        """
+        day = None
+        if self.earnings is not None:
+            try:
+                day = self.earnings(ticker)
+            except Exception:
+                pass
+        with self._lock:
+            # Unless it was set meanwhile (set_earnings_date)
+            return self.earnings_dates.setdefault(ticker, day)
+
+    def set_earnings_date(self, ticker, day):
+        """
+        This function records the date of the next earnings release of the
+        ticker (a date, or None when unknown).
+        """
+        with self._lock:
+            self.earnings_dates[ticker] = day
+
+    #--------------------------------------------------------------------------
+    # Statements
+    #--------------------------------------------------------------------------
+
+    def statement(self, ticker, name):
+        """
+        This function returns a statement of the ticker (e.g. 'income_stmt',
+        'quarterly_balance_sheet'), newest period first, like yfinance.
+        """
+        with self._ticker_lock(ticker):
+            rows = self._rows(ticker, name)
+            last_period = date.fromisoformat(rows[0][0]) if rows else None
+            if not self._due(ticker, name, last_period, *self._fetch_times(ticker, name)):
+                self._count(hit=True)
+                return self._frame(rows)
+            self._count(hit=False)
+            try:
+                df = self.fetch_statement(ticker, name)
+            except Exception:
+                with self._connect() as con:
+                    self._mark(con, ticker, name, fetched=False)
+                if rows:
+                    return self._frame(rows)
+                raise
+            self._write_statement(ticker, name, df)
+            return self._frame(self._rows(ticker, name))
+
+    def _write_statement(self, ticker, name, df):
+        fetched = df is not None and len(df.columns) > 0
+        rows = []
+        if fetched:
+            for period in df.columns:
+                day = pd.Timestamp(period).date().isoformat()
+                rows.append((ticker, name, day, pickle.dumps(df[period])))
+        with self._connect() as con:
+            con.executemany("INSERT OR REPLACE INTO periods VALUES (?, ?, ?, ?)", rows)
+            self._mark(con, ticker, name, fetched)
+
+    @staticmethod
+    def _frame(rows):
+        if not rows:
+            return pd.DataFrame()
+        columns = []
+        for period, data in rows:
+            series = pickle.loads(data)
+            series.name = pd.Timestamp(period)
+            columns.append(series)
+        return pd.concat(columns, axis=1)
+
+    def statements(self, ticker):
+        """
+        This function returns the annual (income statement, balance sheet) of
+        the ticker, the input of ratios.statements_panel.
+        """
+        return self.statement(ticker, 'income_stmt'), self.statement(ticker, 'balance_sheet')
+
+    #--------------------------------------------------------------------------
+    # Holders
+    #--------------------------------------------------------------------------
+
+    def holders(self, ticker):
+        """
+        This function returns (major holders, institutional holders).
+        """
+        name = 'holders'
+        with self._ticker_lock(ticker):
+            rows = self._rows(ticker, name)
+            if rows and not self._due(ticker, name, None, *self._fetch_times(ticker, name)):
+                self._count(hit=True)
+                return pickle.loads(rows[0][1])
+            self._count(hit=False)
+            try:
+                holders = tuple(self.fetch_holders(ticker))
+            except Exception:
+                with self._connect() as con:
+                    self._mark(con, ticker, name, fetched=False)
+                if rows:
+                    return pickle.loads(rows[0][1])
+                raise
+            with self._connect() as con:
+                con.execute("INSERT OR REPLACE INTO periods VALUES (?, ?, '', ?)",
+                            (ticker, name, pickle.dumps(holders)))
+                self._mark(con, ticker, name, fetched=True)
+            return holders
+
+    #--------------------------------------------------------------------------
+    # Invalidation
+    #--------------------------------------------------------------------------
+
+    def invalidate(self, ticker, name=None):
+        """
+        This function makes the next request of a statement (or of 'holders',
+        or of everything of the ticker when name is None) download it again.
+        The stored periods are kept.
+        """
+        with self._connect() as con:
+            if name is None:
+                con.execute("DELETE FROM fetches WHERE ticker = ?", (ticker,))
+            else:
+                con.execute("DELETE FROM fetches WHERE ticker = ? AND name = ?", (ticker, name))
+
+###############################################################################
+# END
+###############################################################################
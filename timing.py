@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# PER-STAGE TIMING INSTRUMENTATION
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+
+#==============================================================================
+# Recorder
+#==============================================================================
+
+# tracemalloc is process-wide: it runs while at least one recorder traces
+_tracing_lock = threading.Lock()
+_tracing_recorders = 0
+
+
+def _start_tracing():
+    global _tracing_recorders
+    with _tracing_lock:
+        _tracing_recorders += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def _stop_tracing():
+    global _tracing_recorders
+    with _tracing_lock:
+        _tracing_recorders -= 1
+        if _tracing_recorders == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def payload_size(obj):
+    """
+    This function returns the size in bytes of what is sent or kept for an
+    object: the JSON of a Plotly figure, the memory of a DataFrame/Series, or
+    the length of a string/bytes.
+    """
+    if hasattr(obj, 'to_plotly_json'):
+        return len(obj.to_json())
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(payload_size(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(payload_size(v) for v in obj)
+    return 0
+
+
+class Recorder:
+    """
+    Collects, for each named stage of a rerun: the wall time, the memory
+    allocated (peak traced by tracemalloc, when trace_allocations is on) and
+    the size of the payloads produced (figures, frames, when
+    measure_payloads is on).
+
+    Stages can be nested; each one is recorded with its full time. The peak
+    is reset by the outermost stage only, so a nested stage reports the
+    peak since the outermost one started. The dashboard keeps one recorder
+    per session; tracemalloc is stopped when no recorder traces any more.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.measure_payloads = False
+        self._tracing = None        # finalizer releasing tracemalloc
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @property
+    def trace_allocations(self):
+        return self._tracing is not None
+
+    @trace_allocations.setter
+    def trace_allocations(self, on):
+        if on and self._tracing is None:
+            _start_tracing()
+            # Also released when the recorder goes away with its session
+            self._tracing = weakref.finalize(self, _stop_tracing)
+        elif not on and self._tracing is not None:
+            self._tracing()
+            self._tracing = None
+
+    def reset(self):
+        with self._lock:
+            self.records = {}
+
+    def _record(self, name):
+        return self.records.setdefault(name, {'seconds': 0.0, 'calls': 0,
+                                              'alloc_bytes': 0, 'payload_bytes': 0})
+
+    @contextmanager
+    def stage(self, name):
+        """
+        This function times the code of a `with recorder.stage(name):` block.
+        """
+        tracing = self.trace_allocations
+        if tracing:
+            if self._depth == 0:
+                tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            alloc = tracemalloc.get_traced_memory()[1] - before if tracing else 0
+            with self._lock:
+                record = self._record(name)
+                record['seconds'] += elapsed
+                record['calls'] += 1
+                record['alloc_bytes'] = max(record['alloc_bytes'], alloc)
+
+    def timed(self, name):
+        """
+        This function is a decorator recording every call of a function as
+        the stage name.
+        """
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorator
+
+    def payload(self, name, obj):
+        """
+        This function adds the size of obj to the payload of a stage and
+        returns obj. Nothing is measured while measure_payloads is off.
+        """
+        if not self.measure_payloads:
+            return obj
+        size = payload_size(obj)
+        with self._lock:
+            self._record(name)['payload_bytes'] += size
+        return obj
+
+    def report(self):
+        """
+        This function returns the records as a DataFrame (one row per stage).
+        """
+        with self._lock:
+            df = pd.DataFrame.from_dict(self.records, orient='index')
+        if df.empty:
+            return pd.DataFrame(columns=['ms', 'calls', 'alloc KiB', 'payload KiB'])
+        return pd.DataFrame({'ms': (df['seconds'] * 1000).round(1),
+                             'calls': df['calls'],
+                             'alloc KiB': (df['alloc_bytes'] / 1024).round(1),
+                             'payload KiB': (df['payload_bytes'] / 1024).round(1)})
+
+
+###############################################################################
+# END
+###############################################################################
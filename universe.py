@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# TICKER UNIVERSE (S&P 500 LIST, OTHER INDEXES, CUSTOM CSV)
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import glob
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from config import cache_path
+
+COLUMNS = ['Symbol', 'Name', 'Sector']
+
+# Snapshot shipped with the app, used until the first successful refresh
+BUNDLED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Number of snapshot versions kept per universe
+KEEP_VERSIONS = 5
+
+#==============================================================================
+# Sources
+#==============================================================================
+
+def _normalize(df, symbol_col, name_col=None, sector_col=None):
+    """
+    This function keeps the symbol, name and sector columns of a table and
+    writes the symbols the way Yahoo expects them (BRK.B -> BRK-B).
+    """
+    out = pd.DataFrame({
+        'Symbol': df[symbol_col].astype(str).str.strip().str.replace('.', '-', regex=False),
+        'Name': df[name_col] if name_col in df else '',
+        'Sector': df[sector_col] if sector_col in df else '',
+    })
+    out = out[out['Symbol'] != ''].drop_duplicates('Symbol')
+    return out.reset_index(drop=True)
+
+
+def _read_wikipedia(url, symbol_cols, name_cols, sector_cols):
+    """
+    This function returns the first table of a Wikipedia page that has one of
+    the symbol columns.
+    """
+    for table in pd.read_html(url):
+        symbol = next((c for c in symbol_cols if c in table), None)
+        if symbol is not None:
+            name = next((c for c in name_cols if c in table), None)
+            sector = next((c for c in sector_cols if c in table), None)
+            return _normalize(table, symbol, name, sector)
+    raise ValueError(f"No ticker table found in {url}")
+
+
+def load_sp500():
+    return _read_wikipedia('https://en.wikipedia.org/wiki/List_of_S%26P_500_companies',
+                           ['Symbol'], ['Security'], ['GICS Sector'])
+
+
+def load_nasdaq100():
+    return _read_wikipedia('https://en.wikipedia.org/wiki/Nasdaq-100',
+                           ['Ticker', 'Symbol'], ['Company', 'Security'],
+                           ['GICS Sector', 'ICB Industry[14]', 'ICB Industry'])
+
+
+def load_dow30():
+    return _read_wikipedia('https://en.wikipedia.org/wiki/Dow_Jones_Industrial_Average',
+                           ['Symbol'], ['Company'], ['Industry', 'Sector'])
+
+
+def load_csv(path_or_buffer):
+    """
+    This function reads a custom universe from a CSV file. The symbols are in
+    the 'Symbol' or 'Ticker' column (or the first column); 'Name'/'Security'
+    and 'Sector' columns are used when present.
+    """
+    df = pd.read_csv(path_or_buffer)
+    lower = {c.lower(): c for c in df.columns}
+    symbol = lower.get('symbol', lower.get('ticker', df.columns[0]))
+    name = lower.get('name', lower.get('security', lower.get('company')))
+    sector = lower.get('sector', lower.get('gics sector'))
+    return _normalize(df, symbol, name, sector)
+
+
+# Name -> (file name of the snapshots, loader)
+SOURCES = {
+    'S&P 500': ('sp500', load_sp500),
+    'Nasdaq-100': ('nasdaq100', load_nasdaq100),
+    'Dow Jones 30': ('dow30', load_dow30),
+}
+
+#==============================================================================
+# Universe
+#==============================================================================
+
+class TickerUniverse:
+    """
+    A list of tickers (with name and sector) kept in versioned local
+    snapshots: <cache>/universe/<slug>/<YYYYmmddTHHMMSS>.csv.
+
+    table() answers from memory after the first call. The first call reads
+    the latest snapshot (or the one shipped in data/), so the app starts
+    offline and without scraping. When the snapshot is older than ttl
+    seconds, a background thread downloads a new version; the next call to
+    table() picks it up.
+    """
+
+    def __init__(self, name='S&P 500', ttl=24 * 60 * 60, loader=None, slug=None,
+                 retry_after=5 * 60):
+        default_slug, default_loader = SOURCES.get(name, (None, None))
+        self.name = name
+        self.slug = slug or default_slug
+        self.loader = loader or default_loader
+        self.ttl = ttl
+        self._table = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self._last_attempt = 0.0
+        self.retry_after = retry_after
+
+    def _snapshot_dir(self):
+        return os.path.dirname(cache_path("universe", self.slug, "x"))
+
+    def versions(self):
+        """
+        This function returns the stored snapshot files, oldest first.
+        """
+        return sorted(glob.glob(os.path.join(self._snapshot_dir(), "*.csv")))
+
+    def _latest_snapshot(self):
+        versions = self.versions()
+        if versions:
+            path = versions[-1]
+            created = datetime.strptime(os.path.basename(path)[:-4], "%Y%m%dT%H%M%S")
+            return path, created.timestamp()
+        bundled = os.path.join(BUNDLED_DIR, self.slug + ".csv")
+        if os.path.exists(bundled):
+            return bundled, 0.0      # always stale: refresh when online
+        return None, None
+
+    def refresh(self):
+        """
+        This function downloads the universe and saves it as a new snapshot
+        version. Returns the new table.
+        """
+        table = self.loader()[COLUMNS]
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self._snapshot_dir(), stamp + ".csv")
+        table.to_csv(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        for old in self.versions()[:-KEEP_VERSIONS]:
+            os.remove(old)
+        with self._lock:
+            self._table, self._version = table, time.time()
+        return table
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            # Do not try again on every call while offline
+            if time.time() - self._last_attempt < self.retry_after:
+                return
+            self._last_attempt = time.time()
+            thread = threading.Thread(target=self._safe_refresh, daemon=True)
+            self._refreshing = thread
+        thread.start()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            # Offline or the page changed: keep using the current snapshot
+            pass
+
+    def table(self):
+        """
+        This function returns the DataFrame (Symbol, Name, Sector) of the
+        universe, without waiting for the network when a snapshot exists.
+        Without any snapshot, the errors of the download are raised.
+        """
+        with self._lock:
+            table, version = self._table, self._version
+
+        if table is None:
+            path, version = self._latest_snapshot()
+            if path is None:
+                # Nothing stored yet: the first load has to wait for the
+                # download (tried again after retry_after while offline)
+                if time.time() - self._last_attempt < self.retry_after:
+                    raise OSError(f"no snapshot of the {self.name} universe")
+                self._last_attempt = time.time()
+                return self.refresh()
+            table = pd.read_csv(path, keep_default_na=False)[COLUMNS]
+            with self._lock:
+                if self._table is None:
+                    self._table, self._version = table, version
+                table, version = self._table, self._version
+
+        if self.loader is not None and time.time() - version > self.ttl:
+            self._refresh_in_background()
+        return table
+
+###############################################################################
+# END
+###############################################################################
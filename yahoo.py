@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+# HOT FIX FOR YFINANCE .INFO METHOD
+# Ref: https://github.com/ranaroussi/yfinance/issues/1729
+###############################################################################
+
+#==============================================================================
+# Initiating
+#==============================================================================
+
+# Libraries
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+#==============================================================================
+# Shared HTTP session
+#==============================================================================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    This function returns the process-wide requests.Session used for all the
+    Yahoo calls: connections are kept alive and reused, and failed requests
+    (connection errors, 429 and 5xx answers) are retried with an exponential
+    backoff.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=3,
+                          backoff_factor=0.5,
+                          status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=("GET",),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry,
+                                  pool_block=True)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers[YFinance.user_agent_key] = YFinance.user_agent_value
+            _session = session
+        return _session
+
+#==============================================================================
+# YFinance
+#==============================================================================
+
+class YFinance:
+    user_agent_key = "User-Agent"
+    user_agent_value = ("Mozilla/5.0 (Windows NT 6.1; Win64; x64) "
+                        "AppleWebKit/537.36 (KHTML, like Gecko) "
+                        "Chrome/58.0.3029.110 Safari/537.36")
+
+    # Can be pointed to a local stub server for testing
+    cookie_url = "https://fc.yahoo.com"
+    query_url = "https://query1.finance.yahoo.com"
+
+    yahoo_modules = ("assetProfile,"  # longBusinessSummary
+                     "summaryDetail,"
+                     "financialData,"
+                     "indexTrend,"
+                     "defaultKeyStatistics")
+
+    # (connect, read) timeouts in seconds
+    timeout = (3.05, 10)
+    # The cookie and crumb are shared by all the instances for auth_ttl seconds
+    auth_ttl = 60 * 60
+    _auth = None            # (cookie, crumb, expiry time)
+    _auth_lock = threading.Lock()
+
+    def __init__(self, ticker):
+        self.yahoo_ticker = ticker
+
+    def __str__(self):
+        return self.yahoo_ticker
+
+    def _get_yahoo_cookie(self):
+        cookie = None
+
+        response = get_session().get(self.cookie_url,
+                                     allow_redirects=True,
+                                     timeout=self.timeout)
+
+        if not response.cookies:
+            raise Exception("Failed to obtain Yahoo auth cookie.")
+
+        cookie = list(response.cookies)[0]
+
+        return cookie
+
+    def _get_yahoo_crumb(self, cookie):
+        crumb = None
+
+        crumb_response = get_session().get(
+            f"{self.query_url}/v1/test/getcrumb",
+            cookies={cookie.name: cookie.value},
+            allow_redirects=True,
+            timeout=self.timeout,
+        )
+        crumb = crumb_response.text
+
+        if not crumb or crumb_response.status_code != 200:
+            raise Exception("Failed to retrieve Yahoo crumb.")
+
+        return crumb
+
+    @classmethod
+    def _valid_auth(cls, stale):
+        auth = cls._auth
+        if auth is not None and auth is not stale and auth[2] > time.monotonic():
+            return auth
+        return None
+
+    def get_auth(self, stale=None):
+        """
+        This function returns the cached (cookie, crumb, expiry) triple, or
+        asks Yahoo for a new one when it is expired or equal to stale (a
+        triple Yahoo refused). Only one thread refreshes it at a time.
+        """
+        auth = self._valid_auth(stale)
+        if auth is not None:
+            return auth
+
+        with YFinance._auth_lock:
+            # Another thread may have refreshed it while we were waiting
+            auth = self._valid_auth(stale)
+            if auth is None:
+                cookie = self._get_yahoo_cookie()
+                crumb = self._get_yahoo_crumb(cookie)
+                auth = (cookie, crumb, time.monotonic() + self.auth_ttl)
+                YFinance._auth = auth
+            return auth
+
+    @staticmethod
+    def _is_auth_error(response):
+        if response.status_code == 401:
+            return True
+        return response.status_code in (400, 403) and "crumb" in response.text.lower()
+
+    def get_json(self, url):
+        """
+        This function GETs a Yahoo API url with the cached cookie and crumb.
+        If Yahoo answers that they are not valid anymore, they are refreshed
+        once and the request is sent again.
+        """
+        stale = None
+        for attempt in range(2):
+            auth = self.get_auth(stale)
+            cookie, crumb = auth[0], auth[1]
+            separator = "&" if "?" in url else "?"
+            response = get_session().get(
+                f"{url}{separator}crumb={urllib.parse.quote_plus(crumb)}",
+                cookies={cookie.name: cookie.value},
+                allow_redirects=True,
+                timeout=self.timeout)
+            if not self._is_auth_error(response):
+                break
+            stale = auth
+        response.raise_for_status()
+        return response.json()
+
+    def quote_summary_url(self, modules=None):
+        return (f"{self.query_url}/v10/finance/"
+                f"quoteSummary/{urllib.parse.quote(self.yahoo_ticker)}"
+                f"?modules={urllib.parse.quote_plus(modules or self.yahoo_modules)}"
+                "&ssl=true")
+
+    @staticmethod
+    def flatten_quote_summary(info):
+        """
+        This function turns a quoteSummary result into a flat dictionary,
+        keeping the 'raw' value of the formatted fields.
+        """
+        ret = {}
+        for mainKeys in info.keys():
+            for key in info[mainKeys].keys():
+                if isinstance(info[mainKeys][key], dict):
+                    try:
+                        ret[key] = info[mainKeys][key]['raw']
+                    except (KeyError, TypeError):
+                        pass
+                else:
+                    ret[key] = info[mainKeys][key]
+        return ret
+
+    @property
+    def info(self):
+        # Yahoo modules doc informations :
+        # https://cryptocointracker.com/yahoo-finance/yahoo-finance-api
+        info = self.get_json(self.quote_summary_url())
+        info = info['quoteSummary']['result'][0]
+        return self.flatten_quote_summary(info)
+
+#==============================================================================
+# Batch fetcher
+#==============================================================================
+
+class RateLimiter:
+    """
+    Token bucket shared by the threads of a batch: at most `rate` requests
+    per second on average, with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def fetch_quote_summaries(tickers, modules=None, max_workers=16, rate_limit=None):
+    """
+    This function fetches the quoteSummary modules of many tickers
+    concurrently on a thread pool, all of them with the same cookie and crumb
+    and over the shared session. rate_limit is the maximum number of requests
+    per second (None for no limit).
+
+    Returns a DataFrame with one row per ticker (index 'ticker') and one
+    column per field, plus an 'error' column: a ticker that fails gets its
+    error message there instead of failing the whole batch.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    # No burst: one would exceed the rate at the start of every batch
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    # Get the cookie and crumb once, before the threads start (if this fails,
+    # each ticker retries it and reports the error in its row)
+    if tickers:
+        try:
+            YFinance(tickers[0]).get_auth()
+        except Exception:
+            pass
+
+    def fetch(ticker):
+        if limiter is not None:
+            limiter.wait()
+        try:
+            yf_ticker = YFinance(ticker)
+            result = yf_ticker.get_json(yf_ticker.quote_summary_url(modules))
+            result = result['quoteSummary']['result'][0]
+            row = YFinance.flatten_quote_summary(result)
+            row['error'] = None
+        except Exception as e:
+            row = {'error': f"{type(e).__name__}: {e}"}
+        return row
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        rows = list(pool.map(fetch, tickers))
+
+    df = pd.DataFrame(rows, index=pd.Index(tickers, name='ticker'))
+    if 'error' not in df:
+        df['error'] = None
+    return df
+
+###############################################################################
+# END
+###############################################################################